@@ -0,0 +1,145 @@
+"""Journal des entrées/sorties des participants.
+
+Chaque check-in ou check-out (scan, lot de scans, action manuelle) ajoute une
+ligne à attendance_log, dans la même transaction que le changement de statut.
+Les lignes ne sont jamais modifiées : contrairement à checked_in_at /
+checked_out_at, les re-entrées successives sont conservées.
+"""
+from datetime import datetime, timezone
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException, Response
+from sqlalchemy import case, func, insert
+from sqlalchemy.orm import Session
+from app.models import AttendanceAction, AttendanceLog, Registration, RegistrationStatus
+from app.pagination import keyset_page
+from app.utils import as_utc, epoch_seconds
+
+# Sources d'un mouvement
+SOURCE_SCAN = "scan"
+SOURCE_BATCH = "batch"
+SOURCE_MANUAL = "manual"
+
+MAX_TIMESERIES_BUCKETS = 10000  # Intervalles maximum d'une série temporelle
+
+# Mouvement enregistré selon le nouveau statut de l'inscription
+STATUS_ACTIONS = {
+    RegistrationStatus.CHECKED_IN: AttendanceAction.CHECK_IN,
+    RegistrationStatus.CHECKED_OUT: AttendanceAction.CHECK_OUT,
+}
+
+
+def attendance_row(registration: Registration, ts: datetime, source: str) -> dict:
+    """Ligne de journal correspondant au statut actuel d'une inscription"""
+    return {
+        "event_id": registration.event_id,
+        "registration_id": registration.id,
+        "action": STATUS_ACTIONS[registration.status],
+        "ts": ts,
+        "source": source,
+    }
+
+
+def log_attendance(db: Session, rows: List[dict]) -> None:
+    """Ajouter des mouvements au journal (un seul INSERT multi-lignes, sans commit)"""
+    if rows:
+        db.execute(insert(AttendanceLog), rows)
+
+
+def query_attendance(
+    db: Session,
+    event_id: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    registration_id: Optional[str],
+    cursor: Optional[str],
+    limit: int,
+    response: Response
+) -> List[AttendanceLog]:
+    """Mouvements d'un événement sur [start, end[, par ordre chronologique (keyset sur ts, id)"""
+    query = db.query(AttendanceLog).filter(AttendanceLog.event_id == event_id)
+    if start:
+        query = query.filter(AttendanceLog.ts >= start)
+    if end:
+        query = query.filter(AttendanceLog.ts < end)
+    if registration_id:
+        query = query.filter(AttendanceLog.registration_id == registration_id)
+    return keyset_page(
+        query,
+        (AttendanceLog.ts, AttendanceLog.id),
+        (datetime.fromisoformat, int),
+        cursor,
+        limit,
+        response
+    )
+
+
+def _movement_counts(db: Session, event_id: str):
+    """Colonnes (entrées, sorties) d'une agrégation sur attendance_log"""
+    arrivals = func.sum(case((AttendanceLog.action == AttendanceAction.CHECK_IN, 1), else_=0))
+    departures = func.sum(case((AttendanceLog.action == AttendanceAction.CHECK_OUT, 1), else_=0))
+    return db.query(arrivals, departures).filter(AttendanceLog.event_id == event_id)
+
+
+def attendance_timeseries(
+    db: Session,
+    event_id: str,
+    interval: int,
+    start: Optional[datetime],
+    end: Optional[datetime]
+) -> List[dict]:
+    """Entrées, sorties et présents par intervalle de `interval` secondes sur [start, end[.
+
+    Le regroupement est fait par la base (un GROUP BY sur la plage d'index
+    (event_id, ts)) : seules les lignes d'intervalles non vides sont transférées,
+    quel que soit le nombre de mouvements. Le nombre de présents est le cumul
+    des entrées moins les sorties, en partant des présents au début de la fenêtre.
+    Les intervalles sont alignés sur l'epoch UTC ; les intervalles vides de la
+    fenêtre sont inclus (série continue).
+    """
+    start, end = as_utc(start), as_utc(end)
+    index = epoch_seconds(db, AttendanceLog.ts) // interval
+    query = _movement_counts(db, event_id).add_columns(index)
+    if start:
+        query = query.filter(AttendanceLog.ts >= start)
+    if end:
+        query = query.filter(AttendanceLog.ts < end)
+    counts: Dict[int, Tuple[int, int]] = {
+        int(bucket): (arrivals, departures)
+        for arrivals, departures, bucket in query.group_by(index).all()
+    }
+
+    # Bornes de la série : la fenêtre demandée, sinon le premier et le dernier mouvement
+    first = int(start.timestamp()) // interval if start else min(counts, default=None)
+    last = (int(end.timestamp()) - 1) // interval if end else max(counts, default=None)
+    if first is None or last is None or last < first:
+        return []
+    if last - first + 1 > MAX_TIMESERIES_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Trop d'intervalles (max {MAX_TIMESERIES_BUCKETS}) : augmentez `interval` ou réduisez la fenêtre"
+        )
+
+    # Présents au début de la fenêtre
+    present = 0
+    if start:
+        before_arrivals, before_departures = _movement_counts(db, event_id).filter(AttendanceLog.ts < start).one()
+        present = (before_arrivals or 0) - (before_departures or 0)
+
+    buckets = range(first, last + 1)
+    arrivals = [counts.get(bucket, (0, 0))[0] for bucket in buckets]
+    departures = [counts.get(bucket, (0, 0))[1] for bucket in buckets]
+    occupancy = accumulate(
+        (arrived - departed for arrived, departed in zip(arrivals, departures)),
+        initial=present
+    )
+    next(occupancy)  # Valeur initiale : présents avant le premier intervalle
+    return [
+        {
+            "start": datetime.fromtimestamp(bucket * interval, tz=timezone.utc),
+            "arrivals": arrived,
+            "departures": departed,
+            "occupancy": present_at_end,
+        }
+        for bucket, arrived, departed, present_at_end in zip(buckets, arrivals, departures, occupancy)
+    ]
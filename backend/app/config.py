@@ -7,6 +7,8 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 hours
+    MANIFEST_SIGNING_KEY: str = ""  # Clé privée Ed25519 (hex) des manifestes hors ligne : python -m app.manifest
+    SEARCH_BACKEND: str = "auto"  # auto, postgres or memory (app/search.py)
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,143 @@
+"""Compteurs de participants dénormalisés sur Event.
+
+Chaque changement de statut d'une inscription applique un UPDATE atomique
+(`colonne = colonne + delta`) sur la ligne de l'événement, dans la même
+transaction que l'inscription elle-même. Les changements sont signalés au
+hub de présence (app.presence) après le commit, et l'activité du jour est
+ajoutée aux agrégats quotidiens (app.rollups).
+
+Reconstruction des compteurs depuis la table registrations :
+    python -m app.counters
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from app.models import Event, EventStatus, Registration, RegistrationStatus
+from app.presence import queue_presence_update
+from app.rollups import add_activity, record_activity
+
+# Compteurs d'Event dans lesquels une inscription est comptée selon son statut
+STATUS_COUNTERS = {
+    RegistrationStatus.REGISTERED: ("participants_count",),
+    RegistrationStatus.CHECKED_IN: ("participants_count", "checked_in_count"),
+    RegistrationStatus.CHECKED_OUT: ("participants_count", "checked_out_count"),
+    RegistrationStatus.NO_SHOW: ("participants_count", "no_show_count"),
+    RegistrationStatus.CANCELLED: ("cancelled_count",),
+}
+
+COUNTER_COLUMNS = ("participants_count", "checked_in_count", "checked_out_count", "no_show_count", "cancelled_count")
+
+
+def counters_to_status_counts(
+    participants: int, checked_in: int, checked_out: int, no_show: int, cancelled: int
+) -> Dict[RegistrationStatus, int]:
+    """Répartition des inscriptions par statut déduite des compteurs (dans l'ordre de COUNTER_COLUMNS)"""
+    return {
+        RegistrationStatus.REGISTERED: participants - checked_in - checked_out - no_show,
+        RegistrationStatus.CHECKED_IN: checked_in,
+        RegistrationStatus.CHECKED_OUT: checked_out,
+        RegistrationStatus.CANCELLED: cancelled,
+        RegistrationStatus.NO_SHOW: no_show,
+    }
+
+
+def counter_deltas(
+    old_status: Optional[RegistrationStatus],
+    new_status: Optional[RegistrationStatus]
+) -> Dict[str, int]:
+    """Calculer la variation des compteurs pour une transition de statut (None = inexistante)"""
+    deltas: Dict[str, int] = {}
+    for name in STATUS_COUNTERS.get(old_status, ()):
+        deltas[name] = deltas.get(name, 0) - 1
+    for name in STATUS_COUNTERS.get(new_status, ()):
+        deltas[name] = deltas.get(name, 0) + 1
+    return {name: delta for name, delta in deltas.items() if delta}
+
+
+def apply_counter_deltas(db: Session, event_id: str, deltas: Dict[str, int]) -> None:
+    """Appliquer des variations aux compteurs d'un événement (UPDATE atomique, sans commit)"""
+    if not deltas:
+        return
+    values = {getattr(Event, name): getattr(Event, name) + delta for name, delta in deltas.items()}
+    if "cancelled_count" in deltas:
+        # Billet retiré (ou rétabli) : nouvelle version du manifeste hors ligne (app.manifest)
+        values[Event.manifest_version] = Event.manifest_version + 1
+    # Un changement de compteur n'est pas une modification de l'événement
+    values[Event.updated_at] = Event.updated_at
+    db.query(Event).filter(Event.id == event_id).update(values, synchronize_session=False)
+    queue_presence_update(db, event_id)
+
+
+def record_transition(
+    db: Session,
+    event_id: str,
+    old_status: Optional[RegistrationStatus],
+    new_status: Optional[RegistrationStatus],
+    at: Optional[datetime] = None
+) -> None:
+    """Répercuter le changement de statut d'une inscription (survenu à `at`) sur son événement"""
+    apply_counter_deltas(db, event_id, counter_deltas(old_status, new_status))
+    if new_status != old_status:
+        record_activity(db, event_id, add_activity({}, new_status, at))
+
+
+def reserve_seat(db: Session, event_id: str) -> bool:
+    """Réserver atomiquement une place sur un événement publié (sans commit).
+
+    L'UPDATE conditionnel ne touche la ligne que s'il reste de la place : la
+    vérification et l'incrément ne font qu'une seule opération, et le verrou
+    de ligne qu'il pose sérialise les inscriptions concurrentes jusqu'au commit.
+    Retourne False si l'événement est complet ou n'est plus publié.
+    """
+    reserved = db.query(Event).filter(
+        Event.id == event_id,
+        Event.status == EventStatus.PUBLISHED,
+        Event.participants_count < Event.max_participants
+    ).update(
+        {
+            Event.participants_count: Event.participants_count + 1,
+            # Nouveau billet : nouvelle version du manifeste hors ligne (app.manifest)
+            Event.manifest_version: Event.manifest_version + 1,
+            Event.updated_at: Event.updated_at,
+        },
+        synchronize_session=False
+    )
+    if reserved:
+        queue_presence_update(db, event_id)
+        record_activity(db, event_id, add_activity({}, RegistrationStatus.REGISTERED))
+    return reserved == 1
+
+
+def _count_registrations(statuses: List[RegistrationStatus]):
+    return select(func.count(Registration.id)).where(
+        Registration.event_id == Event.id,
+        Registration.status.in_(statuses)
+    ).scalar_subquery()
+
+
+def rebuild_counters(db: Session, event_ids: Optional[List[str]] = None) -> int:
+    """Recalculer les compteurs depuis la table registrations (tous les événements par défaut)"""
+    values = {}
+    for name in COUNTER_COLUMNS:
+        statuses = [status for status, counters in STATUS_COUNTERS.items() if name in counters]
+        values[name] = _count_registrations(statuses)
+    values["updated_at"] = Event.updated_at
+
+    stmt = update(Event).values(**values).execution_options(synchronize_session=False)
+    if event_ids is not None:
+        stmt = stmt.where(Event.id.in_(event_ids))
+    result = db.execute(stmt)
+    db.commit()
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        updated = rebuild_counters(session)
+        print(f"Compteurs recalculés pour {updated} événement(s)")
+    finally:
+        session.close()
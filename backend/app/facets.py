@@ -0,0 +1,81 @@
+"""Filtre par tag et facettes (nombre d'événements par catégorie, lieu et tag).
+
+Les tags sont recopiés de la colonne JSON `events.tags` dans la table
+`event_tags` (une ligne par tag, indexée par tag) : le filtre par tag et la
+facette des tags passent par cet index au lieu de décoder le JSON de chaque
+événement. Les routes d'événements appellent `sync_event_tags` avant leur
+commit.
+
+Les trois facettes sont calculées en une seule requête (UNION ALL de trois
+GROUP BY, FACET_LIMIT valeurs chacune). Les facettes catégorie et lieu
+ignorent leur propre filtre, pour que les autres valeurs restent proposées ;
+les tags sont cumulatifs (un événement doit porter tous les tags demandés),
+leur facette compte donc les tags présents parmi les résultats.
+"""
+from typing import Dict, List, Optional
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from app.models import Event, EventTag
+
+FACET_LIMIT = 20  # Valeurs renvoyées par facette, les plus fréquentes d'abord
+FACETS = ("category", "location", "tag")
+SINGLE_VALUED = ("category", "location")  # Facettes qui ignorent leur propre filtre
+
+
+def normalize_tags(tags: Optional[list]) -> List[str]:
+    """Tags non vides, sans espaces autour ni doublons, dans l'ordre d'origine"""
+    tags = [tag.strip() for tag in tags or [] if isinstance(tag, str)]
+    return list(dict.fromkeys(tag for tag in tags if tag))
+
+
+def sync_event_tags(event: Event) -> None:
+    """Aligner les lignes event_tags de l'événement sur `event.tags` (avant commit)"""
+    wanted = set(normalize_tags(event.tags))
+    for row in list(event.tag_rows):
+        if row.tag not in wanted:
+            event.tag_rows.remove(row)
+    present = {row.tag for row in event.tag_rows}
+    event.tag_rows.extend(EventTag(tag=tag) for tag in normalize_tags(event.tags) if tag not in present)
+
+
+def tag_conditions(tags: List[str]) -> list:
+    """Une condition par tag demandé : l'événement doit les porter tous"""
+    return [
+        Event.id.in_(select(EventTag.event_id).where(EventTag.tag == tag))
+        for tag in normalize_tags(tags)
+    ]
+
+
+def event_facets(db: Session, filters: Dict[str, list], limit: int = FACET_LIMIT) -> dict:
+    """Facettes des événements retenus par `filters` ({nom du filtre: conditions SQL})
+
+    Les conditions rangées sous un nom de SINGLE_VALUED ne s'appliquent pas à la facette du même nom.
+    """
+    def conditions(facet: str) -> list:
+        return [
+            condition for name, group in filters.items()
+            if name != facet or name not in SINGLE_VALUED for condition in group
+        ]
+
+    def grouped(facet: str, column, *joins):
+        count = func.count().label("count")
+        query = select(literal(facet).label("facet"), column.label("value"), count)
+        for target, on in joins:
+            query = query.join(target, on)
+        top = query.where(column.isnot(None), *conditions(facet)).group_by(column).order_by(
+            count.desc(), column
+        ).limit(limit).subquery()
+        return select(top.c.facet, top.c.value, top.c.count)
+
+    statement = union_all(
+        grouped("category", Event.category),
+        grouped("location", Event.location),
+        grouped("tag", EventTag.tag, (Event, Event.id == EventTag.event_id)),
+    )
+    facets = {facet: [] for facet in FACETS}
+    for facet, value, count in db.execute(statement):
+        facets[facet].append({"value": value, "count": count})
+    for values in facets.values():
+        values.sort(key=lambda item: (-item["count"], item["value"]))
+    return facets
@@ -0,0 +1,164 @@
+"""Tâches de fond en mémoire (exports volumineux, rapports d'analytics).
+
+Chaque tâche expose son avancement (`done` / `total`) et, une fois terminée,
+le fichier produit ou son résultat JSON. Les tâches et leurs fichiers sont
+supprimés après JOB_TTL.
+
+Les tâches soumises par `JobRegistry.submit` tournent dans un pool de
+JOB_WORKERS threads du processus, sans broker externe : un rapport lourd
+n'occupe ni la requête qui l'a demandé ni le pool de threads de l'API. Une
+tâche créée avec une clé (`find_or_create`) est partagée par les demandes
+identiques tant qu'elle est en cours ou que son résultat a moins de `max_age`
+secondes.
+"""
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from app.models import generate_uuid
+
+JOB_DIR = Path(tempfile.gettempdir()) / "event-api-jobs"
+JOB_TTL = 3600  # Durée de conservation d'une tâche et de son résultat (secondes)
+JOB_WORKERS = 2  # Tâches exécutées en parallèle par le pool du processus
+
+
+class JobStatus:
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
+
+class Job:
+    """Tâche de fond et son avancement"""
+
+    def __init__(self, kind: str, owner_id: str, key: Optional[Hashable] = None):
+        self.id = generate_uuid()
+        self.kind = kind
+        self.owner_id = owner_id
+        self.key = key
+        self.viewers = {owner_id}  # Utilisateurs ayant demandé la tâche (demandes dédupliquées)
+        self.status = JobStatus.PENDING
+        self.total = 0
+        self.done = 0
+        self.error: Optional[str] = None
+        self.result_path: Optional[Path] = None
+        self.media_type: Optional[str] = None
+        self.filename: Optional[str] = None
+        self.result: Any = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def start(self, total: int) -> None:
+        self.total = total
+        self.status = JobStatus.RUNNING
+
+    def advance(self, count: int = 1) -> None:
+        self.done += count
+
+    def finish(self, path: Path, media_type: str, filename: str) -> None:
+        self.result_path = path
+        self.media_type = media_type
+        self.filename = filename
+        self.finished_at = time.time()
+        self.status = JobStatus.DONE
+
+    def finish_result(self, result: Any) -> None:
+        """Terminer la tâche avec un résultat JSON conservé en mémoire"""
+        self.result = result
+        self.finished_at = time.time()
+        self.status = JobStatus.DONE
+
+    def fail(self, error: str) -> None:
+        self.error = error
+        self.finished_at = time.time()
+        self.status = JobStatus.FAILED
+
+    def reusable(self, max_age: float) -> bool:
+        """Tâche en cours, ou terminée avec succès depuis moins de `max_age` secondes"""
+        if self.status in (JobStatus.PENDING, JobStatus.RUNNING):
+            return True
+        return self.status == JobStatus.DONE and time.time() - self.finished_at <= max_age
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "total": self.total,
+            "done": self.done,
+            "progress": round(self.done / self.total * 100, 1) if self.total else 0.0,
+            "error": self.error,
+        }
+
+
+class JobRegistry:
+    """Registre des tâches du processus courant"""
+
+    def __init__(self, ttl: int, workers: int = JOB_WORKERS):
+        self.ttl = ttl
+        self.workers = workers
+        self._jobs: Dict[str, Job] = {}
+        self._keys: Dict[Hashable, Job] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def create(self, kind: str, owner_id: str) -> Job:
+        job = Job(kind, owner_id)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        return job
+
+    def find_or_create(self, kind: str, owner_id: str, key: Hashable, max_age: float) -> Tuple[Job, bool]:
+        """Tâche de clé `key` réutilisable, ou nouvelle tâche (retourne aussi True si elle est créée).
+
+        La recherche et la création se font sous le même verrou : deux demandes
+        identiques simultanées obtiennent la même tâche.
+        """
+        with self._lock:
+            self._prune()
+            job = self._keys.get(key)
+            if job and job.reusable(max_age):
+                job.viewers.add(owner_id)
+                return job, False
+            job = Job(kind, owner_id, key)
+            self._jobs[job.id] = job
+            self._keys[key] = job
+        return job, True
+
+    def submit(self, job: Job, task: Callable[..., None], *args) -> None:
+        """Exécuter `task(job, *args)` dans le pool de threads (toute exception fait échouer la tâche)"""
+        def run() -> None:
+            try:
+                task(job, *args)
+            except Exception as e:
+                job.fail(str(e))
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            executor = self._executor
+        executor.submit(run)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def result_path(self, job: Job, suffix: str) -> Path:
+        JOB_DIR.mkdir(parents=True, exist_ok=True)
+        return JOB_DIR / f"{job.id}{suffix}"
+
+    def _prune(self) -> None:
+        expired = [job for job in self._jobs.values() if time.time() - job.created_at > self.ttl]
+        for job in expired:
+            del self._jobs[job.id]
+            if job.key is not None and self._keys.get(job.key) is job:
+                del self._keys[job.key]
+            if job.result_path:
+                job.result_path.unlink(missing_ok=True)
+
+
+job_registry = JobRegistry(JOB_TTL)
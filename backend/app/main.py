@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from app.database import engine, Base
+from app.pagination import NEXT_CURSOR_HEADER
 from app.routes import auth, events, registrations, analytics, favorites
 
 # Créer les tables
@@ -21,6 +22,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Servir les fichiers statiques (images)
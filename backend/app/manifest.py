@@ -0,0 +1,162 @@
+"""Manifeste hors ligne des billets valides d'un événement.
+
+Permet aux scanners de valider les QR codes (`REG:{registration_id}` ou
+`REG:{registration_id}:{event_id}:{signature}`) sans réseau. Chaque inscription
+est représentée par une clé de billet de 8 octets : les 8 premiers octets du
+SHA-256 de son id.
+
+Format binaire (entiers big-endian) :
+
+    en-tête   "EVM2" | type (u8) | id de l'événement (16 o) | version (u64)
+    type 0    nombre (u32) | clés triées (8 o chacune)
+    type 1    nombre (u32) | m bits (u32) | k (u8) | filtre de Bloom (m/8 o)
+    type 2    depuis (u64) | nb ajouts (u32) | clés | nb retraits (u32) | clés
+    signature Ed25519 de tout ce qui précède (64 o)
+
+Bloom : d = SHA-256(id), h1 = d[0:8], h2 = d[8:16] | 1, bit i = (h1 + i*h2) mod m.
+Un filtre de Bloom ne permet pas de retirer un billet : le scanner garde les
+retraits des manifestes différentiels dans une liste de refus.
+
+La signature utilise une clé Ed25519 dédiée (MANIFEST_SIGNING_KEY), distincte
+de SECRET_KEY : les scanners ne détiennent que la clé publique, qui ne permet
+ni de signer un manifeste ni de forger un jeton d'accès.
+
+La version est un compteur par événement (`events.manifest_version`),
+incrémenté dans la transaction de chaque billet ajouté ou retiré, et recopié
+sur l'inscription concernée. L'incrément verrouille la ligne de l'événement
+jusqu'au commit : les versions d'un événement sont validées dans l'ordre, un
+manifeste différentiel (type 2) contient donc exactement les changements
+postérieurs à la version donnée, sans marge de temps.
+
+Générer une clé de signature (à placer dans MANIFEST_SIGNING_KEY) :
+    python -m app.manifest
+"""
+import hashlib
+import math
+import struct
+import uuid
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.models import Event, Registration, RegistrationStatus
+
+settings = get_settings()
+
+MANIFEST_MAGIC = b"EVM2"
+MANIFEST_IDS = 0
+MANIFEST_BLOOM = 1
+MANIFEST_DELTA = 2
+
+
+def ticket_key(registration_id: str) -> bytes:
+    """Clé de billet de 8 octets d'une inscription"""
+    return hashlib.sha256(registration_id.encode()).digest()[:8]
+
+
+def current_manifest_version(event_id: str):
+    """Version courante du manifeste d'un événement, à recopier sur une inscription après l'incrément"""
+    return select(Event.manifest_version).where(Event.id == event_id).scalar_subquery()
+
+
+@lru_cache()
+def _signing_key() -> Optional[Ed25519PrivateKey]:
+    if not settings.MANIFEST_SIGNING_KEY:
+        return None
+    return Ed25519PrivateKey.from_private_bytes(bytes.fromhex(settings.MANIFEST_SIGNING_KEY))
+
+
+def manifest_public_key() -> Optional[bytes]:
+    """Clé publique Ed25519 (32 o) avec laquelle les scanners vérifient les manifestes (None si non configurée)"""
+    key = _signing_key()
+    if key is None:
+        return None
+    return key.public_key().public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+
+
+def _header(kind: int, event_id: str, version: int) -> bytes:
+    return MANIFEST_MAGIC + struct.pack(">B16sQ", kind, uuid.UUID(event_id).bytes, version)
+
+
+def _keys(keys: List[bytes]) -> bytes:
+    return struct.pack(">I", len(keys)) + b"".join(sorted(keys))
+
+
+def _sign(body: bytes) -> bytes:
+    return body + _signing_key().sign(body)
+
+
+def bloom_filter(registration_ids: List[str], fp_rate: float) -> Tuple[int, int, bytes]:
+    """Construire un filtre de Bloom (m bits, k fonctions de hachage, bits)"""
+    n = max(len(registration_ids), 1)
+    m = max(8, math.ceil(-n * math.log(fp_rate) / (math.log(2) ** 2)))
+    m = (m + 7) // 8 * 8
+    k = max(1, round(m / n * math.log(2)))
+    bits = bytearray(m // 8)
+    for registration_id in registration_ids:
+        digest = hashlib.sha256(registration_id.encode()).digest()
+        h1 = int.from_bytes(digest[0:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(k):
+            bit = (h1 + i * h2) % m
+            bits[bit >> 3] |= 1 << (bit & 7)
+    return m, k, bytes(bits)
+
+
+def build_manifest(db: Session, event_id: str, kind: int, fp_rate: float = 0.01) -> Tuple[int, bytes]:
+    """Manifeste complet des billets valides d'un événement : (version, contenu signé)"""
+    rows = db.query(Registration.id, Registration.status, Registration.manifest_version).filter(
+        Registration.event_id == event_id
+    ).all()
+
+    # Version lue avec les billets (même requête) : un changement validé entre-temps sera dans le prochain différentiel
+    version = max((row.manifest_version for row in rows), default=0)
+    valid_ids = [row.id for row in rows if row.status != RegistrationStatus.CANCELLED]
+
+    body = _header(kind, event_id, version)
+    if kind == MANIFEST_BLOOM:
+        m, k, bits = bloom_filter(valid_ids, fp_rate)
+        body += struct.pack(">IIB", len(valid_ids), m, k) + bits
+    else:
+        body += _keys([ticket_key(registration_id) for registration_id in valid_ids])
+    return version, _sign(body)
+
+
+def build_manifest_delta(db: Session, event_id: str, since: int) -> Tuple[int, bytes]:
+    """Manifeste différentiel : billets ajoutés et retirés après la version `since`
+
+    Lève ValueError si `since` dépasse la version courante de l'événement
+    (version d'un ancien format de manifeste) : le scanner doit repartir d'un manifeste complet.
+    """
+    current = db.query(Event.manifest_version).filter(Event.id == event_id).scalar() or 0
+    if since > current:
+        raise ValueError("Version de manifeste inconnue : télécharger le manifeste complet")
+
+    rows = db.query(Registration.id, Registration.status, Registration.manifest_version).filter(
+        Registration.event_id == event_id,
+        Registration.manifest_version > since
+    ).all()
+    added = [row.id for row in rows if row.status != RegistrationStatus.CANCELLED]
+    removed = [row.id for row in rows if row.status == RegistrationStatus.CANCELLED]
+
+    version = max([since] + [row.manifest_version for row in rows])
+    body = (
+        _header(MANIFEST_DELTA, event_id, version)
+        + struct.pack(">Q", since)
+        + _keys([ticket_key(registration_id) for registration_id in added])
+        + _keys([ticket_key(registration_id) for registration_id in removed])
+    )
+    return version, _sign(body)
+
+
+if __name__ == "__main__":
+    key = Ed25519PrivateKey.generate()
+    private = key.private_bytes(
+        serialization.Encoding.Raw, serialization.PrivateFormat.Raw, serialization.NoEncryption()
+    )
+    public = key.public_key().public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    print(f"MANIFEST_SIGNING_KEY={private.hex()}")
+    print(f"# Clé publique (scanners) : {public.hex()}")
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, String, DateTime, Enum, ForeignKey, Integer, Text, JSON
+from sqlalchemy import BigInteger, Column, Date, String, DateTime, Enum, ForeignKey, Integer, Text, JSON, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -33,6 +33,11 @@ class RegistrationStatus(str, enum.Enum):
     NO_SHOW = "NO_SHOW"
 
 
+class AttendanceAction(str, enum.Enum):
+    CHECK_IN = "CHECK_IN"
+    CHECK_OUT = "CHECK_OUT"
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -64,15 +69,44 @@ class Event(Base):
     date_end = Column(DateTime(timezone=True), nullable=False)
     max_participants = Column(Integer, default=100)
     image_url = Column(String)
-    owner_id = Column(String, ForeignKey("users.id"), nullable=False)
+    owner_id = Column(String, ForeignKey("users.id"), nullable=False)  # Indexé par ix_events_owner_date_start
     status = Column(Enum(EventStatus), default=EventStatus.PENDING)
     rejection_reason = Column(Text)
+    # Compteurs dénormalisés, maintenus par app.counters à chaque changement de statut d'inscription
+    participants_count = Column(Integer, nullable=False, default=0, server_default="0")  # Inscriptions non annulées
+    checked_in_count = Column(Integer, nullable=False, default=0, server_default="0")  # Actuellement présents
+    checked_out_count = Column(Integer, nullable=False, default=0, server_default="0")  # Sortis
+    no_show_count = Column(Integer, nullable=False, default=0, server_default="0")  # Absents (NO_SHOW)
+    cancelled_count = Column(Integer, nullable=False, default=0, server_default="0")  # Inscriptions annulées
+    # Version du manifeste hors ligne (app.manifest), incrémentée à chaque billet ajouté ou retiré
+    manifest_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relations
     owner = relationship("User", back_populates="events")
     registrations = relationship("Registration", back_populates="event")
+    # Copie normalisée de `tags` (app.facets.sync_event_tags)
+    tag_rows = relationship("EventTag", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Listes paginées par curseur sur (date_start, id) : événements publiés, événements d'un organisateur
+        Index("ix_events_status_date_start", "status", "date_start", "id"),
+        Index("ix_events_owner_date_start", "owner_id", "date_start", "id"),
+    )
+
+
+class EventTag(Base):
+    """Tags d'un événement, une ligne par tag : filtre par tag et facettes par index"""
+    __tablename__ = "event_tags"
+
+    event_id = Column(String, ForeignKey("events.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String, primary_key=True)
+
+    __table_args__ = (
+        # Événements d'un tag sans lecture de la table
+        Index("ix_event_tags_tag_event", "tag", "event_id"),
+    )
 
 
 class Registration(Base):
@@ -87,11 +121,29 @@ class Registration(Base):
     checked_in_at = Column(DateTime(timezone=True))
     checked_out_at = Column(DateTime(timezone=True))
     cancelled_at = Column(DateTime(timezone=True))
+    # Version du manifeste de l'événement à laquelle le billet a été ajouté ou retiré
+    manifest_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relations
     user = relationship("User", back_populates="registrations")
     event = relationship("Event", back_populates="registrations")
 
+    __table_args__ = (
+        # Une seule inscription active (non annulée) par utilisateur et par événement
+        Index(
+            "uq_registrations_active_user_event", "user_id", "event_id",
+            unique=True,
+            postgresql_where=text("status <> 'CANCELLED'"),
+            sqlite_where=text("status <> 'CANCELLED'")
+        ),
+        # Listes de participants / historique paginés par curseur
+        Index("ix_registrations_event_registered", "event_id", "registered_at", "id"),
+        # Chargement incrémental de l'instantané des rapports (app.snapshot)
+        Index("ix_registrations_registered", "registered_at", "id"),
+        # Manifestes différentiels des scanners (app.manifest)
+        Index("ix_registrations_event_manifest", "event_id", "manifest_version"),
+    )
+
 
 class Favorite(Base):
     __tablename__ = "favorites"
@@ -104,3 +156,47 @@ class Favorite(Base):
     # Relations
     user = relationship("User")
     event = relationship("Event")
+
+    __table_args__ = (
+        # Favoris d'un utilisateur paginés par curseur
+        Index("ix_favorites_user_created", "user_id", "created_at", "id"),
+    )
+
+
+class AttendanceLog(Base):
+    """Journal des entrées/sorties (ajout seul : une ligne par mouvement)"""
+    __tablename__ = "attendance_log"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    event_id = Column(String, ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
+    registration_id = Column(String, ForeignKey("registrations.id", ondelete="CASCADE"), nullable=False)
+    action = Column(Enum(AttendanceAction), nullable=False)
+    ts = Column(DateTime(timezone=True), nullable=False)
+    source = Column(String, nullable=False)  # scan, batch, manual
+
+    __table_args__ = (
+        # Lecture d'une fenêtre de temps : parcours d'intervalle de l'index ;
+        # action en fin de clé pour les séries temporelles sans lecture de la table
+        Index("ix_attendance_log_event_ts_action", "event_id", "ts", "id", "action"),
+    )
+
+
+class EventDailyRollup(Base):
+    """Activité quotidienne d'un événement (maintenue par app.rollups à chaque écriture)"""
+    __tablename__ = "event_daily_rollups"
+
+    event_id = Column(String, ForeignKey("events.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)  # Jour UTC du mouvement
+    # Copiés depuis l'événement pour les agrégats par catégorie / organisateur
+    category = Column(String)
+    owner_id = Column(String, nullable=False)
+    registrations = Column(Integer, nullable=False, default=0, server_default="0")
+    cancellations = Column(Integer, nullable=False, default=0, server_default="0")
+    check_ins = Column(Integer, nullable=False, default=0, server_default="0")
+    check_outs = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_event_daily_rollups_day", "day"),
+        Index("ix_event_daily_rollups_owner_day", "owner_id", "day"),
+        Index("ix_event_daily_rollups_category_day", "category", "day"),
+    )
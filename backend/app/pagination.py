@@ -0,0 +1,74 @@
+"""Pagination par curseur (keyset).
+
+Les résultats sont triés sur un ensemble de colonnes se terminant par une clé
+unique (ex. `registered_at, id`). Le curseur est la valeur opaque (base64url)
+de ces colonnes pour la dernière ligne renvoyée : la page suivante reprend
+strictement après elle, sans OFFSET, avec un coût constant quelle que soit la
+profondeur. Il est renvoyé dans l'en-tête X-Next-Cursor (absent sur la dernière page).
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 1000
+
+
+def _serialize(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encoder les valeurs des colonnes de tri de la dernière ligne"""
+    raw = json.dumps([_serialize(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, converters: Sequence[Callable[[Any], Any]]) -> List[Any]:
+    """Décoder un curseur (un convertisseur par colonne de tri)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(converters):
+            raise ValueError
+        return [convert(value) for convert, value in zip(converters, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+
+def keyset_page(
+    query: Query,
+    columns: Sequence[Any],
+    converters: Sequence[Callable[[Any], Any]],
+    cursor: Optional[str],
+    limit: Optional[int],
+    response: Response,
+    descending: bool = False,
+    skip: int = 0,
+) -> list:
+    """Exécuter une requête paginée par curseur sur les colonnes données.
+
+    Sans `limit`, toutes les lignes sont renvoyées (toujours triées). `skip`
+    (après le curseur) garde les anciennes pages par OFFSET utilisables ; la
+    réponse porte quand même le curseur de la page suivante.
+    """
+    if cursor:
+        position = tuple_(*columns)
+        values = tuple_(*decode_cursor(cursor, converters))
+        query = query.filter(position < values if descending else position > values)
+    query = query.order_by(*[column.desc() if descending else column for column in columns])
+    if skip:
+        query = query.offset(skip)
+    if limit is None:
+        return query.all()
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(last, column.key) for column in columns])
+    return rows
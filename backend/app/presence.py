@@ -0,0 +1,189 @@
+"""Présence en temps réel poussée aux tableaux de bord (Server-Sent Events).
+
+Les changements de compteurs d'un événement (app.counters) sont notés sur la
+session SQLAlchemy et signalés au hub uniquement après le commit. Un
+signalement ne transporte pas de variation : il marque l'événement comme
+modifié, et le hub relit alors les compteurs absolus sur la ligne de
+l'événement (dans le pool de threads, hors de la boucle d'événements). Un
+flux ne peut donc ni compter deux fois un changement déjà présent dans sa
+lecture, ni perdre un changement validé avant son abonnement.
+
+Chaque événement suivi a une seule tâche de relecture, quel que soit le
+nombre d'abonnés : au plus une lecture et une diffusion toutes les
+PRESENCE_INTERVAL secondes. Chaque abonné ne reçoit que le dernier état, un
+client lent saute les états intermédiaires au lieu de retarder les autres.
+
+Le hub est propre au processus (comme les tâches de fond) : les changements
+validés par un autre worker uvicorn ne sont pas signalés.
+"""
+import asyncio
+import json
+import threading
+from typing import AsyncIterator, Callable, Dict, Optional, Set
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import Event
+
+PRESENCE_INTERVAL = 0.25  # Délai minimal entre deux mises à jour d'un flux (secondes)
+PRESENCE_KEEPALIVE = 15  # Commentaire SSE envoyé en l'absence de mise à jour (secondes)
+PRESENCE_COUNTERS = ("participants_count", "checked_in_count", "checked_out_count")
+PENDING_KEY = "presence_events"
+
+
+def presence_payload(participants: int, checked_in: int, checked_out: int) -> dict:
+    """État de présence d'un événement (réponse de /live et des flux)"""
+    return {
+        "total_registered": participants,
+        "currently_present": checked_in,
+        "checked_out": checked_out,
+        "not_arrived": participants - checked_in - checked_out
+    }
+
+
+class Subscriber:
+    """Abonné à un flux : seul le dernier message est conservé"""
+
+    def __init__(self):
+        self.message: Optional[str] = None
+        self.changed = asyncio.Event()
+
+    def push(self, message: str) -> None:
+        self.message = message
+        self.changed.set()
+
+
+class Topic:
+    """Abonnés d'un événement suivi et sa tâche de relecture"""
+
+    def __init__(self):
+        self.subscribers: Set[Subscriber] = set()
+        self.changed = asyncio.Event()  # Changement signalé depuis la dernière lecture
+        self.changed.set()  # Première lecture à l'ouverture
+        self.message: Optional[str] = None  # Dernier état diffusé
+        self.task: Optional[asyncio.Task] = None
+
+
+def load_presence_counts(event_id: str) -> Dict[str, int]:
+    """Compteurs de présence d'un événement, lus sur sa ligne (appelée dans le pool de threads)"""
+    db = SessionLocal()
+    try:
+        row = db.query(*[getattr(Event, name) for name in PRESENCE_COUNTERS]).filter(Event.id == event_id).first()
+    finally:
+        db.close()
+    return dict(zip(PRESENCE_COUNTERS, row)) if row else {}
+
+
+class PresenceHub:
+    """Hub de diffusion en mémoire.
+
+    L'état des flux n'est manipulé que depuis la boucle d'événements ; publish()
+    peut être appelé depuis les threads des routes synchrones.
+    """
+
+    def __init__(self, interval: float, loader: Callable[[str], Dict[str, int]] = load_presence_counts):
+        self.interval = interval
+        self.loader = loader
+        self._topics: Dict[str, Topic] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Événements signalés par les threads, pas encore transmis à la boucle
+        self._pending: Set[str] = set()
+        self._pending_lock = threading.Lock()
+        self._drain_scheduled = False
+
+    def publish(self, event_id: str) -> None:
+        """Signaler un changement des compteurs d'un événement (appelable depuis n'importe quel thread)"""
+        loop = self._loop
+        if loop is None or event_id not in self._topics:
+            return
+        with self._pending_lock:
+            self._pending.add(event_id)
+            if self._drain_scheduled:
+                return
+            self._drain_scheduled = True
+        # Un seul réveil de la boucle pour tous les signalements en attente
+        loop.call_soon_threadsafe(self._drain)
+
+    def _drain(self) -> None:
+        with self._pending_lock:
+            pending, self._pending = self._pending, set()
+            self._drain_scheduled = False
+        for event_id in pending:
+            topic = self._topics.get(event_id)
+            if topic is not None:
+                topic.changed.set()
+
+    async def _refresh(self, event_id: str, topic: Topic) -> None:
+        """Relire les compteurs après chaque changement signalé, au plus une fois par intervalle"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await topic.changed.wait()
+            # Effacé avant la lecture : un changement validé pendant la lecture en déclenche une autre
+            topic.changed.clear()
+            counts = await loop.run_in_executor(None, self.loader, event_id)
+            message = self.format(counts)
+            if message != topic.message:
+                topic.message = message
+                # Un seul encodage, puis une affectation par abonné (aucune attente)
+                for subscriber in topic.subscribers:
+                    subscriber.push(message)
+            await asyncio.sleep(self.interval)
+
+    @staticmethod
+    def format(counts: Dict[str, int]) -> str:
+        payload = presence_payload(
+            counts.get("participants_count", 0),
+            counts.get("checked_in_count", 0),
+            counts.get("checked_out_count", 0)
+        )
+        return f"event: presence\ndata: {json.dumps(payload)}\n\n"
+
+    async def stream(self, event_id: str) -> AsyncIterator[str]:
+        """Flux SSE d'un événement : état courant, puis une mise à jour par changement"""
+        self._loop = asyncio.get_running_loop()
+        topic = self._topics.get(event_id)
+        if topic is None:
+            # Abonnement avant la première lecture : aucun changement validé ensuite n'est perdu
+            topic = self._topics[event_id] = Topic()
+            topic.task = asyncio.create_task(self._refresh(event_id, topic))
+        subscriber = Subscriber()
+        topic.subscribers.add(subscriber)
+        if topic.message is not None:
+            subscriber.push(topic.message)
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.changed.wait(), PRESENCE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                subscriber.changed.clear()
+                yield subscriber.message
+        finally:
+            topic.subscribers.discard(subscriber)
+            if not topic.subscribers and self._topics.get(event_id) is topic:
+                del self._topics[event_id]
+                topic.task.cancel()
+
+    def subscriber_count(self, event_id: str) -> int:
+        topic = self._topics.get(event_id)
+        return len(topic.subscribers) if topic else 0
+
+
+presence_hub = PresenceHub(PRESENCE_INTERVAL)
+
+
+def queue_presence_update(db: Session, event_id: str) -> None:
+    """Noter un changement des compteurs d'un événement, signalé au commit de la session"""
+    db.info.setdefault(PENDING_KEY, set()).add(event_id)
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session) -> None:
+    for event_id in session.info.pop(PENDING_KEY, set()):
+        presence_hub.publish(event_id)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
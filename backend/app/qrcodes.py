@@ -0,0 +1,251 @@
+"""Rendu et cache des QR codes d'inscription.
+
+Les images PNG sont gardées dans un cache LRU en mémoire (clé : id d'inscription)
+adossé à un stockage disque adressé par contenu dans uploads/qrcodes/. Le rendu
+(matrice QR + encodage PNG) et les accès disque tournent dans un pool de threads
+dédié, qui limite le nombre de rendus simultanés ; la route, synchrone, attend
+le résultat depuis le pool de threads de FastAPI, hors de la boucle d'événements.
+
+Les exports en masse (ZIP de PNG, planche PDF imprimable) génèrent les QR codes
+en parallèle dans un pool de processus.
+"""
+import base64
+import hashlib
+import hmac
+import io
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+from app.config import get_settings
+from app.jobs import Job, job_registry
+from app.utils import UPLOAD_DIR
+
+settings = get_settings()
+
+QR_CODE_DIR = UPLOAD_DIR / "qrcodes"
+QR_CACHE_SIZE = 2048  # Nombre d'images gardées en mémoire
+QR_RENDER_WORKERS = 2
+
+
+QR_SIGNATURE_LENGTH = 22  # Caractères base64url conservés (~128 bits)
+
+
+def qr_signature(registration_id: str, event_id: str) -> str:
+    """Signature HMAC d'un couple inscription/événement"""
+    digest = hmac.new(
+        settings.SECRET_KEY.encode(), f"{registration_id}:{event_id}".encode(), hashlib.sha256
+    ).digest()
+    return base64.urlsafe_b64encode(digest).decode()[:QR_SIGNATURE_LENGTH]
+
+
+def qr_payload(registration_id: str, event_id: str) -> str:
+    """Contenu encodé dans le QR code d'une inscription : REG:{registration_id}:{event_id}:{signature}"""
+    return f"REG:{registration_id}:{event_id}:{qr_signature(registration_id, event_id)}"
+
+
+def parse_qr_payload(code: str) -> Tuple[str, Optional[str]]:
+    """Extraire (registration_id, event_id) d'un QR code scanné, sans accès à la base.
+
+    Accepte le contenu complet ou sans le préfixe "REG:". L'ancien format
+    (REG:{registration_id}) reste valide : event_id vaut alors None.
+    Lève ValueError si le code est mal formé ou si sa signature est invalide.
+    """
+    if code.startswith("REG:"):
+        code = code[4:]
+    parts = code.strip().split(":")
+    if len(parts) == 1 and parts[0]:
+        return parts[0], None
+    if len(parts) != 3:
+        raise ValueError("QR code mal formé")
+    registration_id, event_id, signature = parts
+    if not hmac.compare_digest(signature, qr_signature(registration_id, event_id)):
+        raise ValueError("Signature du QR code invalide")
+    return registration_id, event_id
+
+
+def render_qr_png(payload: str) -> bytes:
+    """Générer l'image PNG d'un QR code"""
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def payload_digest(payload: str) -> str:
+    """Empreinte du contenu, utilisée comme ETag et comme nom de fichier.
+
+    Signée avec SECRET_KEY : uploads/ est servi publiquement, le nom du fichier
+    ne doit pas pouvoir être déduit de l'id d'inscription.
+    """
+    return hmac.new(settings.SECRET_KEY.encode(), payload.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+class QRCodeCache:
+    """Cache LRU en mémoire + stockage disque des QR codes"""
+
+    def __init__(self, directory: Path, max_entries: int, workers: int):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qr-render")
+
+    def _get_memory(self, registration_id: str, digest: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(registration_id)
+            if entry is None or entry[0] != digest:
+                return None
+            self._entries.move_to_end(registration_id)
+            return entry[1]
+
+    def _put_memory(self, registration_id: str, digest: str, png: bytes) -> None:
+        with self._lock:
+            self._entries[registration_id] = (digest, png)
+            self._entries.move_to_end(registration_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load_or_render(self, digest: str, payload: str) -> bytes:
+        path = self.directory / f"{digest}.png"
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            pass
+
+        png = render_qr_png(payload)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Écriture atomique : un lecteur concurrent ne voit jamais un fichier partiel
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(png)
+        os.replace(tmp_path, path)
+        return png
+
+    def get_or_render(self, registration_id: str, payload: str) -> Tuple[str, bytes]:
+        """Retourner (ETag, PNG) du QR code, en le générant si nécessaire (appel bloquant)"""
+        digest = payload_digest(payload)
+        png = self._get_memory(registration_id, digest)
+        if png is None:
+            png = self._pool.submit(self._load_or_render, digest, payload).result()
+            self._put_memory(registration_id, digest, png)
+        return digest, png
+
+
+qr_cache = QRCodeCache(QR_CODE_DIR, QR_CACHE_SIZE, QR_RENDER_WORKERS)
+
+
+# ============== EXPORTS EN MASSE ==============
+QR_EXPORT_CHUNK = 64  # QR codes envoyés à la fois à chaque processus
+SHEET_DPI = 150
+SHEET_SIZE = (1240, 1754)  # A4 à 150 dpi
+SHEET_COLUMNS = 3
+SHEET_ROWS = 4
+SHEET_PAGE_CHUNK = 16  # Pages gardées en mémoire avant d'être ajoutées au PDF
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Pool de processus partagé, créé au premier export"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # spawn : ne pas forker un serveur multi-threadé
+            _process_pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+
+
+def render_qr_pngs(registration_ids: List[str], event_id: str) -> Iterator[bytes]:
+    """Générer les QR codes de plusieurs inscriptions d'un événement en parallèle (ordre conservé)"""
+    payloads = [qr_payload(registration_id, event_id) for registration_id in registration_ids]
+    return get_process_pool().map(render_qr_png, payloads, chunksize=QR_EXPORT_CHUNK)
+
+
+def _safe_filename(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", name).strip("_")[:60] or "participant"
+
+
+def write_qr_zip(
+    event_id: str, participants: List[Tuple[str, str]], path: Path, on_progress: Callable[[], None]
+) -> None:
+    """Écrire un ZIP contenant un PNG par participant (id d'inscription, nom)"""
+    pngs = render_qr_pngs([registration_id for registration_id, _ in participants], event_id)
+    # Les PNG sont déjà compressés
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for (registration_id, user_name), png in zip(participants, pngs):
+            archive.writestr(f"{_safe_filename(user_name)}_{registration_id}.png", png)
+            on_progress()
+
+
+def write_qr_sheet_pdf(
+    event_id: str, participants: List[Tuple[str, str]], path: Path, on_progress: Callable[[], None]
+) -> None:
+    """Écrire une planche PDF imprimable (grille de QR codes avec le nom des participants)"""
+    cell_width = SHEET_SIZE[0] // SHEET_COLUMNS
+    cell_height = SHEET_SIZE[1] // SHEET_ROWS
+    qr_size = min(cell_width, cell_height) - 60
+    per_page = SHEET_COLUMNS * SHEET_ROWS
+    font = ImageFont.load_default()
+
+    pngs = render_qr_pngs([registration_id for registration_id, _ in participants], event_id)
+    # Pages en noir et blanc (1 bit par pixel), ajoutées au fichier par lots de SHEET_PAGE_CHUNK :
+    # la mémoire ne dépend pas du nombre de participants
+    pages = []
+    written = False
+
+    def flush() -> None:
+        pages[0].save(path, "PDF", resolution=SHEET_DPI, save_all=True, append=written, append_images=pages[1:])
+
+    draw = None
+    for index, ((registration_id, user_name), png) in enumerate(zip(participants, pngs)):
+        slot = index % per_page
+        if slot == 0:
+            if len(pages) == SHEET_PAGE_CHUNK:
+                flush()
+                written = True
+                pages.clear()
+            pages.append(Image.new("1", SHEET_SIZE, 1))
+            draw = ImageDraw.Draw(pages[-1])
+        x = (slot % SHEET_COLUMNS) * cell_width
+        y = (slot // SHEET_COLUMNS) * cell_height
+        qr_image = Image.open(io.BytesIO(png)).convert("1").resize((qr_size, qr_size), Image.NEAREST)
+        pages[-1].paste(qr_image, (x + (cell_width - qr_size) // 2, y + 20))
+        draw.text((x + 30, y + qr_size + 30), user_name[:40], fill=0, font=font)
+        on_progress()
+
+    if not pages and not written:
+        pages.append(Image.new("1", SHEET_SIZE, 1))
+    if pages:
+        flush()
+
+
+QR_EXPORT_FORMATS = {
+    "zip": (".zip", "application/zip", write_qr_zip),
+    "pdf": (".pdf", "application/pdf", write_qr_sheet_pdf),
+}
+
+
+def run_qr_export(job: Job, event_id: str, participants: List[Tuple[str, str]], export_format: str) -> None:
+    """Exécuter un export des QR codes d'un événement (tâche de fond)"""
+    suffix, media_type, writer = QR_EXPORT_FORMATS[export_format]
+    job.start(len(participants))
+    path = job_registry.result_path(job, suffix)
+    try:
+        writer(event_id, participants, path, job.advance)
+    except Exception as e:
+        path.unlink(missing_ok=True)
+        job.fail(str(e))
+        return
+    job.finish(path, media_type, f"qr-codes-{event_id}{suffix}")
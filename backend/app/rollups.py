@@ -0,0 +1,171 @@
+"""Agrégats quotidiens de l'activité des événements (table event_daily_rollups).
+
+Chaque inscription, annulation, check-in ou check-out incrémente la ligne
+(événement, jour UTC) correspondante par un upsert, dans la même transaction
+que le changement de statut. Les statistiques par jour, catégorie ou
+organisateur se lisent dans cette table sans parcourir registrations ni
+attendance_log. Les totaux par événement restent portés par les compteurs
+d'Event (app.counters).
+
+Reconstruction par lots d'événements depuis registrations et attendance_log :
+    python -m app.rollups [--chunk 500]
+"""
+import argparse
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import Date, Integer, func, insert, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models import AttendanceAction, AttendanceLog, Event, EventDailyRollup, Registration, RegistrationStatus
+from app.utils import as_utc
+
+ROLLUP_METRICS = ("registrations", "cancellations", "check_ins", "check_outs")
+ROLLUP_CHUNK = 500  # Événements reconstruits par transaction
+
+# Métrique incrémentée selon le nouveau statut d'une inscription
+STATUS_METRICS = {
+    RegistrationStatus.REGISTERED: "registrations",
+    RegistrationStatus.CANCELLED: "cancellations",
+    RegistrationStatus.CHECKED_IN: "check_ins",
+    RegistrationStatus.CHECKED_OUT: "check_outs",
+}
+
+ACTION_METRICS = {
+    AttendanceAction.CHECK_IN: "check_ins",
+    AttendanceAction.CHECK_OUT: "check_outs",
+}
+
+# Activité d'un événement : {jour: {métrique: nombre}}
+Activity = Dict[date, Dict[str, int]]
+
+
+def utc_day(at: Optional[datetime] = None) -> date:
+    """Jour UTC d'un mouvement (maintenant par défaut)"""
+    return as_utc(at or datetime.now(timezone.utc)).date()
+
+
+def add_activity(activity: Activity, status: RegistrationStatus, at: Optional[datetime] = None) -> Activity:
+    """Compter un passage au statut `status` le jour de `at`"""
+    metric = STATUS_METRICS.get(status)
+    if metric:
+        metrics = activity.setdefault(utc_day(at), {})
+        metrics[metric] = metrics.get(metric, 0) + 1
+    return activity
+
+
+def _dialect_insert(db: Session):
+    # INSERT ... ON CONFLICT DO UPDATE : même syntaxe pour PostgreSQL et SQLite
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+
+def record_activity(db: Session, event_id: str, activity: Activity) -> None:
+    """Incrémenter les agrégats quotidiens d'un événement (un upsert par jour, sans commit)"""
+    for day, metrics in activity.items():
+        metrics = {name: count for name, count in metrics.items() if count}
+        if not metrics:
+            continue
+        # Catégorie et organisateur lus dans la même instruction que l'upsert
+        source = select(
+            Event.id,
+            literal(day, Date),
+            Event.category,
+            Event.owner_id,
+            *[literal(count, Integer) for count in metrics.values()]
+        ).where(Event.id == event_id)
+        stmt = _dialect_insert(db)(EventDailyRollup).from_select(
+            ["event_id", "day", "category", "owner_id", *metrics], source
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[EventDailyRollup.event_id, EventDailyRollup.day],
+            set_={name: getattr(EventDailyRollup, name) + getattr(stmt.excluded, name) for name in metrics}
+        )
+        db.execute(stmt)
+
+
+def update_rollup_category(db: Session, event_id: str, category: Optional[str]) -> None:
+    """Répercuter le changement de catégorie d'un événement sur ses agrégats (sans commit)"""
+    db.query(EventDailyRollup).filter(EventDailyRollup.event_id == event_id).update(
+        {EventDailyRollup.category: category}, synchronize_session=False
+    )
+
+
+def _day(db: Session, column):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date(func.timezone("UTC", column), type_=Date)
+    # SQLite : dates stockées en UTC
+    return func.date(column, type_=Date)
+
+
+def _chunk_activity(db: Session, event_ids: List[str]) -> Dict[str, Activity]:
+    """Activité quotidienne d'un lot d'événements, recalculée depuis les tables sources"""
+    activity: Dict[str, Activity] = {}
+
+    def add(event_id: str, day: date, metric: str, count: int) -> None:
+        metrics = activity.setdefault(event_id, {}).setdefault(day, {})
+        metrics[metric] = metrics.get(metric, 0) + count
+
+    for metric, column in (("registrations", Registration.registered_at), ("cancellations", Registration.cancelled_at)):
+        day = _day(db, column)
+        rows = db.query(Registration.event_id, day, func.count(Registration.id)).filter(
+            Registration.event_id.in_(event_ids),
+            column.isnot(None)
+        ).group_by(Registration.event_id, day).all()
+        for event_id, row_day, count in rows:
+            add(event_id, row_day, metric, count)
+
+    day = _day(db, AttendanceLog.ts)
+    rows = db.query(AttendanceLog.event_id, day, AttendanceLog.action, func.count(AttendanceLog.id)).filter(
+        AttendanceLog.event_id.in_(event_ids)
+    ).group_by(AttendanceLog.event_id, day, AttendanceLog.action).all()
+    for event_id, row_day, action, count in rows:
+        add(event_id, row_day, ACTION_METRICS[action], count)
+    return activity
+
+
+def rebuild_rollups(db: Session, chunk_size: int = ROLLUP_CHUNK) -> int:
+    """Recalculer tous les agrégats quotidiens, `chunk_size` événements par transaction.
+
+    Chaque lot est remplacé dans sa propre transaction : les verrous restent
+    courts et une interruption peut reprendre sans tout recommencer. À lancer
+    hors pic d'activité (les écritures concurrentes d'un lot en cours de
+    reconstruction peuvent être perdues). Retourne le nombre de lignes écrites.
+    """
+    written = 0
+    last_id = ""
+    while True:
+        events = db.query(Event.id, Event.category, Event.owner_id).filter(
+            Event.id > last_id
+        ).order_by(Event.id).limit(chunk_size).all()
+        if not events:
+            return written
+        event_ids = [event.id for event in events]
+        activity = _chunk_activity(db, event_ids)
+        rows = [
+            {
+                "event_id": event.id, "day": day, "category": event.category, "owner_id": event.owner_id,
+                **{name: metrics.get(name, 0) for name in ROLLUP_METRICS}
+            }
+            for event in events
+            for day, metrics in activity.get(event.id, {}).items()
+        ]
+        db.query(EventDailyRollup).filter(EventDailyRollup.event_id.in_(event_ids)).delete(synchronize_session=False)
+        if rows:
+            db.execute(insert(EventDailyRollup), rows)
+        db.commit()
+        written += len(rows)
+        last_id = event_ids[-1]
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Reconstruire les agrégats quotidiens des événements")
+    parser.add_argument("--chunk", type=int, default=ROLLUP_CHUNK, help="Événements par transaction")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        written = rebuild_rollups(session, args.chunk)
+        print(f"{written} agrégat(s) quotidien(s) reconstruit(s)")
+    finally:
+        session.close()
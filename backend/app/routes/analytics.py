@@ -1,14 +1,71 @@
-from fastapi import APIRouter, Depends, HTTPException
+import csv
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import Optional
-from app.database import get_db
-from app.models import Event, EventStatus, User, UserRole, Registration, RegistrationStatus
-from app.schemas import GlobalAnalytics, EventAnalytics
+from sqlalchemy import asc, case, desc, func
+from datetime import date, datetime, timedelta
+from typing import List, Literal, Optional
+from app.database import SessionLocal, get_db
+from app.models import Event, EventDailyRollup, EventStatus, User, UserRole, RegistrationStatus
+from app.schemas import (
+    DailyAnalytics, GlobalAnalytics, EventAnalytics, EventReportRow, EventTimeseries, RegistrationReportRow,
+    ReportJobCreate
+)
 from app.auth import get_current_user, require_admin
+from app.attendance import attendance_timeseries
+from app.counters import COUNTER_COLUMNS, counters_to_status_counts
+from app.jobs import Job, JobStatus, job_registry
+from app.pagination import MAX_PAGE_SIZE
+from app.rollups import ROLLUP_METRICS, utc_day
+from app.snapshot import analytics_snapshot
+from app.utils import csv_cell
 
 router = APIRouter(prefix="/api/analytics", tags=["Analytics"])
 
+DAILY_ANALYTICS_DAYS = 30  # Fenêtre par défaut des statistiques quotidiennes (jours)
+DASHBOARD_PAGE_SIZE = 100  # Événements par page du dashboard
+
+# Rapports en tâche de fond
+REPORT_JOB_KINDS = ("global", "dashboard", "dashboard_csv")
+REPORT_JOB_MAX_AGE = 300  # Un rapport identique terminé depuis moins longtemps est réutilisé (secondes)
+REPORT_EXPORT_BATCH = 1000  # Événements lus par aller-retour pour l'export CSV
+REPORT_CSV_FIELDS = [
+    "event_id", "title", "status", "category", "owner_id", "date_start", "max_participants",
+    "registrations", "checked_in", "checked_out", "no_show", "cancelled", "fill_rate",
+]
+
+
+def compute_global_analytics(db: Session) -> GlobalAnalytics:
+    """Statistiques globales en deux requêtes, sans parcourir la table registrations.
+    
+    La répartition des inscriptions par statut est la somme des compteurs
+    maintenus sur chaque événement (une ligne par événement).
+    """
+    total_users = db.query(func.count(User.id)).scalar()
+    
+    rows = db.query(
+        Event.status,
+        func.count(Event.id),
+        *[func.coalesce(func.sum(getattr(Event, name)), 0) for name in COUNTER_COLUMNS]
+    ).group_by(Event.status).all()
+    
+    # Tous les statuts présents, 0 par défaut
+    events_by_status = {status.value: 0 for status in EventStatus}
+    registrations_by_status = {status.value: 0 for status in RegistrationStatus}
+    for status, event_count, *counters in rows:
+        if status is not None:
+            events_by_status[status.value] = event_count
+        for registration_status, count in counters_to_status_counts(*counters).items():
+            registrations_by_status[registration_status.value] += count
+    
+    return GlobalAnalytics(
+        total_users=total_users,
+        total_events=sum(row[1] for row in rows),
+        total_registrations=sum(registrations_by_status.values()),
+        events_by_status=events_by_status,
+        registrations_by_status=registrations_by_status
+    )
+
 
 @router.get("/global", response_model=GlobalAnalytics)
 def get_global_analytics(
@@ -16,85 +73,347 @@ def get_global_analytics(
     current_user: User = Depends(require_admin)
 ):
     """Obtenir les statistiques globales de la plateforme - Admin uniquement"""
-    total_users = db.query(User).count()
-    total_events = db.query(Event).count()
-    total_registrations = db.query(Registration).count()
-    
-    # Events par statut
-    events_by_status = {}
-    for status in EventStatus:
-        count = db.query(Event).filter(Event.status == status).count()
-        events_by_status[status.value] = count
-    
-    # Registrations par statut
-    registrations_by_status = {}
-    for status in RegistrationStatus:
-        count = db.query(Registration).filter(Registration.status == status).count()
-        registrations_by_status[status.value] = count
+    return compute_global_analytics(db)
+
+
+def fill_rate_expression():
+    """Taux de remplissage (%) calculé en SQL, 0 si la capacité est nulle"""
+    return case(
+        (Event.max_participants > 0, Event.participants_count * 100.0 / Event.max_participants),
+        else_=0
+    )
+
+
+# Clés de tri du dashboard (l'id départage les égalités : pagination stable)
+DASHBOARD_SORTS = {
+    "fill_rate": fill_rate_expression,
+    "registrations": lambda: Event.participants_count,
+    "date_start": lambda: Event.date_start,
+    "title": lambda: Event.title,
+}
+
+
+def compute_dashboard(
+    db: Session,
+    owner_id: Optional[str],
+    sort: str,
+    order: str,
+    skip: int,
+    limit: int
+) -> dict:
+    """Dashboard d'un organisateur (ou de toute la plateforme si owner_id est None).
     
-    return GlobalAnalytics(
-        total_users=total_users,
-        total_events=total_events,
-        total_registrations=total_registrations,
-        events_by_status=events_by_status,
-        registrations_by_status=registrations_by_status
+    Deux requêtes quel que soit le nombre d'événements : les totaux et la
+    répartition par statut en un GROUP BY sur les compteurs des événements,
+    puis une page triée d'événements (colonnes projetées, sans charger les ORM).
+    """
+    fill_rate = fill_rate_expression()
+    
+    totals_query = db.query(
+        Event.status,
+        func.count(Event.id),
+        func.coalesce(func.sum(Event.participants_count), 0),
+        func.coalesce(func.sum(Event.checked_in_count + Event.checked_out_count), 0),
+        func.coalesce(func.sum(fill_rate), 0)
     )
+    page_query = db.query(
+        Event.id,
+        Event.title,
+        Event.status,
+        Event.participants_count,
+        Event.max_participants,
+        fill_rate
+    )
+    if owner_id is not None:
+        totals_query = totals_query.filter(Event.owner_id == owner_id)
+        page_query = page_query.filter(Event.owner_id == owner_id)
+    
+    events_by_status = {status.value: 0 for status in EventStatus}
+    total_events = total_registrations = total_checked_in = 0
+    fill_rate_sum = 0.0
+    for status, event_count, registrations, checked_in, status_fill_rate in totals_query.group_by(Event.status).all():
+        if status is not None:
+            events_by_status[status.value] = event_count
+        total_events += event_count
+        total_registrations += registrations
+        total_checked_in += checked_in
+        fill_rate_sum += float(status_fill_rate)
+    
+    sort_key = DASHBOARD_SORTS[sort]()
+    direction = desc if order == "desc" else asc
+    rows = page_query.order_by(direction(sort_key), direction(Event.id)).offset(skip).limit(limit).all()
+    
+    return {
+        "total_events": total_events,
+        "total_registrations": total_registrations,
+        "total_checked_in": total_checked_in,
+        "avg_fill_rate": round(fill_rate_sum / total_events, 1) if total_events else 0,
+        "events_by_status": events_by_status,
+        "skip": skip,
+        "limit": limit,
+        "events": [
+            {
+                "event_id": event_id,
+                "title": title,
+                "status": status.value,
+                "registrations": registrations,
+                "max_participants": max_participants,
+                "fill_rate": round(float(event_fill_rate), 1)
+            }
+            for event_id, title, status, registrations, max_participants, event_fill_rate in rows
+        ]
+    }
 
 
 @router.get("/my-dashboard")
 def get_my_dashboard(
     user_id: Optional[str] = None,
+    sort: Literal["fill_rate", "registrations", "date_start", "title"] = Query("fill_rate", description="Clé de tri des événements"),
+    order: Literal["asc", "desc"] = Query("desc", description="Ordre de tri"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(DASHBOARD_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Obtenir le dashboard de mes événements (ou d'un autre utilisateur si admin)"""
-    target_user_id = current_user.id
+    """Obtenir le dashboard de mes événements (ou d'un autre utilisateur si admin)
+    
+    Les totaux portent sur tous les événements ; la liste `events` est paginée (skip/limit).
+    """
+    owner_id = current_user.id
     if current_user.role == UserRole.ADMIN:
-        if user_id:
-            target_user_id = user_id
-            my_events = db.query(Event).filter(Event.owner_id == target_user_id).all()
+        # Sans user_id, l'admin voit tous les événements de la plateforme
+        owner_id = user_id
+    return compute_dashboard(db, owner_id, sort, order, skip, limit)
+
+
+# Colonne de regroupement des statistiques quotidiennes (en plus du jour)
+DAILY_GROUPS = {
+    "day": None,
+    "category": EventDailyRollup.category,
+    "owner": EventDailyRollup.owner_id,
+}
+
+
+def compute_daily_analytics(
+    db: Session,
+    start: date,
+    end: date,
+    group_by: str,
+    owner_id: Optional[str] = None,
+    event_id: Optional[str] = None
+) -> List[DailyAnalytics]:
+    """Activité par jour sur [start, end], lue dans les agrégats quotidiens (app.rollups)"""
+    group_column = DAILY_GROUPS[group_by]
+    columns = [EventDailyRollup.day] + ([group_column] if group_column is not None else [])
+    query = db.query(
+        *columns,
+        *[func.sum(getattr(EventDailyRollup, name)) for name in ROLLUP_METRICS]
+    ).filter(EventDailyRollup.day >= start, EventDailyRollup.day <= end)
+    if owner_id is not None:
+        query = query.filter(EventDailyRollup.owner_id == owner_id)
+    if event_id is not None:
+        query = query.filter(EventDailyRollup.event_id == event_id)
+    rows = query.group_by(*columns).order_by(*columns).all()
+    
+    results = []
+    for row in rows:
+        values = dict(zip(ROLLUP_METRICS, row[len(columns):]))
+        results.append(DailyAnalytics(
+            day=row[0],
+            category=row[1] if group_by == "category" else None,
+            owner_id=row[1] if group_by == "owner" else None,
+            **values
+        ))
+    return results
+
+
+@router.get("/daily", response_model=List[DailyAnalytics])
+def get_daily_analytics(
+    start: Optional[date] = Query(None, alias="from", description="Premier jour (défaut : 30 jours avant `to`)"),
+    end: Optional[date] = Query(None, alias="to", description="Dernier jour inclus (défaut : aujourd'hui, UTC)"),
+    group_by: Literal["day", "category", "owner"] = Query("day", description="Regroupement en plus du jour"),
+    event_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Inscriptions, annulations, check-in et check-out par jour (mes événements, ou tous si admin)"""
+    end = end or utc_day()
+    start = start or end - timedelta(days=DAILY_ANALYTICS_DAYS)
+    if start > end:
+        raise HTTPException(status_code=400, detail="La date de début doit précéder la date de fin")
+    
+    owner_id = current_user.id
+    if current_user.role == UserRole.ADMIN:
+        owner_id = user_id
+    return compute_daily_analytics(db, start, end, group_by, owner_id, event_id)
+
+
+@router.get("/reports/events", response_model=List[EventReportRow])
+def get_event_report(
+    group_by: Optional[Literal["category", "owner", "status"]] = Query(None, description="Regroupement des événements"),
+    status_filter: Optional[List[EventStatus]] = Query(None, alias="status"),
+    category: Optional[str] = None,
+    owner_id: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """Capacité, inscriptions, présences et absences par groupe d'événements - Admin uniquement
+    
+    Calculé en mémoire sur l'instantané en colonnes (app.snapshot), rafraîchi au plus toutes les minutes.
+    """
+    analytics_snapshot.ensure_fresh(db)
+    return analytics_snapshot.event_report(
+        group_by,
+        statuses=[status.value for status in status_filter] if status_filter else None,
+        category=category,
+        owner_id=owner_id
+    )
+
+
+@router.get("/reports/registrations", response_model=List[RegistrationReportRow])
+def get_registration_report(
+    period: Literal["day", "week", "month"] = Query("week", description="Période de regroupement"),
+    group_by: Optional[Literal["category", "owner", "status"]] = Query(None, description="Regroupement des événements"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    status_filter: Optional[List[EventStatus]] = Query(None, alias="status"),
+    category: Optional[str] = None,
+    owner_id: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """Inscriptions par jour, semaine ou mois (annulées comprises) - Admin uniquement"""
+    analytics_snapshot.ensure_fresh(db)
+    return analytics_snapshot.registration_report(
+        period,
+        group_by,
+        start,
+        end,
+        statuses=[status.value for status in status_filter] if status_filter else None,
+        category=category,
+        owner_id=owner_id
+    )
+
+
+def write_dashboard_csv(db: Session, job: Job, owner_id: Optional[str]) -> None:
+    """Exporter en CSV les compteurs de tous les événements d'un organisateur (ou de la plateforme)"""
+    query = db.query(Event)
+    if owner_id is not None:
+        query = query.filter(Event.owner_id == owner_id)
+    job.start(query.count())
+    
+    fill_rate = fill_rate_expression()
+    rows = query.with_entities(
+        Event.id, Event.title, Event.status, Event.category, Event.owner_id, Event.date_start,
+        Event.max_participants, *[getattr(Event, name) for name in COUNTER_COLUMNS], fill_rate
+    ).order_by(Event.id).yield_per(REPORT_EXPORT_BATCH)
+    
+    path = job_registry.result_path(job, ".csv")
+    try:
+        # BOM : accents corrects à l'ouverture dans Excel
+        with path.open("w", newline="", encoding="utf-8-sig") as output:
+            writer = csv.writer(output)
+            writer.writerow(REPORT_CSV_FIELDS)
+            for event_id, title, status, category, event_owner_id, date_start, capacity, *counters, event_fill_rate in rows:
+                counts = counters_to_status_counts(*counters)
+                writer.writerow([csv_cell(value) for value in (
+                    event_id, title, status.value, category, event_owner_id,
+                    date_start.isoformat() if date_start else None,
+                    capacity,
+                    counters[0],
+                    counts[RegistrationStatus.CHECKED_IN],
+                    counts[RegistrationStatus.CHECKED_OUT],
+                    counts[RegistrationStatus.NO_SHOW],
+                    counts[RegistrationStatus.CANCELLED],
+                    round(float(event_fill_rate), 1),
+                )])
+                job.advance()
+    except Exception:
+        path.unlink(missing_ok=True)
+        raise
+    job.finish(path, "text/csv; charset=utf-8", f"dashboard-{owner_id or 'plateforme'}.csv")
+
+
+def run_report_job(job: Job, kind: str, owner_id: Optional[str]) -> None:
+    """Calculer un rapport (tâche de fond) dans sa propre session"""
+    db = SessionLocal()
+    try:
+        if kind == "dashboard_csv":
+            write_dashboard_csv(db, job, owner_id)
+            return
+        job.start(1)
+        if kind == "global":
+            result = compute_global_analytics(db).model_dump(mode="json")
         else:
-            # For admin, default to ALL events if no specific user is targeted
-            my_events = db.query(Event).all()
-    else:
-        # Mes events
-        my_events = db.query(Event).filter(Event.owner_id == current_user.id).all()
-    
-    total_events = len(my_events)
-    total_registrations = 0
-    total_checked_in = 0
-    total_checked_out = 0
-    
-    events_stats = []
-    for event in my_events:
-        registrations = db.query(Registration).filter(
-            Registration.event_id == event.id,
-            Registration.status != RegistrationStatus.CANCELLED
-        ).count()
-        
-        checked_in = db.query(Registration).filter(
-            Registration.event_id == event.id,
-            Registration.status.in_([RegistrationStatus.CHECKED_IN, RegistrationStatus.CHECKED_OUT])
-        ).count()
-        
-        total_registrations += registrations
-        total_checked_in += checked_in
-        
-        events_stats.append({
-            "event_id": event.id,
-            "title": event.title,
-            "status": event.status.value,
-            "registrations": registrations,
-            "max_participants": event.max_participants,
-            "fill_rate": round((registrations / event.max_participants) * 100, 1) if event.max_participants > 0 else 0
-        })
+            # Dashboard complet : la première page contient jusqu'à MAX_PAGE_SIZE événements
+            result = compute_dashboard(db, owner_id, "fill_rate", "desc", 0, MAX_PAGE_SIZE)
+        job.advance()
+        job.finish_result(result)
+    finally:
+        db.close()
+
+
+def get_report_job(job_id: str, current_user: User) -> Job:
+    job = job_registry.get(job_id)
+    if not job or job.kind not in REPORT_JOB_KINDS:
+        raise HTTPException(status_code=404, detail="Rapport non trouvé")
+    if current_user.id not in job.viewers and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Non autorisé")
+    return job
+
+
+@router.post("/reports/jobs", status_code=202)
+def create_report_job(
+    report: ReportJobCreate,
+    current_user: User = Depends(get_current_user)
+):
+    """Lancer le calcul d'un rapport en tâche de fond (global : admin uniquement)
     
-    return {
-        "total_events": total_events,
-        "total_registrations": total_registrations,
-        "total_checked_in": total_checked_in,
-        "events": events_stats
-    }
+    Une demande identique (même rapport, même périmètre) en cours ou terminée
+    depuis moins de 5 minutes renvoie la tâche existante (`deduplicated`).
+    L'avancement se suit via /reports/jobs/{job_id}.
+    """
+    is_admin = current_user.role == UserRole.ADMIN
+    if report.kind == "global" and not is_admin:
+        raise HTTPException(status_code=403, detail="Non autorisé")
+    if report.user_id is not None and not is_admin:
+        raise HTTPException(status_code=403, detail="Non autorisé")
+    
+    # Périmètre du rapport : l'organisateur ne voit que ses événements, l'admin choisit (None = tous)
+    owner_id = None
+    if report.kind != "global":
+        owner_id = report.user_id if is_admin else current_user.id
+    
+    job, created = job_registry.find_or_create(
+        report.kind, current_user.id, ("report", report.kind, owner_id), REPORT_JOB_MAX_AGE
+    )
+    if created:
+        job_registry.submit(job, run_report_job, report.kind, owner_id)
+    return {**job.to_dict(), "deduplicated": not created}
+
+
+@router.get("/reports/jobs/{job_id}")
+def get_report_job_status(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Suivre l'avancement d'un rapport"""
+    return get_report_job(job_id, current_user).to_dict()
+
+
+@router.get("/reports/jobs/{job_id}/result")
+def get_report_job_result(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Résultat d'un rapport terminé (JSON, ou fichier CSV pour dashboard_csv)"""
+    job = get_report_job(job_id, current_user)
+    if job.status != JobStatus.DONE:
+        raise HTTPException(status_code=409, detail="Le rapport n'est pas terminé")
+    if job.result_path:
+        return FileResponse(job.result_path, media_type=job.media_type, filename=job.filename)
+    return job.result
 
 
 @router.get("/event/{event_id}", response_model=EventAnalytics)
@@ -111,25 +430,12 @@ def get_event_analytics(
     if event.owner_id != current_user.id and current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Non autorisé")
     
-    total_registrations = db.query(Registration).filter(
-        Registration.event_id == event_id,
-        Registration.status != RegistrationStatus.CANCELLED
-    ).count()
-    
-    checked_in_count = db.query(Registration).filter(
-        Registration.event_id == event_id,
-        Registration.status.in_([RegistrationStatus.CHECKED_IN, RegistrationStatus.CHECKED_OUT])
-    ).count()
-    
-    checked_out_count = db.query(Registration).filter(
-        Registration.event_id == event_id,
-        Registration.status == RegistrationStatus.CHECKED_OUT
-    ).count()
-    
-    no_show_count = db.query(Registration).filter(
-        Registration.event_id == event_id,
-        Registration.status == RegistrationStatus.NO_SHOW
-    ).count()
+    # Compteurs précalculés de l'événement : aucune lecture de la table registrations
+    counts = counters_to_status_counts(*[getattr(event, name) for name in COUNTER_COLUMNS])
+    total_registrations = sum(count for status, count in counts.items() if status != RegistrationStatus.CANCELLED)
+    checked_in_count = counts[RegistrationStatus.CHECKED_IN] + counts[RegistrationStatus.CHECKED_OUT]
+    checked_out_count = counts[RegistrationStatus.CHECKED_OUT]
+    no_show_count = counts[RegistrationStatus.NO_SHOW]
     
     fill_rate = round((total_registrations / event.max_participants) * 100, 1) if event.max_participants > 0 else 0
     
@@ -146,3 +452,27 @@ def get_event_analytics(
         no_show_count=no_show_count,
         fill_rate=fill_rate
     )
+
+
+@router.get("/event/{event_id}/timeseries", response_model=EventTimeseries)
+def get_event_timeseries(
+    event_id: str,
+    interval: int = Query(60, ge=1, le=86400, description="Durée d'un intervalle (secondes)"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Entrées, sorties et présents par intervalle, depuis le journal des entrées/sorties - Organisateur uniquement"""
+    event = db.query(Event).filter(Event.id == event_id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Événement non trouvé")
+    
+    if event.owner_id != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Non autorisé")
+    
+    return EventTimeseries(
+        event_id=event_id,
+        interval=interval,
+        buckets=attendance_timeseries(db, event_id, interval, start, end)
+    )
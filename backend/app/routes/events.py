@@ -1,75 +1,118 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, UploadFile, File
 from sqlalchemy.orm import Session
 from sqlalchemy import func, or_
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Union
+from datetime import datetime, timezone
 from app.database import get_db
 from app.models import Event, EventStatus, User, UserRole, Registration, RegistrationStatus
-from app.schemas import EventCreate, EventUpdate, EventResponse, EventReject
+from app.schemas import EventCreate, EventUpdate, EventResponse, EventReject, EventSearchResults, EventSuggestion
 from app.auth import get_current_user, require_organizer, require_admin
-from app.utils import save_event_image, delete_image
+from app.facets import event_facets, sync_event_tags, tag_conditions
+from app.pagination import MAX_PAGE_SIZE, keyset_page
+from app.rollups import update_rollup_category
+from app.search import get_search_backend, invalidate_search
+from app.suggest import SUGGEST_LIMIT, event_suggestions
+from app.utils import as_utc, save_event_image, delete_image
 
 router = APIRouter(prefix="/api/events", tags=["Événements"])
 
+# Ordre des listes paginées par curseur (index ix_events_status_date_start / ix_events_owner_date_start)
+EVENT_PAGE_ORDER = (Event.date_start, Event.id)
+EVENT_CURSOR_TYPES = (datetime.fromisoformat, str)
 
-def get_participants_count(db: Session, event_id: str) -> int:
-    return db.query(Registration).filter(
-        Registration.event_id == event_id,
-        Registration.status != RegistrationStatus.CANCELLED
-    ).count()
 
-
-@router.get("/", response_model=List[EventResponse])
+@router.get("/", response_model=Union[List[EventResponse], EventSearchResults])
 def list_events(
+    response: Response,
     db: Session = Depends(get_db),
-    search: Optional[str] = Query(None, description="Recherche par titre"),
+    search: Optional[str] = Query(None, description="Recherche plein texte (titre et description), par pertinence"),
     category: Optional[str] = Query(None, description="Filtrer par catégorie"),
     location: Optional[str] = Query(None, description="Filtrer par lieu"),
+    tag: Optional[List[str]] = Query(None, description="Filtrer par tag (répétable : tous les tags demandés)"),
+    start: Optional[datetime] = Query(None, alias="from", description="Date de début à partir de (incluse)"),
+    end: Optional[datetime] = Query(None, alias="to", description="Date de début avant (exclue)"),
+    upcoming_only: bool = Query(False, description="Seulement les événements qui n'ont pas encore commencé (en cours exclus)"),
+    facets: bool = Query(False, description="Renvoyer aussi le nombre d'événements par catégorie, lieu et tag"),
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante (en-tête X-Next-Cursor)"),
     skip: int = 0,
-    limit: int = 20
+    limit: int = Query(20, ge=1, description=f"Taille de page (ramenée à {MAX_PAGE_SIZE} au plus)")
 ):
-    """Lister les événements publiés avec recherche et filtres"""
-    query = db.query(Event).filter(Event.status == EventStatus.PUBLISHED)
-    
-    if search:
-        query = query.filter(or_(
-            Event.title.ilike(f"%{search}%"),
-            Event.description.ilike(f"%{search}%")
-        ))
+    """Lister les événements publiés avec recherche et filtres
+    
+    Avec `search`, les résultats sont classés par pertinence (app.search) et paginés par skip/limit ;
+    sinon par date de début, avec le curseur de la page suivante dans l'en-tête X-Next-Cursor.
+    Avec `facets=true`, la réponse devient {events, facets} (app.facets).
+    Les filtres de date portent sur `date_start` (index ix_events_status_date_start).
+    """
+    start, end = as_utc(start), as_utc(end)
+    if start and end and end <= start:
+        raise HTTPException(status_code=400, detail="`to` doit être postérieur à `from`")
+    
+    filters = {"status": [Event.status == EventStatus.PUBLISHED]}
     if category:
-        query = query.filter(Event.category == category)
+        filters["category"] = [Event.category == category]
     if location:
-        query = query.filter(Event.location.ilike(f"%{location}%"))
-    
-    events = query.order_by(Event.date_start.asc()).offset(skip).limit(limit).all()
+        filters["location"] = [Event.location.ilike(f"%{location}%")]
+    if tag:
+        filters["tag"] = tag_conditions(tag)
+    dates = []
+    if upcoming_only:
+        # Sur date_start (pas date_end) : intervalle de l'index (status, date_start, id), les événements en cours sont exclus
+        dates.append(Event.date_start >= datetime.now(timezone.utc))
+    if start:
+        dates.append(Event.date_start >= start)
+    if end:
+        dates.append(Event.date_start < end)
+    if dates:
+        filters["date"] = dates
+    query = db.query(Event).filter(*[condition for group in filters.values() for condition in group])
+    # Plafonnée plutôt que refusée : les clients qui demandaient plus avant la pagination par curseur restent valides
+    limit = min(limit, MAX_PAGE_SIZE)
+    
+    if search and search.strip():
+        if cursor:
+            raise HTTPException(status_code=400, detail="La recherche se pagine par skip/limit, sans curseur")
+        backend = get_search_backend(db)
+        events = backend.search(db, query, search, skip, limit)
+        if facets:
+            filters["search"] = [backend.condition(db, search)]
+    else:
+        events = keyset_page(query, EVENT_PAGE_ORDER, EVENT_CURSOR_TYPES, cursor, limit, response, skip=skip)
     
-    # Ajouter le count des participants
-    result = []
-    for event in events:
-        event_dict = EventResponse.model_validate(event).model_dump()
-        event_dict["participants_count"] = get_participants_count(db, event.id)
-        result.append(EventResponse(**event_dict))
+    if facets:
+        return {"events": events, "facets": event_facets(db, filters)}
+    return events
+
+
+@router.get("/suggest", response_model=List[EventSuggestion])
+def suggest_events(
+    q: str = Query(..., min_length=1, max_length=100, description="Début de saisie"),
+    limit: int = Query(SUGGEST_LIMIT, ge=1, le=20)
+):
+    """Suggestions de saisie : titres, catégories, lieux et tags des événements publiés
     
-    return result
+    Servies depuis un index en mémoire (app.suggest), sans requête SQL.
+    """
+    return event_suggestions.suggest(q, limit)
 
 
 @router.get("/my-events", response_model=List[EventResponse])
 def get_my_events(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Obtenir mes événements créés (organisateur) ou tous les événements (admin)"""
-    if current_user.role == UserRole.ADMIN:
-        events = db.query(Event).all()
-    else:
-        events = db.query(Event).filter(Event.owner_id == current_user.id).all()
-        
-    result = []
-    for event in events:
-        event_dict = EventResponse.model_validate(event).model_dump()
-        event_dict["participants_count"] = get_participants_count(db, event.id)
-        result.append(EventResponse(**event_dict))
-    return result
+    """Obtenir mes événements créés (organisateur) ou tous les événements (admin)
+    
+    Triés par date de début. Avec `limit`, le curseur de la page suivante
+    est renvoyé dans l'en-tête X-Next-Cursor.
+    """
+    query = db.query(Event)
+    if current_user.role != UserRole.ADMIN:
+        query = query.filter(Event.owner_id == current_user.id)
+    return keyset_page(query, EVENT_PAGE_ORDER, EVENT_CURSOR_TYPES, cursor, limit, response)
 
 
 @router.get("/pending", response_model=List[EventResponse])
@@ -132,10 +175,7 @@ def get_event(event_id: str, db: Session = Depends(get_db)):
     event = db.query(Event).filter(Event.id == event_id).first()
     if not event:
         raise HTTPException(status_code=404, detail="Événement non trouvé")
-    
-    event_dict = EventResponse.model_validate(event).model_dump()
-    event_dict["participants_count"] = get_participants_count(db, event.id)
-    return EventResponse(**event_dict)
+    return event
 
 
 @router.get("/{event_id}/similar", response_model=List[EventResponse])
@@ -177,9 +217,12 @@ def create_event(
         owner_id=current_user.id,
         status=EventStatus.PENDING
     )
+    sync_event_tags(event)
     db.add(event)
     db.commit()
+    invalidate_search()
     db.refresh(event)
+    event_suggestions.update_event(event)
     return event
 
 
@@ -210,10 +253,7 @@ async def upload_event_image(
     event.image_url = image_path
     db.commit()
     db.refresh(event)
-    
-    event_dict = EventResponse.model_validate(event).model_dump()
-    event_dict["participants_count"] = get_participants_count(db, event.id)
-    return EventResponse(**event_dict)
+    return event
 
 
 @router.delete("/{event_id}/image", status_code=status.HTTP_200_OK)
@@ -259,9 +299,16 @@ def update_event(
     update_data = event_data.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(event, key, value)
+    if "category" in update_data:
+        update_rollup_category(db, event_id, event.category)
+    if "tags" in update_data:
+        sync_event_tags(event)
     
     db.commit()
+    if "title" in update_data or "description" in update_data:
+        invalidate_search()
     db.refresh(event)
+    event_suggestions.update_event(event)
     return event
 
 
@@ -280,12 +327,7 @@ def delete_event(
         raise HTTPException(status_code=403, detail="Non autorisé")
     
     # Vérifier s'il y a des inscriptions (non annulées)
-    registrations_count = db.query(Registration).filter(
-        Registration.event_id == event_id,
-        Registration.status != RegistrationStatus.CANCELLED
-    ).count()
-    
-    if registrations_count > 0:
+    if event.participants_count > 0:
         raise HTTPException(status_code=400, detail="Impossible de supprimer un événement avec des inscrits. Annulez-le plutôt.")
     
     # Supprimer l'image de l'événement
@@ -294,6 +336,8 @@ def delete_event(
     
     db.delete(event)
     db.commit()
+    invalidate_search()
+    event_suggestions.remove_event(event_id)
 
 
 @router.post("/{event_id}/approve", response_model=EventResponse)
@@ -313,6 +357,7 @@ def approve_event(
     event.status = EventStatus.PUBLISHED
     db.commit()
     db.refresh(event)
+    event_suggestions.update_event(event)
     return event
 
 
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 from app.database import get_db
 from app.auth import get_current_user
 from app.models import User, Event, Favorite, EventStatus
+from app.pagination import MAX_PAGE_SIZE, keyset_page
 from app.schemas import FavoriteResponse, EventResponse
 
 router = APIRouter(prefix="/api/favorites", tags=["favorites"])
@@ -62,24 +64,38 @@ def remove_favorite(
 
 @router.get("/my-favorites")
 def get_my_favorites(
+    response: Response,
+    cursor: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, description=f"Taille de page (ramenée à {MAX_PAGE_SIZE} au plus)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Récupérer la liste de mes événements favoris"""
-    favorites = db.query(Favorite).filter(
-        Favorite.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    """Récupérer la liste de mes événements favoris
+    
+    Par date d'ajout (keyset sur created_at, id) ; le curseur de la page suivante
+    est renvoyé dans l'en-tête X-Next-Cursor.
+    """
+    favorites = keyset_page(
+        db.query(Favorite).filter(Favorite.user_id == current_user.id),
+        (Favorite.created_at, Favorite.id),
+        (datetime.fromisoformat, str),
+        cursor,
+        # Plafonnée plutôt que refusée, comme sur GET /api/events/
+        min(limit, MAX_PAGE_SIZE),
+        response,
+        skip=skip
+    )
     
     # Récupérer les événements associés
     event_ids = [fav.event_id for fav in favorites]
     events = db.query(Event).filter(Event.id.in_(event_ids)).all() if event_ids else []
+    events = {event.id: event for event in events}
     
     # Construire la réponse avec l'objet event complet
     result = []
     for favorite in favorites:
-        event = next((e for e in events if e.id == favorite.event_id), None)
+        event = events.get(favorite.event_id)
         if event:
             result.append({
                 "id": favorite.id,
@@ -100,7 +116,7 @@ def get_my_favorites(
                     "owner_id": event.owner_id,
                     "status": event.status,
                     "created_at": event.created_at,
-                    "participants_count": len(event.registrations)
+                    "participants_count": event.participants_count
                 }
             })
     
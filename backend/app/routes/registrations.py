@@ -1,17 +1,158 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone
-from typing import List
-import qrcode
+from typing import Iterator, List, Literal, Optional
+import csv
 import io
-from app.database import get_db
-from app.models import Event, EventStatus, User, UserRole, Registration, RegistrationStatus
-from app.schemas import RegistrationResponse, ParticipantResponse
+import json
+from app.database import SessionLocal, get_db
+from app.models import Event, EventStatus, User, UserRole, Registration, RegistrationStatus, generate_uuid
+from app.schemas import RegistrationResponse, ParticipantResponse, ScanBatch, ScanResult, AttendanceLogResponse
+from app.attendance import SOURCE_BATCH, SOURCE_MANUAL, SOURCE_SCAN, attendance_row, log_attendance, query_attendance
 from app.auth import get_current_user
+from app.counters import apply_counter_deltas, counter_deltas, record_transition, reserve_seat
+from app.jobs import JobStatus, job_registry
+from app.manifest import (
+    MANIFEST_BLOOM, MANIFEST_IDS, build_manifest, build_manifest_delta, current_manifest_version, manifest_public_key
+)
+from app.pagination import MAX_PAGE_SIZE, keyset_page
+from app.presence import presence_hub, presence_payload
+from app.qrcodes import parse_qr_payload, qr_cache, qr_payload, run_qr_export
+from app.rollups import add_activity, record_activity
+from app.utils import as_utc, csv_cell
 
 router = APIRouter(prefix="/api/registrations", tags=["Inscriptions"])
 
+# Export de l'historique en flux
+HISTORY_EXPORT_BATCH = 1000  # Lignes lues par aller-retour et envoyées par morceau
+HISTORY_FIELDS = [
+    "id", "user_id", "user_name", "user_email", "user_profile_image", "status",
+    "registered_at", "checked_in_at", "checked_out_at", "cancelled_at",
+]
+HISTORY_EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", ".csv"),
+    "ndjson": ("application/x-ndjson", ".ndjson"),
+}
+
+QR_EXPORT_JOB_KIND = "qr_export"  # Type des tâches d'export de QR codes (app.jobs)
+
+# Transitions appliquées par un scan de QR code
+SCAN_TRANSITIONS = {
+    RegistrationStatus.REGISTERED: RegistrationStatus.CHECKED_IN,    # Premier scan : check-in
+    RegistrationStatus.CHECKED_IN: RegistrationStatus.CHECKED_OUT,   # Deuxième scan : check-out
+    RegistrationStatus.CHECKED_OUT: RegistrationStatus.CHECKED_IN,   # Re-entrée du participant
+}
+
+
+def apply_scan(registration: Registration, scanned_at: datetime) -> RegistrationStatus:
+    """Appliquer un scan à une inscription (check-in/check-out) et retourner son statut précédent"""
+    previous_status = registration.status
+    new_status = SCAN_TRANSITIONS.get(previous_status)
+    if new_status == RegistrationStatus.CHECKED_IN:
+        registration.checked_in_at = scanned_at
+    elif new_status == RegistrationStatus.CHECKED_OUT:
+        registration.checked_out_at = scanned_at
+    if new_status:
+        registration.status = new_status
+    return previous_status
+
+
+def query_event_participants(db: Session, event_id: str):
+    """Inscriptions d'un événement avec les informations de l'utilisateur, en une seule requête"""
+    return db.query(
+        Registration.id,
+        Registration.user_id,
+        Registration.status,
+        Registration.registered_at,
+        Registration.checked_in_at,
+        Registration.checked_out_at,
+        Registration.cancelled_at,
+        User.name.label("user_name"),
+        User.email.label("user_email"),
+        User.profile_image.label("user_profile_image")
+    ).join(User, User.id == Registration.user_id).filter(Registration.event_id == event_id)
+
+
+def history_entry(row) -> dict:
+    """Entrée d'historique d'une ligne de query_event_participants"""
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "user_name": row.user_name,
+        "user_email": row.user_email,
+        "user_profile_image": row.user_profile_image,
+        "status": row.status.value,
+        "registered_at": row.registered_at.isoformat() if row.registered_at else None,
+        "checked_in_at": row.checked_in_at.isoformat() if row.checked_in_at else None,
+        "checked_out_at": row.checked_out_at.isoformat() if row.checked_out_at else None,
+        "cancelled_at": row.cancelled_at.isoformat() if row.cancelled_at else None,
+    }
+
+
+def stream_event_history(
+    db: Session,
+    event_id: str,
+    statuses: Optional[List[RegistrationStatus]],
+    export_format: str
+) -> Iterator[str]:
+    """Générer l'historique d'un événement par morceaux (CSV ou NDJSON).
+    
+    La session est fermée à la fin du flux (ou si le client se déconnecte).
+    """
+    try:
+        query = query_event_participants(db, event_id)
+        if statuses:
+            query = query.filter(Registration.status.in_(statuses))
+        rows = query.order_by(Registration.registered_at, Registration.id).yield_per(HISTORY_EXPORT_BATCH)
+        
+        buffer = io.StringIO()
+        writer = None
+        if export_format == "csv":
+            buffer.write("\ufeff")  # BOM : accents corrects à l'ouverture dans Excel
+            writer = csv.writer(buffer)
+            writer.writerow(HISTORY_FIELDS)
+            # En-tête envoyé avant la lecture du premier lot : le client reçoit le premier octet sans attendre la base
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        for index, row in enumerate(rows, start=1):
+            entry = history_entry(row)
+            if writer:
+                writer.writerow([csv_cell(entry[field]) for field in HISTORY_FIELDS])
+            else:
+                buffer.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            if index % HISTORY_EXPORT_BATCH == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    finally:
+        db.close()
+
+
+def page_event_participants(
+    db: Session,
+    event_id: str,
+    statuses: Optional[List[RegistrationStatus]],
+    cursor: Optional[str],
+    limit: Optional[int],
+    response: Response
+):
+    """Page de participants triée par date d'inscription (keyset sur registered_at, id)"""
+    query = query_event_participants(db, event_id)
+    if statuses:
+        query = query.filter(Registration.status.in_(statuses))
+    return keyset_page(
+        query,
+        (Registration.registered_at, Registration.id),
+        (datetime.fromisoformat, str),
+        cursor,
+        limit,
+        response
+    )
+
 
 @router.post("/{event_id}", response_model=RegistrationResponse, status_code=status.HTTP_201_CREATED)
 def register_to_event(
@@ -36,30 +177,33 @@ def register_to_event(
     if existing:
         raise HTTPException(status_code=400, detail="Déjà inscrit à cet événement")
     
-    # Vérifier la limite de participants
-    current_count = db.query(Registration).filter(
-        Registration.event_id == event_id,
-        Registration.status != RegistrationStatus.CANCELLED
-    ).count()
-    if current_count >= event.max_participants:
+    # Réserver une place (vérification de la limite et incrément atomiques)
+    if not reserve_seat(db, event_id):
+        db.rollback()
         raise HTTPException(status_code=400, detail="Événement complet")
     
-    # Créer l'inscription
+    # Créer l'inscription : l'id est généré côté client pour écrire l'URL du QR code
+    # dans le même INSERT (une seule transaction, pas de relecture)
+    registration_id = generate_uuid()
     registration = Registration(
+        id=registration_id,
         user_id=current_user.id,
         event_id=event_id,
-        status=RegistrationStatus.REGISTERED
+        status=RegistrationStatus.REGISTERED,
+        qr_code_url=f"/api/registrations/{registration_id}/qr-code",
+        registered_at=datetime.now(timezone.utc),
+        manifest_version=current_manifest_version(event_id)
     )
     db.add(registration)
-    db.commit()
-    db.refresh(registration)
-    
-    # Générer l'URL du QR code
-    registration.qr_code_url = f"/api/registrations/{registration.id}/qr-code"
-    db.commit()
-    db.refresh(registration)
+    response = RegistrationResponse.model_validate(registration)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Inscription concurrente du même utilisateur : la place réservée est libérée par le rollback
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Déjà inscrit à cet événement")
     
-    return registration
+    return response
 
 
 @router.delete("/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -69,17 +213,21 @@ def cancel_registration(
     current_user: User = Depends(get_current_user)
 ):
     """Annuler son inscription à un événement"""
+    # Verrouiller la ligne : deux annulations simultanées ne libèrent qu'une place
     registration = db.query(Registration).filter(
         Registration.user_id == current_user.id,
         Registration.event_id == event_id,
         Registration.status == RegistrationStatus.REGISTERED
-    ).first()
+    ).with_for_update().first()
     
     if not registration:
         raise HTTPException(status_code=404, detail="Inscription non trouvée")
     
     registration.status = RegistrationStatus.CANCELLED
     registration.cancelled_at = datetime.now(timezone.utc)
+    record_transition(db, event_id, RegistrationStatus.REGISTERED, RegistrationStatus.CANCELLED, registration.cancelled_at)
+    # Après l'incrément de record_transition : version du retrait dans le manifeste
+    registration.manifest_version = current_manifest_version(event_id)
     db.commit()
 
 
@@ -98,6 +246,7 @@ def get_my_registrations(
 @router.get("/{registration_id}/qr-code")
 def get_qr_code(
     registration_id: str,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -110,19 +259,17 @@ def get_qr_code(
     if registration.user_id != current_user.id and current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Non autorisé")
     
-    # Générer le QR code
-    qr_data = f"REG:{registration_id}"
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(qr_data)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
+    # Récupérer le QR code depuis le cache (rendu dans le pool dédié si absent)
+    digest, png = qr_cache.get_or_render(registration_id, qr_payload(registration_id, registration.event_id))
     
-    # Retourner l'image
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
+    # Le contenu d'un QR code ne change jamais pour une inscription donnée
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    return StreamingResponse(buf, media_type="image/png")
+    return Response(content=png, media_type="image/png", headers=headers)
 
 
 @router.post("/scan/{registration_id}", response_model=RegistrationResponse)
@@ -134,10 +281,23 @@ def scan_qr_code(
 ):
     """Scanner un QR code (check-in/check-out automatique) - Organisateur uniquement.
     
+    registration_id accepts either a bare registration id or the scanned QR
+    content (signed format REG:{registration_id}:{event_id}:{signature}).
     Optionally provide event_id as a query parameter to validate the registration
     belongs to a specific event before performing check-in/out.
     """
-    registration = db.query(Registration).filter(Registration.id == registration_id).first()
+    # Code signé : rejeter les codes falsifiés ou d'un autre événement sans accès à la base
+    try:
+        registration_id, signed_event_id = parse_qr_payload(registration_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="QR code invalide")
+    if event_id and signed_event_id and signed_event_id != event_id:
+        raise HTTPException(
+            status_code=400,
+            detail="Cette inscription n'appartient pas à cet événement"
+        )
+    
+    registration = db.query(Registration).filter(Registration.id == registration_id).with_for_update().first()
     if not registration:
         raise HTTPException(status_code=404, detail="Inscription non trouvée")
     
@@ -158,24 +318,122 @@ def scan_qr_code(
         raise HTTPException(status_code=400, detail="Cette inscription a été annulée")
     
     # Déterminer si c'est un check-in ou check-out basé sur le statut actuel
-    if registration.status == RegistrationStatus.REGISTERED:
-        # First scan: Check-in
-        registration.status = RegistrationStatus.CHECKED_IN
-        registration.checked_in_at = datetime.now(timezone.utc)
-    elif registration.status == RegistrationStatus.CHECKED_IN:
-        # Second scan: Check-out
-        registration.status = RegistrationStatus.CHECKED_OUT
-        registration.checked_out_at = datetime.now(timezone.utc)
-    elif registration.status == RegistrationStatus.CHECKED_OUT:
-        # Third scan: Re-check-in (participant came back)
-        registration.status = RegistrationStatus.CHECKED_IN
-        registration.checked_in_at = datetime.now(timezone.utc)
-    
+    scanned_at = datetime.now(timezone.utc)
+    previous_status = apply_scan(registration, scanned_at)
+    # Aucune transition (ex. NO_SHOW) : ni compteur ni mouvement à enregistrer
+    if registration.status != previous_status:
+        record_transition(db, registration.event_id, previous_status, registration.status, scanned_at)
+        log_attendance(db, [attendance_row(registration, scanned_at, SOURCE_SCAN)])
     db.commit()
     db.refresh(registration)
     return registration
 
 
+@router.post("/event/{event_id}/scan-batch", response_model=List[ScanResult])
+def scan_batch(
+    event_id: str,
+    batch: ScanBatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Appliquer un lot de scans (scanners hors ligne ou multiples) - Organisateur uniquement.
+    
+    Les scans sont appliqués dans l'ordre de leur heure de scan, en une seule
+    transaction. Un scan dont l'heure n'est pas postérieure au dernier mouvement
+    de l'inscription est considéré comme déjà appliqué (lot renvoyé par le scanner).
+    """
+    event = db.query(Event).filter(Event.id == event_id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Événement non trouvé")
+    
+    if event.owner_id != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Seul l'organisateur peut scanner les QR codes")
+    
+    # Vérifier les codes signés avant tout accès à la base
+    results: List[Optional[ScanResult]] = [None] * len(batch.scans)
+    scanned_ids: List[Optional[str]] = [None] * len(batch.scans)
+    for index, item in enumerate(batch.scans):
+        try:
+            registration_id, signed_event_id = parse_qr_payload(item.registration_id)
+        except ValueError:
+            results[index] = ScanResult(registration_id=item.registration_id, success=False, error="QR code invalide")
+            continue
+        if signed_event_id and signed_event_id != event_id:
+            results[index] = ScanResult(
+                registration_id=registration_id, success=False,
+                error="Cette inscription n'appartient pas à cet événement"
+            )
+            continue
+        scanned_ids[index] = registration_id
+    
+    # Charger (et verrouiller) toutes les inscriptions du lot en une requête
+    registration_ids = {registration_id for registration_id in scanned_ids if registration_id}
+    registrations = {
+        reg.id: reg
+        for reg in db.query(Registration).filter(
+            Registration.event_id == event_id,
+            Registration.id.in_(registration_ids)
+        ).with_for_update()
+    }
+    
+    received_at = datetime.now(timezone.utc)
+    deltas = {}
+    activity = {}
+    movements = []
+    order = sorted(
+        (index for index, registration_id in enumerate(scanned_ids) if registration_id),
+        key=lambda i: as_utc(batch.scans[i].scanned_at) or received_at
+    )
+    for index in order:
+        item = batch.scans[index]
+        registration = registrations.get(scanned_ids[index])
+        if not registration:
+            results[index] = ScanResult(
+                registration_id=scanned_ids[index], success=False,
+                error="Inscription non trouvée pour cet événement"
+            )
+            continue
+        if registration.status == RegistrationStatus.CANCELLED:
+            results[index] = ScanResult(
+                registration_id=registration.id, success=False,
+                status=registration.status, error="Cette inscription a été annulée"
+            )
+            continue
+        
+        scanned_at = as_utc(item.scanned_at) or received_at
+        last_movement = max(
+            (as_utc(at) for at in (registration.checked_in_at, registration.checked_out_at) if at),
+            default=None
+        )
+        if item.scanned_at and last_movement and scanned_at <= last_movement:
+            results[index] = ScanResult(
+                registration_id=registration.id, success=True,
+                status=registration.status, duplicate=True
+            )
+            continue
+        
+        previous_status = apply_scan(registration, scanned_at)
+        if registration.status == previous_status:
+            # Aucune transition pour ce statut (ex. NO_SHOW) : rien à compter ni à journaliser
+            results[index] = ScanResult(
+                registration_id=registration.id, success=True, status=registration.status
+            )
+            continue
+        for name, delta in counter_deltas(previous_status, registration.status).items():
+            deltas[name] = deltas.get(name, 0) + delta
+        add_activity(activity, registration.status, scanned_at)
+        movements.append(attendance_row(registration, scanned_at, SOURCE_BATCH))
+        results[index] = ScanResult(
+            registration_id=registration.id, success=True, status=registration.status
+        )
+    
+    apply_counter_deltas(db, event_id, {name: delta for name, delta in deltas.items() if delta})
+    record_activity(db, event_id, activity)
+    log_attendance(db, movements)
+    db.commit()
+    return results
+
+
 @router.post("/{registration_id}/check-in", response_model=RegistrationResponse)
 def manual_check_in(
     registration_id: str,
@@ -183,7 +441,7 @@ def manual_check_in(
     current_user: User = Depends(get_current_user)
 ):
     """Check-in manuel d'un participant - Organisateur uniquement"""
-    registration = db.query(Registration).filter(Registration.id == registration_id).first()
+    registration = db.query(Registration).filter(Registration.id == registration_id).with_for_update().first()
     if not registration:
         raise HTTPException(status_code=404, detail="Inscription non trouvée")
     
@@ -196,6 +454,11 @@ def manual_check_in(
     
     registration.status = RegistrationStatus.CHECKED_IN
     registration.checked_in_at = datetime.now(timezone.utc)
+    record_transition(
+        db, registration.event_id, RegistrationStatus.REGISTERED, RegistrationStatus.CHECKED_IN,
+        registration.checked_in_at
+    )
+    log_attendance(db, [attendance_row(registration, registration.checked_in_at, SOURCE_MANUAL)])
     db.commit()
     db.refresh(registration)
     return registration
@@ -208,7 +471,7 @@ def manual_check_out(
     current_user: User = Depends(get_current_user)
 ):
     """Check-out manuel d'un participant - Organisateur uniquement"""
-    registration = db.query(Registration).filter(Registration.id == registration_id).first()
+    registration = db.query(Registration).filter(Registration.id == registration_id).with_for_update().first()
     if not registration:
         raise HTTPException(status_code=404, detail="Inscription non trouvée")
     
@@ -221,6 +484,11 @@ def manual_check_out(
     
     registration.status = RegistrationStatus.CHECKED_OUT
     registration.checked_out_at = datetime.now(timezone.utc)
+    record_transition(
+        db, registration.event_id, RegistrationStatus.CHECKED_IN, RegistrationStatus.CHECKED_OUT,
+        registration.checked_out_at
+    )
+    log_attendance(db, [attendance_row(registration, registration.checked_out_at, SOURCE_MANUAL)])
     db.commit()
     db.refresh(registration)
     return registration
@@ -229,10 +497,18 @@ def manual_check_out(
 @router.get("/event/{event_id}/participants", response_model=List[ParticipantResponse])
 def get_event_participants(
     event_id: str,
+    response: Response,
+    status_filter: Optional[List[RegistrationStatus]] = Query(None, alias="status"),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Obtenir la liste des participants d'un événement - Organisateur uniquement"""
+    """Obtenir la liste des participants d'un événement - Organisateur uniquement
+    
+    Triée par date d'inscription. Avec `limit`, le curseur de la page suivante
+    est renvoyé dans l'en-tête X-Next-Cursor.
+    """
     event = db.query(Event).filter(Event.id == event_id).first()
     if not event:
         raise HTTPException(status_code=404, detail="Événement non trouvé")
@@ -240,24 +516,123 @@ def get_event_participants(
     if event.owner_id != current_user.id and current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Non autorisé")
     
-    registrations = db.query(Registration).filter(
-        Registration.event_id == event_id
-    ).all()
+    rows = page_event_participants(db, event_id, status_filter, cursor, limit, response)
+    
+    return [
+        ParticipantResponse(
+            id=row.id,
+            user_name=row.user_name,
+            user_email=row.user_email,
+            status=row.status,
+            registered_at=row.registered_at,
+            checked_in_at=row.checked_in_at,
+            checked_out_at=row.checked_out_at
+        )
+        for row in rows
+    ]
+
+
+@router.post("/event/{event_id}/qr-codes/export", status_code=status.HTTP_202_ACCEPTED)
+def export_event_qr_codes(
+    event_id: str,
+    background_tasks: BackgroundTasks,
+    format: Literal["zip", "pdf"] = Query("zip", description="zip (un PNG par participant) ou pdf (planche imprimable)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Lancer l'export des QR codes de tous les participants d'un événement - Organisateur uniquement"""
+    event = db.query(Event).filter(Event.id == event_id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Événement non trouvé")
     
-    participants = []
-    for reg in registrations:
-        user = db.query(User).filter(User.id == reg.user_id).first()
-        participants.append(ParticipantResponse(
-            id=reg.id,
-            user_name=user.name,
-            user_email=user.email,
-            status=reg.status,
-            registered_at=reg.registered_at,
-            checked_in_at=reg.checked_in_at,
-            checked_out_at=reg.checked_out_at
-        ))
+    if event.owner_id != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Non autorisé")
+    
+    rows = query_event_participants(db, event_id).filter(
+        Registration.status != RegistrationStatus.CANCELLED
+    ).order_by(User.name.asc()).all()
+    participants = [(row.id, row.user_name) for row in rows]
     
-    return participants
+    # La génération tourne en tâche de fond ; l'avancement se suit via /exports/{job_id}
+    job = job_registry.create(QR_EXPORT_JOB_KIND, current_user.id)
+    background_tasks.add_task(run_qr_export, job, event_id, participants, format)
+    return job.to_dict()
+
+
+def get_owned_job(job_id: str, current_user: User):
+    job = job_registry.get(job_id)
+    # Le registre est partagé avec les rapports d'analytics : seuls les exports de QR codes sont servis ici
+    if not job or job.kind != QR_EXPORT_JOB_KIND:
+        raise HTTPException(status_code=404, detail="Export non trouvé")
+    if job.owner_id != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Non autorisé")
+    return job
+
+
+@router.get("/exports/{job_id}")
+def get_export_status(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Suivre l'avancement d'un export"""
+    return get_owned_job(job_id, current_user).to_dict()
+
+
+@router.get("/exports/{job_id}/download")
+def download_export(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Télécharger le résultat d'un export terminé"""
+    job = get_owned_job(job_id, current_user)
+    if job.status != JobStatus.DONE:
+        raise HTTPException(status_code=409, detail="L'export n'est pas terminé")
+    return FileResponse(job.result_path, media_type=job.media_type, filename=job.filename)
+
+
+@router.get("/manifest-key", response_model=dict)
+def get_manifest_public_key(current_user: User = Depends(get_current_user)):
+    """Clé publique Ed25519 avec laquelle les scanners vérifient les manifestes"""
+    public_key = manifest_public_key()
+    if public_key is None:
+        raise HTTPException(status_code=503, detail="Clé de signature des manifestes non configurée")
+    return {"algorithm": "Ed25519", "public_key": public_key.hex()}
+
+
+@router.get("/event/{event_id}/manifest")
+def get_scanner_manifest(
+    event_id: str,
+    format: Literal["ids", "bloom"] = Query("ids", description="ids (clés triées) ou bloom (filtre de Bloom)"),
+    fp_rate: float = Query(0.01, gt=0, lt=0.5, description="Taux de faux positifs du filtre de Bloom"),
+    since: Optional[int] = Query(None, ge=0, description="Version déjà détenue : ne renvoyer que les changements"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Télécharger le manifeste signé des billets valides pour les scanners hors ligne - Organisateur uniquement"""
+    event = db.query(Event).filter(Event.id == event_id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Événement non trouvé")
+    
+    if event.owner_id != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Non autorisé")
+    
+    if manifest_public_key() is None:
+        raise HTTPException(status_code=503, detail="Clé de signature des manifestes non configurée")
+    
+    if since is not None:
+        try:
+            version, content = build_manifest_delta(db, event_id, since)
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+    else:
+        kind = MANIFEST_BLOOM if format == "bloom" else MANIFEST_IDS
+        version, content = build_manifest(db, event_id, kind, fp_rate)
+    
+    return Response(
+        content=content,
+        media_type="application/octet-stream",
+        headers={"X-Manifest-Version": str(version), "Cache-Control": "no-store"}
+    )
 
 
 @router.get("/event/{event_id}/live", response_model=dict)
@@ -274,36 +649,51 @@ def get_live_presence(
     if event.owner_id != current_user.id and current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Non autorisé")
     
-    total = db.query(Registration).filter(
-        Registration.event_id == event_id,
-        Registration.status != RegistrationStatus.CANCELLED
-    ).count()
+    # Lecture des compteurs maintenus sur l'événement (aucun COUNT sur registrations)
+    return presence_payload(event.participants_count, event.checked_in_count, event.checked_out_count)
+
+
+@router.get("/event/{event_id}/live/stream")
+def stream_live_presence(
+    event_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Flux SSE de la présence en temps réel - Organisateur uniquement
     
-    checked_in = db.query(Registration).filter(
-        Registration.event_id == event_id,
-        Registration.status == RegistrationStatus.CHECKED_IN
-    ).count()
+    Route synchrone : la vérification des droits s'exécute dans le pool de
+    threads. Le flux relit les compteurs à son ouverture puis après chaque
+    changement signalé par les routes d'inscription et de check-in (au plus
+    toutes les 250 ms).
+    """
+    event = db.query(Event).filter(Event.id == event_id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Événement non trouvé")
     
-    checked_out = db.query(Registration).filter(
-        Registration.event_id == event_id,
-        Registration.status == RegistrationStatus.CHECKED_OUT
-    ).count()
+    if event.owner_id != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Non autorisé")
     
-    return {
-        "total_registered": total,
-        "currently_present": checked_in,
-        "checked_out": checked_out,
-        "not_arrived": total - checked_in - checked_out
-    }
+    return StreamingResponse(
+        presence_hub.stream(event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/event/{event_id}/history", response_model=List[dict])
 def get_event_history(
     event_id: str,
+    response: Response,
+    status_filter: Optional[List[RegistrationStatus]] = Query(None, alias="status"),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Obtenir l'historique complet des check-in/check-out - Organisateur uniquement"""
+    """Obtenir l'historique complet des check-in/check-out - Organisateur uniquement
+    
+    Mêmes filtres et pagination que la liste des participants.
+    """
     event = db.query(Event).filter(Event.id == event_id).first()
     if not event:
         raise HTTPException(status_code=404, detail="Événement non trouvé")
@@ -311,24 +701,64 @@ def get_event_history(
     if event.owner_id != current_user.id and current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Non autorisé")
     
-    registrations = db.query(Registration).filter(
-        Registration.event_id == event_id
-    ).all()
+    rows = page_event_participants(db, event_id, status_filter, cursor, limit, response)
+    
+    return [history_entry(row) for row in rows]
+
+
+@router.get("/event/{event_id}/attendance", response_model=List[AttendanceLogResponse])
+def get_event_attendance(
+    event_id: str,
+    response: Response,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    registration_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Journal des entrées/sorties d'un événement sur une fenêtre de temps - Organisateur uniquement
+    
+    Par ordre chronologique ; le curseur de la page suivante est renvoyé dans l'en-tête X-Next-Cursor.
+    """
+    event = db.query(Event).filter(Event.id == event_id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Événement non trouvé")
+    
+    if event.owner_id != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Non autorisé")
+    
+    return query_attendance(db, event_id, start, end, registration_id, cursor, limit, response)
+
+
+@router.get("/event/{event_id}/history/export")
+def export_event_history(
+    event_id: str,
+    format: Literal["csv", "ndjson"] = "csv",
+    status_filter: Optional[List[RegistrationStatus]] = Query(None, alias="status"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Exporter l'historique des participants en CSV ou NDJSON (flux) - Organisateur uniquement
+    
+    Les lignes sont lues par lots via un curseur côté serveur et envoyées au fur
+    et à mesure : la mémoire reste constante quel que soit le nombre d'inscrits.
+    """
+    event = db.query(Event).filter(Event.id == event_id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Événement non trouvé")
     
-    history = []
-    for reg in registrations:
-        user = db.query(User).filter(User.id == reg.user_id).first()
-        history.append({
-            "id": reg.id,
-            "user_id": reg.user_id,
-            "user_name": user.name,
-            "user_email": user.email,
-            "user_profile_image": user.profile_image,
-            "status": reg.status.value,
-            "registered_at": reg.registered_at.isoformat() if reg.registered_at else None,
-            "checked_in_at": reg.checked_in_at.isoformat() if reg.checked_in_at else None,
-            "checked_out_at": reg.checked_out_at.isoformat() if reg.checked_out_at else None,
-            "cancelled_at": reg.cancelled_at.isoformat() if reg.cancelled_at else None,
-        })
-    
-    return history
+    if event.owner_id != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Non autorisé")
+    
+    # Le flux utilise sa propre session : celle de la requête est fermée avant l'envoi du corps
+    media_type, suffix = HISTORY_EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_event_history(SessionLocal(), event_id, status_filter, format),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="history-{event_id}{suffix}"',
+            "Cache-Control": "no-store",
+        }
+    )
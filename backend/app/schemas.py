@@ -1,7 +1,7 @@
-from pydantic import BaseModel, EmailStr, field_validator
-from typing import Optional, List
-from datetime import datetime
-from app.models import UserRole, EventStatus, RegistrationStatus
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Literal, Optional, List
+from datetime import date, datetime
+from app.models import UserRole, EventStatus, RegistrationStatus, AttendanceAction
 
 
 # ============== AUTH SCHEMAS ==============
@@ -97,6 +97,29 @@ class EventResponse(BaseModel):
         from_attributes = True
 
 
+class EventSuggestion(BaseModel):
+    value: str
+    type: Literal["category", "tag", "location", "title"]
+    count: int  # Événements publiés portant cette valeur
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int  # Événements retenus portant cette valeur
+
+
+class EventFacets(BaseModel):
+    category: List[FacetCount]
+    location: List[FacetCount]
+    tag: List[FacetCount]
+
+
+class EventSearchResults(BaseModel):
+    """Page d'événements et facettes (GET /api/events/?facets=true)"""
+    events: List[EventResponse]
+    facets: EventFacets
+
+
 class EventReject(BaseModel):
     reason: str
 
@@ -126,6 +149,34 @@ class ParticipantResponse(BaseModel):
     checked_out_at: Optional[datetime]
 
 
+class AttendanceLogResponse(BaseModel):
+    id: int
+    registration_id: str
+    action: AttendanceAction
+    ts: datetime
+    source: str
+
+    class Config:
+        from_attributes = True
+
+
+class ScanItem(BaseModel):
+    registration_id: str
+    scanned_at: Optional[datetime] = None  # Heure du scan côté scanner (défaut : réception)
+
+
+class ScanBatch(BaseModel):
+    scans: List[ScanItem] = Field(..., max_length=5000)
+
+
+class ScanResult(BaseModel):
+    registration_id: str
+    success: bool
+    status: Optional[RegistrationStatus] = None
+    duplicate: bool = False  # Scan déjà appliqué (renvoi d'un lot par le scanner)
+    error: Optional[str] = None
+
+
 # ============== ANALYTICS SCHEMAS ==============
 class GlobalAnalytics(BaseModel):
     total_users: int
@@ -149,6 +200,53 @@ class EventAnalytics(BaseModel):
     fill_rate: float
 
 
+class TimeseriesBucket(BaseModel):
+    start: datetime  # Début de l'intervalle (UTC)
+    arrivals: int
+    departures: int
+    occupancy: int  # Présents à la fin de l'intervalle
+
+
+class EventTimeseries(BaseModel):
+    event_id: str
+    interval: int  # Durée d'un intervalle (secondes)
+    buckets: List[TimeseriesBucket]
+
+
+class DailyAnalytics(BaseModel):
+    day: date
+    category: Optional[str] = None  # Renseigné si group_by=category
+    owner_id: Optional[str] = None  # Renseigné si group_by=owner
+    registrations: int
+    cancellations: int
+    check_ins: int
+    check_outs: int
+
+
+class EventReportRow(BaseModel):
+    key: Optional[str] = None  # Catégorie, organisateur ou statut (None sans regroupement)
+    events: int
+    capacity: int
+    registrations: int
+    checked_in: int
+    checked_out: int
+    no_show: int
+    cancelled: int
+    fill_rate: float
+    no_show_rate: float
+
+
+class RegistrationReportRow(BaseModel):
+    period_start: date
+    key: Optional[str] = None
+    registrations: int
+
+
+class ReportJobCreate(BaseModel):
+    kind: Literal["global", "dashboard", "dashboard_csv"]
+    user_id: Optional[str] = None  # Organisateur du dashboard (admin uniquement ; défaut : toute la plateforme)
+
+
 # ============== FAVORITE SCHEMAS ==============
 class FavoriteResponse(BaseModel):
     id: str
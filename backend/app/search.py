@@ -0,0 +1,372 @@
+"""Recherche plein texte des événements (titre et description).
+
+Deux moteurs derrière la même interface (`SearchBackend.search`), choisis
+selon la base (`SEARCH_BACKEND` = auto) :
+
+- `postgres` : colonne générée `events.search_vector` (tsvector, titre en
+  poids A, description en poids B) et index GIN `ix_events_search`, avec la
+  configuration `fr_unaccent` (racinisation française, accents ignorés) ;
+  classement par `ts_rank_cd`.
+- `memory` : index inversé propre au processus (SQLite, tests), avec une
+  analyse française simplifiée : minuscules, accents retirés, mots vides
+  ignorés, pluriels en -s / -x ramenés au singulier. Classement par somme
+  des IDF des termes, pondérée par le champ (titre 2, description 1).
+
+Dans les deux cas, tous les termes de la recherche doivent être présents
+(titre ou description) et les égalités de pertinence sont départagées par
+l'id. Les autres filtres (statut, catégorie, lieu) restent appliqués par la
+requête SQL fournie. Pour les facettes (app.facets), `SearchBackend.condition`
+exprime la recherche en condition SQL ; le moteur en mémoire n'y retient que
+les SEARCH_FACET_MAX résultats les plus pertinents, écrits dans une table
+temporaire de la connexion (`search_hits`) plutôt qu'en paramètres de requête.
+
+Contrairement à l'ancien `ILIKE '%q%'`, les termes sont comparés à des mots
+entiers (après normalisation) : un fragment de mot (« conf ») ne trouve plus
+« Conférence ». La saisie incomplète relève des suggestions (app.suggest).
+
+L'index en mémoire est rafraîchi au plus toutes les SEARCH_MAX_AGE secondes,
+par incréments (événements créés ou modifiés depuis le dernier passage), et
+immédiatement après une écriture du processus (`invalidate`).
+"""
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import DDL, Column, MetaData, String, Table, cast, event as sa_event, func, literal_column, select
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import Query, Session
+from app.config import get_settings
+from app.models import Event
+from app.utils import as_utc
+
+SEARCH_CONFIG = "fr_unaccent"  # Configuration de recherche PostgreSQL (french + unaccent)
+SEARCH_MAX_AGE = 5  # Âge maximal de l'index en mémoire avant rafraîchissement (secondes)
+SEARCH_LAG = 5  # Chevauchement relu à chaque rafraîchissement (secondes)
+SEARCH_BATCH = 10000  # Lignes lues par aller-retour
+SEARCH_CHUNK = 500  # Résultats classés filtrés par requête SQL
+SEARCH_FACET_MAX = 10000  # Résultats les plus pertinents comptés dans les facettes (moteur mémoire)
+
+# Résultats du moteur en mémoire pour les facettes (table temporaire, propre à la connexion)
+SEARCH_HITS = Table(
+    "search_hits", MetaData(),
+    Column("event_id", String, primary_key=True),
+    prefixes=["TEMPORARY"]
+)
+
+TITLE = 1
+DESCRIPTION = 2
+FIELD_WEIGHTS = {TITLE: 2.0, DESCRIPTION: 1.0, TITLE | DESCRIPTION: 3.0}
+
+STOP_WORDS = frozenset("""
+    a au aux avec c ce ces d dans de des du elle en et il j l la le les leur lui m ma mais me mes
+    n ne nos notre nous on ou par pas pour qu que qui s sa se ses son sur t ta te tes toi ton tu
+    un une vos votre vous y
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+LIGATURES = str.maketrans({"œ": "oe", "æ": "ae", "ß": "ss"})
+
+# DDL PostgreSQL, joué à la création de la table events (voir migration_add_event_search.sql)
+SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    f"""DO $$ BEGIN
+        CREATE TEXT SEARCH CONFIGURATION {SEARCH_CONFIG} (COPY = french);
+        ALTER TEXT SEARCH CONFIGURATION {SEARCH_CONFIG}
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+    EXCEPTION WHEN unique_violation THEN NULL;
+    END $$""",
+    f"""ALTER TABLE events ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_events_search ON events USING GIN (search_vector)",
+]
+for statement in SEARCH_DDL:
+    sa_event.listen(Event.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+
+def fold(text: str) -> str:
+    """Texte en minuscules, sans accents ni ligatures"""
+    folded = text.lower()
+    if not folded.isascii():
+        folded = unicodedata.normalize("NFKD", folded.translate(LIGATURES))
+        folded = "".join(char for char in folded if not unicodedata.combining(char))
+    return folded
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Termes d'un texte : minuscules, sans accents ni mots vides, pluriels ramenés au singulier"""
+    if not text:
+        return []
+    terms = []
+    for token in TOKEN_PATTERN.findall(fold(text)):
+        if token in STOP_WORDS:
+            continue
+        if len(token) > 3 and token[-1] in "sx":
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+class SearchBackend(ABC):
+    """Moteur de recherche plein texte des événements"""
+
+    name = ""
+
+    @abstractmethod
+    def search(self, db: Session, query: Query, text: str, skip: int, limit: int) -> List[Event]:
+        """Page `skip`/`limit` des événements de `query` correspondant à `text`, par pertinence décroissante"""
+
+    @abstractmethod
+    def condition(self, db: Session, text: str):
+        """Condition SQL retenant les événements correspondant à `text` (facettes, app.facets)"""
+
+    def invalidate(self) -> None:
+        """Signaler une écriture sur les événements (prise en compte à la prochaine recherche)"""
+
+
+class PostgresSearch(SearchBackend):
+    """Recherche par la colonne tsvector et son index GIN"""
+
+    name = "postgres"
+
+    def search(self, db: Session, query: Query, text: str, skip: int, limit: int) -> List[Event]:
+        vector = literal_column("events.search_vector")
+        ts_query = func.websearch_to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), text)
+        return query.filter(vector.op("@@")(ts_query)).order_by(
+            func.ts_rank_cd(vector, ts_query).desc(), Event.id
+        ).offset(skip).limit(limit).all()
+
+    def condition(self, db: Session, text: str):
+        ts_query = func.websearch_to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), text)
+        return literal_column("events.search_vector").op("@@")(ts_query)
+
+
+class InvertedIndex:
+    """Index inversé des titres et descriptions.
+
+    Chaque version d'un événement occupe une position ; les listes de
+    positions par terme (`array`) sont donc triées par construction. Une
+    modification ajoute une nouvelle position et marque l'ancienne comme
+    morte ; l'index est compacté quand les positions mortes sont majoritaires.
+    """
+
+    def __init__(self):
+        self.event_ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.alive = bytearray()
+        self.fingerprints = array("q")
+        self.postings: Dict[str, array] = {}
+        self.fields: Dict[str, bytearray] = {}
+        self.dead = 0
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def add(self, event_id: str, title: Optional[str], description: Optional[str]) -> None:
+        fingerprint = hash((title, description))
+        position = self.positions.get(event_id)
+        if position is not None:
+            if self.fingerprints[position] == fingerprint:
+                return  # Texte inchangé (ligne relue par chevauchement)
+            self._kill(position)
+
+        position = self.positions[event_id] = len(self.event_ids)
+        self.event_ids.append(event_id)
+        self.alive.append(1)
+        self.fingerprints.append(fingerprint)
+        terms: Dict[str, int] = {}
+        for term in tokenize(title):
+            terms[term] = terms.get(term, 0) | TITLE
+        for term in tokenize(description):
+            terms[term] = terms.get(term, 0) | DESCRIPTION
+        for term, fields in terms.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = array("I")
+                self.fields[term] = bytearray()
+            postings.append(position)
+            self.fields[term].append(fields)
+
+    def remove(self, event_id: str) -> None:
+        position = self.positions.pop(event_id, None)
+        if position is not None:
+            self._kill(position)
+
+    def _kill(self, position: int) -> None:
+        self.alive[position] = 0
+        self.dead += 1
+
+    def should_compact(self) -> bool:
+        return self.dead > len(self.positions)
+
+    def rank(self, text: str, top: Optional[int] = None) -> List[str]:
+        """Événements contenant tous les termes de `text`, par pertinence décroissante (puis id).
+
+        Avec `top`, seuls les `top` premiers sont classés (sélection partielle, sans tri complet).
+        """
+        terms = set(tokenize(text))
+        if not terms or any(term not in self.postings for term in terms):
+            return []
+        total = len(self.event_ids)
+        # Terme le plus rare d'abord : il fixe les candidats, les autres ne font que filtrer
+        ordered = sorted(terms, key=lambda term: len(self.postings[term]))
+
+        first = ordered[0]
+        idf = math.log(1 + total / len(self.postings[first]))
+        alive = self.alive
+        scores = {
+            position: idf * FIELD_WEIGHTS[fields]
+            for position, fields in zip(self.postings[first], self.fields[first])
+            if alive[position]
+        }
+        for term in ordered[1:]:
+            if not scores:
+                return []
+            postings, fields = self.postings[term], self.fields[term]
+            idf = math.log(1 + total / len(postings))
+            if len(scores) * 16 < len(postings):
+                # Peu de candidats : recherche dichotomique dans la liste triée
+                matched = {}
+                for position, score in scores.items():
+                    index = bisect_left(postings, position)
+                    if index < len(postings) and postings[index] == position:
+                        matched[position] = score + idf * FIELD_WEIGHTS[fields[index]]
+            else:
+                matched = {
+                    position: scores[position] + idf * FIELD_WEIGHTS[field]
+                    for position, field in zip(postings, fields)
+                    if position in scores
+                }
+            scores = matched
+
+        event_ids = self.event_ids
+        key = lambda item: (-item[1], event_ids[item[0]])
+        if top is not None and top < len(scores):
+            ranked = heapq.nsmallest(top, scores.items(), key=key)
+        else:
+            ranked = sorted(scores.items(), key=key)
+        return [event_ids[position] for position, _ in ranked]
+
+
+class MemorySearch(SearchBackend):
+    """Recherche par index inversé en mémoire, rafraîchi par incréments"""
+
+    name = "memory"
+
+    def __init__(self, max_age: float = SEARCH_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.refreshed_at = 0.0
+        self.index = InvertedIndex()
+        self.mark: Optional[datetime] = None
+
+    def invalidate(self) -> None:
+        self.refreshed_at = 0.0
+
+    def ensure_fresh(self, db: Session) -> None:
+        with self._lock:
+            if time.monotonic() - self.refreshed_at >= self.max_age:
+                self._refresh(db)
+
+    def _refresh(self, db: Session) -> None:
+        if self.mark is not None and self.index.should_compact():
+            self.index, self.mark = InvertedIndex(), None
+        incremental = self.mark is not None
+
+        modified = func.coalesce(Event.updated_at, Event.created_at)
+        query = db.query(Event.id, Event.title, Event.description, modified)
+        if self.mark is not None:
+            # Relecture d'un léger chevauchement : un texte inchangé n'est pas réindexé
+            query = query.filter(modified >= self.mark - timedelta(seconds=SEARCH_LAG))
+        for event_id, title, description, modified_at in query.yield_per(SEARCH_BATCH):
+            self.index.add(event_id, title, description)
+            if modified_at and (self.mark is None or as_utc(modified_at) > self.mark):
+                self.mark = as_utc(modified_at)
+        if incremental:
+            self._remove_deleted(db)
+        self.refreshed_at = time.monotonic()
+
+    def _remove_deleted(self, db: Session) -> None:
+        # Moins d'événements en base que dans l'index : seul cas où relire les ids est utile
+        if db.query(func.count(Event.id)).scalar() >= len(self.index):
+            return
+        existing = {event_id for event_id, in db.query(Event.id).yield_per(SEARCH_BATCH)}
+        for event_id in [event_id for event_id in self.index.positions if event_id not in existing]:
+            self.index.remove(event_id)
+
+    def search(self, db: Session, query: Query, text: str, skip: int, limit: int) -> List[Event]:
+        self.ensure_fresh(db)
+        # Les premiers résultats suffisent le plus souvent ; classement complet si les filtres en écartent trop
+        top = max(SEARCH_CHUNK, 2 * (skip + limit))
+        ranked = self.index.rank(text, top)
+        page_ids = self._filter_page(query, ranked, skip, limit)
+        if len(page_ids) < limit and len(ranked) == top:
+            page_ids = self._filter_page(query, self.index.rank(text), skip, limit)
+
+        events = {event.id: event for event in query.filter(Event.id.in_(page_ids))} if page_ids else {}
+        return [events[event_id] for event_id in page_ids if event_id in events]
+
+    def condition(self, db: Session, text: str):
+        self.ensure_fresh(db)
+        ranked = self.index.rank(text, SEARCH_FACET_MAX)
+        # Une table temporaire par connexion : la condition reste une sous-requête, quelle que soit
+        # la taille du résultat, au lieu d'un paramètre par id répété dans chaque branche des facettes
+        connection = db.connection()
+        SEARCH_HITS.create(connection, checkfirst=True)
+        connection.execute(SEARCH_HITS.delete())
+        if ranked:
+            connection.execute(SEARCH_HITS.insert(), [{"event_id": event_id} for event_id in ranked])
+        return Event.id.in_(select(SEARCH_HITS.c.event_id))
+
+    def _filter_page(self, query: Query, ranked: List[str], skip: int, limit: int) -> List[str]:
+        """Page `skip`/`limit` des ids classés retenus par les filtres SQL de `query`"""
+        page_ids: List[str] = []
+        matched = 0
+        for start in range(0, len(ranked), SEARCH_CHUNK):
+            chunk = ranked[start:start + SEARCH_CHUNK]
+            kept = {event_id for event_id, in query.with_entities(Event.id).filter(Event.id.in_(chunk))}
+            for event_id in chunk:
+                if event_id in kept:
+                    if matched >= skip:
+                        page_ids.append(event_id)
+                    matched += 1
+            if matched >= skip + limit:
+                break
+        return page_ids[:limit]
+
+
+SEARCH_BACKENDS = {
+    PostgresSearch.name: PostgresSearch,
+    MemorySearch.name: MemorySearch,
+}
+
+_backends: Dict[str, SearchBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_search_backend(db: Session) -> SearchBackend:
+    """Moteur configuré par SEARCH_BACKEND (auto : PostgreSQL si la base l'est, mémoire sinon)"""
+    name = get_settings().SEARCH_BACKEND
+    if name == "auto":
+        name = PostgresSearch.name if db.get_bind().dialect.name == "postgresql" else MemorySearch.name
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            backend = _backends[name] = SEARCH_BACKENDS[name]()
+    return backend
+
+
+def invalidate_search() -> None:
+    """Signaler une écriture sur les événements à tous les moteurs du processus"""
+    with _backends_lock:
+        backends = list(_backends.values())
+    for backend in backends:
+        backend.invalidate()
@@ -0,0 +1,331 @@
+"""Instantané en colonnes des événements et inscriptions pour les rapports admin.
+
+Les rapports transverses (taux de remplissage par catégorie, absences par
+organisateur, inscriptions par semaine...) sont calculés en mémoire sur des
+colonnes `array` plutôt que par des requêtes par événement :
+
+- événements : une position par événement ; catégorie, organisateur et statut
+  encodés par dictionnaire (un entier par ligne, chaque valeur distincte
+  stockée une fois), capacité, date de début et compteurs ;
+- inscriptions : position de l'événement et date d'inscription (faits
+  immuables, jamais modifiés une fois chargés), triées par date
+  d'inscription : une fenêtre de dates est une tranche des colonnes.
+
+L'instantané est rafraîchi au plus toutes les SNAPSHOT_MAX_AGE secondes, de
+façon incrémentale : événements modifiés depuis le dernier `updated_at` /
+`created_at` vu, inscriptions non encore chargées parmi celles postérieures à
+la dernière date chargée moins SNAPSHOT_REPLAY secondes (une transaction
+validée en retard, avec une date plus ancienne, est ainsi rattrapée). Les compteurs des événements, que app.counters met à jour sans
+toucher `updated_at`, sont relus en entier (une colonne entière par
+événement, jamais la table registrations) ; ce passage détecte aussi les
+événements supprimés. Comme le hub de présence, l'instantané est propre au
+processus.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.models import Event, EventStatus, Registration
+from app.utils import as_utc, epoch_seconds
+
+SNAPSHOT_MAX_AGE = 60  # Âge maximal de l'instantané avant rafraîchissement (secondes)
+SNAPSHOT_LAG = 5  # Inscriptions plus récentes laissées au rafraîchissement suivant (secondes)
+SNAPSHOT_REPLAY = 300  # Fenêtre relue derrière le point de reprise des inscriptions (secondes)
+SNAPSHOT_BATCH = 10000  # Lignes lues par aller-retour
+
+DELETED = 255  # Code de statut d'un événement supprimé
+
+EVENT_METRICS = (
+    "events", "capacity", "registrations", "checked_in", "checked_out", "no_show", "cancelled"
+)
+
+
+class Dictionary:
+    """Encodage par dictionnaire d'une colonne de chaînes"""
+
+    def __init__(self, values: Iterable[Optional[str]] = ()):
+        self.values: List[Optional[str]] = []
+        self.codes: Dict[Optional[str], int] = {}
+        for value in values:
+            self.encode(value)
+
+    def encode(self, value: Optional[str]) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: Optional[str]) -> Optional[int]:
+        return self.codes.get(value)
+
+
+def _epoch(value: Optional[datetime]) -> int:
+    return int(as_utc(value).timestamp()) if value else 0
+
+
+def period_start(day: int, period: str) -> date:
+    """Premier jour de la période (day, week : lundi, month) contenant le jour `day` depuis l'epoch"""
+    start = date(1970, 1, 1) + timedelta(days=day)
+    if period == "week":
+        return start - timedelta(days=start.weekday())
+    if period == "month":
+        return start.replace(day=1)
+    return start
+
+
+class AnalyticsSnapshot:
+    """Colonnes des événements et inscriptions, rafraîchies par incréments"""
+
+    def __init__(self, max_age: float = SNAPSHOT_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.refreshed_at = 0.0
+        # Événements : une position par événement
+        self.event_ids: List[str] = []
+        self.event_positions: Dict[str, int] = {}
+        self.categories = Dictionary()
+        self.owners = Dictionary()
+        self.statuses = Dictionary(status.value for status in EventStatus)
+        self.event_category = array("I")
+        self.event_owner = array("I")
+        self.event_status = array("B")
+        self.event_capacity = array("i")
+        self.event_start = array("q")
+        self.event_counters = {name: array("i") for name in EVENT_METRICS[2:]}
+        # Inscriptions : une position par inscription
+        self.registration_event = array("I")
+        self.registration_time = array("q")
+        # Points de reprise
+        self.events_mark: Optional[datetime] = None
+        self.registrations_mark: Optional[int] = None  # Date d'inscription la plus récente chargée (secondes)
+        self.recent_registrations: Dict[str, int] = {}  # Inscriptions de la fenêtre de relecture : id -> date
+
+    # ============== RAFRAÎCHISSEMENT ==============
+
+    def ensure_fresh(self, db: Session) -> None:
+        """Rafraîchir l'instantané s'il date de plus de max_age secondes"""
+        with self._lock:
+            if time.monotonic() - self.refreshed_at >= self.max_age:
+                self._refresh(db)
+
+    def refresh(self, db: Session) -> None:
+        with self._lock:
+            self._refresh(db)
+
+    def _refresh(self, db: Session) -> None:
+        self._load_events(db)
+        self._load_counters(db)
+        self._load_registrations(db)
+        self.refreshed_at = time.monotonic()
+
+    def _event_position(self, event_id: str) -> int:
+        position = self.event_positions.get(event_id)
+        if position is None:
+            position = self.event_positions[event_id] = len(self.event_ids)
+            self.event_ids.append(event_id)
+            for column in (self.event_category, self.event_owner, self.event_status,
+                           self.event_capacity, self.event_start, *self.event_counters.values()):
+                column.append(0)
+        return position
+
+    def _load_events(self, db: Session) -> None:
+        modified = func.coalesce(Event.updated_at, Event.created_at)
+        query = db.query(
+            Event.id, Event.category, Event.owner_id, Event.status,
+            Event.max_participants, Event.date_start, modified
+        )
+        if self.events_mark is not None:
+            # Relecture d'un léger chevauchement : une ligne relue est simplement réécrite
+            query = query.filter(modified >= self.events_mark - timedelta(seconds=SNAPSHOT_LAG))
+        for event_id, category, owner_id, status, capacity, date_start, modified_at in query.yield_per(SNAPSHOT_BATCH):
+            position = self._event_position(event_id)
+            self.event_category[position] = self.categories.encode(category)
+            self.event_owner[position] = self.owners.encode(owner_id)
+            self.event_status[position] = self.statuses.encode(status.value if status else None)
+            self.event_capacity[position] = capacity or 0
+            self.event_start[position] = _epoch(date_start)
+            if modified_at and (self.events_mark is None or as_utc(modified_at) > self.events_mark):
+                self.events_mark = as_utc(modified_at)
+
+    def _load_counters(self, db: Session) -> None:
+        columns = [getattr(Event, name) for name in
+                   ("participants_count", "checked_in_count", "checked_out_count", "no_show_count", "cancelled_count")]
+        seen = bytearray(len(self.event_ids))
+        for event_id, *counts in db.query(Event.id, *columns).yield_per(SNAPSHOT_BATCH):
+            position = self.event_positions.get(event_id)
+            if position is None:
+                continue  # Créé après la lecture des événements : pris au rafraîchissement suivant
+            seen[position] = 1
+            for column, count in zip(self.event_counters.values(), counts):
+                column[position] = count
+        for position, present in enumerate(seen):
+            if not present:
+                self.event_status[position] = DELETED
+
+    def _load_registrations(self, db: Session) -> None:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=SNAPSHOT_LAG)
+        # Dates converties en secondes par la base : aucun objet datetime par ligne
+        stmt = select(
+            Registration.event_id, epoch_seconds(db, Registration.registered_at), Registration.id
+        ).where(Registration.registered_at < cutoff)
+        if self.registrations_mark is not None:
+            # Relecture d'une fenêtre derrière le point de reprise : une inscription validée en retard
+            # (horodatée avant des inscriptions déjà chargées) est encore vue ; les lignes relues sont ignorées
+            replay_from = datetime.fromtimestamp(self.registrations_mark - SNAPSHOT_REPLAY, tz=timezone.utc)
+            stmt = stmt.where(Registration.registered_at >= replay_from)
+        stmt = stmt.order_by(Registration.registered_at, Registration.id)
+        result = db.connection().execute(stmt.execution_options(yield_per=SNAPSHOT_BATCH))
+        try:
+            self._append_registrations(result.partitions())
+        finally:
+            result.close()
+        if self.registrations_mark is not None:
+            # Oublier les inscriptions sorties de la fenêtre de relecture
+            horizon = self.registrations_mark - SNAPSHOT_REPLAY
+            self.recent_registrations = {
+                registration_id: registered
+                for registration_id, registered in self.recent_registrations.items() if registered >= horizon
+            }
+
+    def _append_registrations(self, partitions: Iterable[Sequence[tuple]]) -> None:
+        """Ajouter les inscriptions lues en gardant les colonnes triées par date.
+
+        S'arrête à la première inscription d'un événement inconnu (créé après la
+        lecture des événements) : le rafraîchissement suivant reprend à cette ligne.
+        """
+        positions = self.event_positions
+        events, times = self.registration_event, self.registration_time
+        recent = self.recent_registrations
+        for rows in partitions:
+            for event_id, registered, registration_id in rows:
+                if registration_id in recent:
+                    continue
+                position = positions.get(event_id)
+                if position is None:
+                    return
+                if times and registered < times[-1]:
+                    # Validée après des inscriptions plus récentes : insérée à sa place
+                    index = bisect_right(times, registered)
+                    events.insert(index, position)
+                    times.insert(index, registered)
+                else:
+                    events.append(position)
+                    times.append(registered)
+                recent[registration_id] = registered
+                if self.registrations_mark is None or registered > self.registrations_mark:
+                    self.registrations_mark = registered
+
+    # ============== REQUÊTES ==============
+
+    def _event_keys(
+        self,
+        group_by: Optional[str],
+        statuses: Optional[Sequence[str]] = None,
+        category: Optional[str] = None,
+        owner_id: Optional[str] = None
+    ) -> List[Optional[int]]:
+        """Clé de groupe de chaque événement (None : exclu par les filtres)"""
+        allowed = {self.statuses.lookup(status) for status in statuses} if statuses else None
+        category_code = self.categories.lookup(category) if category is not None else None
+        owner_code = self.owners.lookup(owner_id) if owner_id is not None else None
+        group_column = {
+            "category": self.event_category,
+            "owner": self.event_owner,
+            "status": self.event_status,
+        }.get(group_by)
+
+        keys: List[Optional[int]] = []
+        for position in range(len(self.event_ids)):
+            status = self.event_status[position]
+            if (
+                status == DELETED
+                or (allowed is not None and status not in allowed)
+                or (category is not None and self.event_category[position] != category_code)
+                or (owner_id is not None and self.event_owner[position] != owner_code)
+            ):
+                keys.append(None)
+            else:
+                keys.append(group_column[position] if group_column is not None else 0)
+        return keys
+
+    def _decode(self, group_by: Optional[str], key: int) -> Optional[str]:
+        dictionary = {"category": self.categories, "owner": self.owners, "status": self.statuses}.get(group_by)
+        return dictionary.values[key] if dictionary else None
+
+    def event_report(self, group_by: Optional[str] = None, **filters) -> List[dict]:
+        """Somme des métriques d'événements par groupe (catégorie, organisateur ou statut)"""
+        with self._lock:
+            keys = self._event_keys(group_by, **filters)
+            totals: Dict[int, List[int]] = {}
+            counters = list(self.event_counters.values())
+            for position, key in enumerate(keys):
+                if key is None:
+                    continue
+                sums = totals.setdefault(key, [0] * len(EVENT_METRICS))
+                sums[0] += 1
+                sums[1] += self.event_capacity[position]
+                for index, column in enumerate(counters, start=2):
+                    sums[index] += column[position]
+            rows = [
+                {"key": self._decode(group_by, key), **dict(zip(EVENT_METRICS, sums))}
+                for key, sums in totals.items()
+            ]
+        for row in rows:
+            row["fill_rate"] = round(row["registrations"] / row["capacity"] * 100, 1) if row["capacity"] else 0
+            row["no_show_rate"] = round(row["no_show"] / row["registrations"] * 100, 1) if row["registrations"] else 0
+        return sorted(rows, key=lambda row: (row["key"] is None, row["key"] or ""))
+
+    def registration_report(
+        self,
+        period: str = "week",
+        group_by: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        **filters
+    ) -> List[dict]:
+        """Nombre d'inscriptions par période (day, week, month), éventuellement par groupe d'événements"""
+        with self._lock:
+            keys = self._event_keys(group_by, **filters)
+            # Les inscriptions sont chargées par date croissante : la fenêtre est une tranche
+            times = self.registration_time
+            first = bisect_left(times, _epoch(start)) if start else 0
+            last = bisect_left(times, _epoch(end)) if end else len(times)
+            # Comptage par (groupe, jour) : boucle sur les deux colonnes sans objet par ligne
+            per_day = Counter(
+                (keys[position], registered // 86400)
+                for position, registered in zip(self.registration_event[first:last], times[first:last])
+                if keys[position] is not None
+            )
+            decoded = {key: self._decode(group_by, key) for key, _ in per_day}
+        counts: Counter = Counter()
+        for (key, day), count in per_day.items():
+            counts[(period_start(day, period), decoded[key])] += count
+        return [
+            {"period_start": period_start_day, "key": key, "registrations": count}
+            for (period_start_day, key), count in sorted(counts.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+        ]
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Octets occupés par les colonnes (hors identifiants d'événements)"""
+        def size(column: array) -> int:
+            return column.buffer_info()[1] * column.itemsize
+
+        events = sum(size(column) for column in (
+            self.event_category, self.event_owner, self.event_status,
+            self.event_capacity, self.event_start, *self.event_counters.values()
+        ))
+        return {
+            "events": len(self.event_ids),
+            "registrations": len(self.registration_event),
+            "event_columns_bytes": events,
+            "registration_columns_bytes": size(self.registration_event) + size(self.registration_time),
+        }
+
+
+analytics_snapshot = AnalyticsSnapshot()
@@ -0,0 +1,207 @@
+"""Suggestions de saisie (autocomplétion) sur les événements publiés.
+
+Les titres, catégories, lieux et tags des événements publiés sont gardés dans
+une liste triée de clés normalisées (minuscules, sans accents) : les
+suggestions d'un préfixe sont la tranche de la liste trouvée par `bisect`,
+sans requête SQL. Chaque mot d'un titre ou d'un lieu est aussi un point
+d'entrée : « jaz » trouve « Festival de jazz ».
+
+Les routes d'événements (création, modification, approbation, suppression)
+mettent la structure à jour après leur commit. Elle est chargée au premier
+appel du processus, puis reconstruite en tâche de fond toutes les
+SUGGEST_REBUILD secondes pour intégrer les écritures des autres processus ;
+les requêtes restent servies par la structure en place pendant ce temps.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import Event, EventStatus
+from app.search import STOP_WORDS, TOKEN_PATTERN, fold
+
+SUGGEST_LIMIT = 8  # Suggestions renvoyées par défaut
+SUGGEST_SCAN = 256  # Clés examinées au plus pour un préfixe
+SUGGEST_REBUILD = 300  # Intervalle de reconstruction depuis la base (secondes)
+SUGGEST_BATCH = 10000  # Lignes lues par aller-retour
+
+# Types de suggestion, dans l'ordre d'affichage à popularité égale
+CATEGORY, TAG, LOCATION, TITLE = range(4)
+SUGGEST_TYPES = ("category", "tag", "location", "title")
+
+Term = Tuple[int, str]  # (type, valeur affichée)
+Terms = Tuple[Term, ...]
+
+
+def event_terms(
+    status: Optional[EventStatus],
+    title: Optional[str],
+    category: Optional[str],
+    location: Optional[str],
+    tags: Optional[list]
+) -> Terms:
+    """Termes suggérés pour un événement, sans doublons (aucun s'il n'est pas publié)"""
+    if status != EventStatus.PUBLISHED:
+        return ()
+    values = [(TITLE, title), (CATEGORY, category), (LOCATION, location)]
+    values += [(TAG, tag) for tag in tags or [] if isinstance(tag, str)]
+    return tuple({(kind, value.strip()) for kind, value in values if value and value.strip()})
+
+
+def term_keys(term: Term) -> List[str]:
+    """Clés normalisées d'un terme : la valeur entière, plus chaque mot pour les titres et lieux"""
+    kind, value = term
+    folded = fold(value)
+    keys = {folded}
+    if kind in (TITLE, LOCATION):
+        for match in TOKEN_PATTERN.finditer(folded):
+            if match.group() not in STOP_WORDS:
+                keys.add(folded[match.start():])
+    return sorted(keys)
+
+
+class SuggestIndex:
+    """Liste triée des clés (clé, type, valeur) et nombre d'événements publiés par terme.
+
+    Les termes de chaque événement sont conservés pour calculer la différence
+    lors d'une mise à jour ; ils pointent vers les tuples partagés de `counts`
+    (une catégorie, un lieu ou un tag n'est stocké qu'une fois).
+    """
+
+    def __init__(self):
+        self.keys: List[Tuple[str, int, str]] = []
+        self.counts: Dict[Term, int] = {}
+        self.canonical: Dict[Term, Term] = {}
+        self.events: Dict[str, Terms] = {}
+
+    def _intern(self, terms: Terms) -> Terms:
+        canonical = self.canonical
+        return tuple(canonical.setdefault(term, term) for term in terms)
+
+    def add_loaded(self, event_id: str, terms: Terms) -> None:
+        """Ajouter un événement sans trier les clés (chargement, voir `sort_keys`)"""
+        if terms:
+            terms = self.events[event_id] = self._intern(terms)
+            for term in terms:
+                self.counts[term] = self.counts.get(term, 0) + 1
+
+    def sort_keys(self) -> None:
+        self.keys = sorted((key, *term) for term in self.counts for key in term_keys(term))
+
+    def set_event(self, event_id: str, terms: Terms) -> None:
+        """Remplacer les termes d'un événement (aucun terme : retiré)"""
+        previous = set(self.events.pop(event_id, ()))
+        terms = self._intern(terms)
+        if terms:
+            self.events[event_id] = terms
+        for term in set(terms) - previous:
+            count = self.counts.get(term, 0)
+            if count == 0:
+                for key in term_keys(term):
+                    insort(self.keys, (key, *term))
+            self.counts[term] = count + 1
+        for term in previous - set(terms):
+            count = self.counts.pop(term) - 1
+            if count:
+                self.counts[term] = count
+                continue
+            del self.canonical[term]
+            for key in term_keys(term):
+                entry = (key, *term)
+                position = bisect_left(self.keys, entry)
+                if position < len(self.keys) and self.keys[position] == entry:
+                    del self.keys[position]
+
+    def suggest(self, prefix: str, limit: int) -> List[dict]:
+        """Termes dont une clé commence par `prefix`, les plus fréquents d'abord"""
+        prefix = fold(prefix).strip()
+        if not prefix:
+            return []
+        keys = self.keys
+        matches = set()
+        position = bisect_left(keys, (prefix,))
+        end = min(len(keys), position + SUGGEST_SCAN)
+        while position < end and keys[position][0].startswith(prefix):
+            matches.add(keys[position][1:])
+            position += 1
+        ranked = sorted(matches, key=lambda term: (-self.counts[term], term[0], len(term[1]), term[1]))
+        return [
+            {"value": value, "type": SUGGEST_TYPES[kind], "count": self.counts[(kind, value)]}
+            for kind, value in ranked[:limit]
+        ]
+
+
+class EventSuggestions:
+    """Index de suggestions du processus, mis à jour par les routes et reconstruit périodiquement"""
+
+    def __init__(self, rebuild_after: float = SUGGEST_REBUILD):
+        self.rebuild_after = rebuild_after
+        self.index: Optional[SuggestIndex] = None
+        self.built_at = 0.0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._rebuilding = False
+        # Écritures reçues pendant une reconstruction, rejouées sur le nouvel index
+        self._replay: Optional[Dict[str, Terms]] = None
+
+    def suggest(self, prefix: str, limit: int = SUGGEST_LIMIT) -> List[dict]:
+        if self.index is None:
+            self._rebuild()  # Premier appel du processus : chargement synchrone
+        elif time.monotonic() - self.built_at >= self.rebuild_after and not self._rebuilding:
+            self._rebuilding = True
+            threading.Thread(target=self._rebuild, name="suggest-rebuild", daemon=True).start()
+        with self._lock:
+            return self.index.suggest(prefix, limit)
+
+    def update_event(self, event: Event) -> None:
+        """Répercuter l'état d'un événement (après commit)"""
+        self._set(event.id, event_terms(event.status, event.title, event.category, event.location, event.tags))
+
+    def remove_event(self, event_id: str) -> None:
+        self._set(event_id, ())
+
+    def _set(self, event_id: str, terms: Terms) -> None:
+        with self._lock:
+            if self.index is not None:
+                self.index.set_event(event_id, terms)
+            if self._replay is not None:
+                self._replay[event_id] = terms
+
+    def load(self, db: Session) -> None:
+        """(Re)construire l'index depuis la base"""
+        with self._load_lock:
+            self._load(db)
+
+    def _load(self, db: Session) -> None:
+        with self._lock:
+            self._replay = {}
+        index = SuggestIndex()
+        rows = db.query(
+            Event.id, Event.title, Event.category, Event.location, Event.tags
+        ).filter(Event.status == EventStatus.PUBLISHED).yield_per(SUGGEST_BATCH)
+        for event_id, title, category, location, tags in rows:
+            index.add_loaded(event_id, event_terms(EventStatus.PUBLISHED, title, category, location, tags))
+        index.sort_keys()
+        with self._lock:
+            for event_id, terms in self._replay.items():
+                index.set_event(event_id, terms)
+            self._replay = None
+            self.index = index
+            self.built_at = time.monotonic()
+
+    def _rebuild(self) -> None:
+        try:
+            with self._load_lock:
+                # Un appel concurrent a pu reconstruire l'index pendant l'attente du verrou
+                if self.index is None or time.monotonic() - self.built_at >= self.rebuild_after:
+                    db = SessionLocal()
+                    try:
+                        self._load(db)
+                    finally:
+                        db.close()
+        finally:
+            self._rebuilding = False
+
+
+event_suggestions = EventSuggestions()
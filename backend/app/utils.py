@@ -1,8 +1,11 @@
 import os
 import shutil
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 from fastapi import UploadFile, HTTPException
+from sqlalchemy import BigInteger, cast, func
+from sqlalchemy.orm import Session
 import uuid
 
 # Configuration des dossiers d'upload
@@ -91,3 +94,27 @@ def delete_image(image_path: Optional[str]) -> None:
     except Exception as e:
         # Ne pas lever d'erreur si la suppression échoue
         print(f"Erreur lors de la suppression de l'image: {e}")
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Normaliser une date en UTC (les dates naïves sont considérées comme UTC)"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def epoch_seconds(db: Session, column):
+    """Secondes UTC depuis l'epoch d'une colonne de date, calculées par la base"""
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(func.floor(func.extract("epoch", column)), BigInteger)
+    # SQLite : dates stockées en UTC
+    return cast(func.strftime("%s", column), BigInteger)
+
+
+def csv_cell(value):
+    """Neutraliser les cellules interprétées comme formules par les tableurs"""
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@"):
+        return "'" + value
+    return value
@@ -0,0 +1,800 @@
+"""Benchmarks des requêtes de lecture.
+
+    python benchmark.py participants [--sizes 100,1000,10000]
+    python benchmark.py export [--sizes 10000,100000]
+    python benchmark.py presence [--subscribers 1000] [--updates 10000]
+    python benchmark.py global [--sizes 100000,1000000]
+    python benchmark.py dashboard [--sizes 1000,10000,100000]
+    python benchmark.py timeseries [--sizes 10000,100000]
+    python benchmark.py snapshot [--sizes 100000,1000000]
+    python benchmark.py search [--sizes 100000,1000000]
+    python benchmark.py suggest [--sizes 100000,1000000]
+    python benchmark.py facets [--sizes 100000,1000000]
+    python benchmark.py pages [--sizes 100000,1000000]
+    python benchmark.py plans [--sizes 100000,1000000]
+
+La base est lue depuis BENCH_DATABASE_URL (défaut : SQLite en mémoire) et
+peuplée par le script ; ne pas pointer vers une base de production.
+"""
+import argparse
+import asyncio
+import json
+import threading
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from fastapi import Response
+from sqlalchemy import create_engine, event as sa_event, insert, or_
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from app.counters import rebuild_counters
+from app.presence import PRESENCE_INTERVAL, PresenceHub
+from app.attendance import attendance_timeseries
+from app.snapshot import AnalyticsSnapshot
+from app.facets import event_facets, tag_conditions
+from app.pagination import NEXT_CURSOR_HEADER, encode_cursor, keyset_page
+from app.search import get_search_backend
+from app.suggest import EventSuggestions, event_terms
+from app.models import (
+    AttendanceAction, AttendanceLog, Event, EventStatus, EventTag, Favorite, Registration, RegistrationStatus, User, generate_uuid
+)
+from app.routes.events import EVENT_CURSOR_TYPES, EVENT_PAGE_ORDER
+from app.routes.analytics import DASHBOARD_PAGE_SIZE, compute_dashboard, compute_global_analytics
+from app.routes.registrations import history_entry, page_event_participants, stream_event_history
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite://")
+REPEAT = 3
+
+
+def make_session_factory():
+    if BENCH_DATABASE_URL.startswith("sqlite"):
+        engine = create_engine(
+            BENCH_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+    else:
+        engine = create_engine(BENCH_DATABASE_URL)
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(bind=engine)
+
+
+@contextmanager
+def count_statements(engine):
+    """Compter les requêtes SQL exécutées dans le bloc"""
+    counter = {"statements": 0}
+
+    def before_execute(*args):
+        counter["statements"] += 1
+
+    sa_event.listen(engine, "before_cursor_execute", before_execute)
+    try:
+        yield counter
+    finally:
+        sa_event.remove(engine, "before_cursor_execute", before_execute)
+
+
+def timed(engine, fn):
+    """(meilleur temps en ms, nombre de requêtes) sur REPEAT exécutions"""
+    best = None
+    for _ in range(REPEAT):
+        with count_statements(engine) as counter:
+            start = time.perf_counter()
+            fn()
+            elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, counter["statements"]
+
+
+def seed_event(db: Session, participants: int) -> str:
+    """Créer un événement publié avec `participants` inscrits"""
+    now = datetime.now(timezone.utc)
+    owner = User(id=generate_uuid(), email=f"owner-{generate_uuid()}@bench.local", password="x", name="Bench")
+    event = Event(
+        id=generate_uuid(), title="Benchmark", date_start=now + timedelta(days=1),
+        date_end=now + timedelta(days=1, hours=2), owner_id=owner.id, status=EventStatus.PUBLISHED,
+        max_participants=participants, participants_count=participants
+    )
+    db.add_all([owner, event])
+    statuses = list(RegistrationStatus)
+    users, registrations = [], []
+    for i in range(participants):
+        user_id = generate_uuid()
+        users.append({"id": user_id, "email": f"{user_id}@bench.local", "password": "x", "name": f"Participant {i}"})
+        registrations.append({
+            "id": generate_uuid(), "user_id": user_id, "event_id": event.id,
+            "status": statuses[i % len(statuses)], "registered_at": now - timedelta(seconds=participants - i)
+        })
+    db.flush()
+    db.bulk_insert_mappings(User, users)
+    db.bulk_insert_mappings(Registration, registrations)
+    db.commit()
+    return event.id
+
+
+# ============== PARTICIPANTS / HISTORIQUE ==============
+def participants_per_row(db: Session, event_id: str) -> list:
+    """Ancienne implémentation : une requête User par inscription"""
+    history = []
+    for reg in db.query(Registration).filter(Registration.event_id == event_id).all():
+        user = db.query(User).filter(User.id == reg.user_id).first()
+        history.append((reg.id, user.name, user.email, reg.status))
+    return history
+
+
+def participants_projected(db: Session, event_id: str, limit=None) -> list:
+    """Implémentation actuelle : une requête projetée (jointure User)"""
+    return page_event_participants(db, event_id, None, None, limit, Response())
+
+
+def bench_participants(sizes):
+    engine, SessionFactory = make_session_factory()
+    print(f"{'inscrits':>9} | {'par ligne':>22} | {'projetée':>20} | {'page de 100':>18}")
+    for size in sizes:
+        db = SessionFactory()
+        event_id = seed_event(db, size)
+        old_ms, old_queries = timed(engine, lambda: (db.expunge_all(), participants_per_row(db, event_id)))
+        new_ms, new_queries = timed(engine, lambda: participants_projected(db, event_id))
+        page_ms, page_queries = timed(engine, lambda: participants_projected(db, event_id, limit=100))
+        print(
+            f"{size:>9} | {old_ms:>9.1f} ms {old_queries:>6} req | {new_ms:>7.1f} ms {new_queries:>6} req"
+            f" | {page_ms:>6.1f} ms {page_queries:>4} req"
+        )
+        db.close()
+
+
+# ============== EXPORT DE L'HISTORIQUE ==============
+def export_in_memory(db: Session, event_id: str):
+    """Ancienne approche : liste complète de dicts puis un seul document JSON"""
+    rows = page_event_participants(db, event_id, None, None, None, Response())
+    yield json.dumps([history_entry(row) for row in rows])
+
+
+def measure_stream(chunks):
+    """(premier morceau en ms, total en ms, pic mémoire Python en Mo)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    for _ in chunks:
+        if first is None:
+            first = (time.perf_counter() - start) * 1000
+    total = (time.perf_counter() - start) * 1000
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return first, total, peak
+
+
+def bench_export(sizes):
+    engine, SessionFactory = make_session_factory()
+    print(f"{'inscrits':>9} | {'en mémoire (1er octet / total / pic)':>38} | {'flux CSV (1er octet / total / pic)':>36}")
+    for size in sizes:
+        db = SessionFactory()
+        event_id = seed_event(db, size)
+        db.close()
+        old = measure_stream(export_in_memory(SessionFactory(), event_id))
+        new = measure_stream(stream_event_history(SessionFactory(), event_id, None, "csv"))
+        print(
+            f"{size:>9} | {old[0]:>9.0f} ms {old[1]:>9.0f} ms {old[2]:>8.1f} Mo"
+            f" | {new[0]:>7.0f} ms {new[1]:>9.0f} ms {new[2]:>8.1f} Mo"
+        )
+
+
+# ============== PRÉSENCE EN TEMPS RÉEL ==============
+async def run_presence(subscribers: int, updates: int):
+    # Compteurs de l'événement, relus par le hub à chaque diffusion (en base pour le vrai hub)
+    counts = {"participants_count": updates, "checked_in_count": 0}
+    hub = PresenceHub(PRESENCE_INTERVAL, lambda event_id: dict(counts))
+    received = [0] * subscribers
+    ready = asyncio.Event()
+
+    async def consume(index: int):
+        async for _ in hub.stream("event"):
+            received[index] += 1
+            if hub.subscriber_count("event") == subscribers:
+                ready.set()
+
+    tasks = [asyncio.create_task(consume(i)) for i in range(subscribers)]
+    await ready.wait()
+
+    # Les routes de check-in publient depuis les threads du pool de FastAPI
+    publish_times = []
+
+    def publisher():
+        for _ in range(updates):
+            start = time.perf_counter()
+            counts["checked_in_count"] += 1
+            hub.publish("event")
+            publish_times.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    thread = threading.Thread(target=publisher)
+    thread.start()
+    # Mesurer la réactivité de la boucle pendant la diffusion
+    lags = []
+    while thread.is_alive():
+        tick = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - tick - 0.01)
+    await asyncio.sleep(PRESENCE_INTERVAL * 2)
+    elapsed = time.perf_counter() - start
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    publish_times.sort()
+    print(f"abonnés : {subscribers}, mises à jour publiées : {updates} en {elapsed:.2f} s")
+    print(f"publish() : médiane {publish_times[len(publish_times) // 2] * 1e6:.1f} µs, "
+          f"p99 {publish_times[int(len(publish_times) * 0.99)] * 1e6:.1f} µs")
+    print(f"messages reçus par abonné : {min(received)} à {max(received)} (coalescés toutes les {PRESENCE_INTERVAL * 1000:.0f} ms)")
+    print(f"retard max de la boucle d'événements : {max(lags, default=0) * 1000:.1f} ms")
+
+
+def bench_presence(subscribers: int, updates: int):
+    asyncio.run(run_presence(subscribers, updates))
+
+
+# ============== STATISTIQUES GLOBALES ==============
+SEED_CHUNK = 50000
+SEED_USERS = 1000  # Chaque utilisateur s'inscrit une fois à chaque événement
+
+
+def seed_platform(db: Session, registrations: int) -> None:
+    """Peupler la plateforme : `registrations` inscriptions sur registrations / SEED_USERS événements"""
+    now = datetime.now(timezone.utc)
+    user_ids = [generate_uuid() for _ in range(SEED_USERS)]
+    db.execute(insert(User), [
+        {"id": user_id, "email": f"{user_id}@bench.local", "password": "x", "name": "Bench"} for user_id in user_ids
+    ])
+    event_statuses = list(EventStatus)
+    event_ids = [generate_uuid() for _ in range(max(1, registrations // SEED_USERS))]
+    db.execute(insert(Event), [
+        {
+            "id": event_id, "title": f"Événement {i}", "owner_id": user_ids[i % SEED_USERS],
+            "status": event_statuses[i % len(event_statuses)], "date_start": now, "date_end": now
+        }
+        for i, event_id in enumerate(event_ids)
+    ])
+    statuses = list(RegistrationStatus)
+    for start in range(0, registrations, SEED_CHUNK):
+        db.execute(insert(Registration), [
+            {
+                "id": generate_uuid(), "user_id": user_ids[i % SEED_USERS], "event_id": event_ids[i // SEED_USERS],
+                "status": statuses[i % len(statuses)], "registered_at": now - timedelta(minutes=1 + i % 525600)
+            }
+            for i in range(start, min(start + SEED_CHUNK, registrations))
+        ])
+    db.commit()
+    rebuild_counters(db)
+
+
+def global_per_status(db: Session) -> dict:
+    """Ancienne implémentation : un COUNT par total et par statut (14 requêtes)"""
+    result = {
+        "total_users": db.query(User).count(),
+        "total_events": db.query(Event).count(),
+        "total_registrations": db.query(Registration).count(),
+    }
+    for status in EventStatus:
+        result[status.value] = db.query(Event).filter(Event.status == status).count()
+    for status in RegistrationStatus:
+        result[status.value] = db.query(Registration).filter(Registration.status == status).count()
+    return result
+
+
+def bench_global(sizes):
+    print(f"{'inscriptions':>12} | {'un COUNT par statut':>24} | {'compteurs par événement':>22} | résultat")
+    for size in sizes:
+        engine, SessionFactory = make_session_factory()
+        db = SessionFactory()
+        seed_platform(db, size)
+        old_ms, old_queries = timed(engine, lambda: global_per_status(db))
+        new_ms, new_queries = timed(engine, lambda: compute_global_analytics(db))
+        old, new = global_per_status(db), compute_global_analytics(db)
+        same = all(old[status] == count for status, count in new.registrations_by_status.items())
+        print(
+            f"{size:>12} | {old_ms:>12.1f} ms {old_queries:>4} req | {new_ms:>10.1f} ms {new_queries:>4} req"
+            f" | {'identique' if same else 'DIFFÉRENT'}"
+        )
+        db.close()
+        engine.dispose()
+
+
+def seed_events(db: Session, count: int) -> None:
+    """Peupler `count` événements d'un même organisateur, avec des compteurs variés"""
+    now = datetime.now(timezone.utc)
+    owner_id = generate_uuid()
+    db.add(User(id=owner_id, email=f"{owner_id}@bench.local", password="x", name="Bench"))
+    db.flush()
+    event_statuses = list(EventStatus)
+    for start in range(0, count, SEED_CHUNK):
+        db.execute(insert(Event), [
+            {
+                "id": generate_uuid(), "title": f"Événement {i}", "owner_id": owner_id,
+                "status": event_statuses[i % len(event_statuses)], "date_start": now, "date_end": now,
+                "max_participants": 100 + i % 7, "participants_count": i % 101,
+                "checked_in_count": i % 31, "checked_out_count": i % 13
+            }
+            for i in range(start, min(start + SEED_CHUNK, count))
+        ])
+    db.commit()
+
+
+def dashboard_all_events(db: Session) -> dict:
+    """Ancienne version : chargement de tous les événements et totaux calculés en Python"""
+    events = db.query(Event).all()
+    stats = [
+        {
+            "event_id": event.id,
+            "registrations": event.participants_count,
+            "fill_rate": round((event.participants_count / event.max_participants) * 100, 1)
+        }
+        for event in events
+    ]
+    return {
+        "total_events": len(events),
+        "total_registrations": sum(event.participants_count for event in events),
+        "events": stats
+    }
+
+
+def bench_dashboard(sizes):
+    print(f"{'événements':>10} | {'tous les événements':>22} | {'agrégat + page de 100':>22} | totaux")
+    for size in sizes:
+        engine, SessionFactory = make_session_factory()
+        db = SessionFactory()
+        seed_events(db, size)
+        old_ms, old_queries = timed(engine, lambda: dashboard_all_events(db))
+        new_ms, new_queries = timed(
+            engine, lambda: compute_dashboard(db, None, "fill_rate", "desc", 0, DASHBOARD_PAGE_SIZE)
+        )
+        old = dashboard_all_events(db)
+        new = compute_dashboard(db, None, "fill_rate", "desc", 0, DASHBOARD_PAGE_SIZE)
+        same = (old["total_events"], old["total_registrations"]) == (new["total_events"], new["total_registrations"])
+        print(
+            f"{size:>10} | {old_ms:>10.1f} ms {old_queries:>4} req | {new_ms:>10.1f} ms {new_queries:>4} req"
+            f" | {'identiques' if same else 'DIFFÉRENTS'}"
+        )
+        db.close()
+        engine.dispose()
+
+
+def seed_attendance(db: Session, event_id: str, movements: int) -> datetime:
+    """Ajouter `movements` mouvements répartis sur 3 heures (une sortie pour trois entrées)"""
+    opening = datetime(2026, 6, 1, 18, 0, tzinfo=timezone.utc)
+    registration_ids = [row[0] for row in db.query(Registration.id).filter(Registration.event_id == event_id)]
+    for start in range(0, movements, SEED_CHUNK):
+        db.execute(insert(AttendanceLog), [
+            {
+                "event_id": event_id, "registration_id": registration_ids[i % len(registration_ids)],
+                "action": AttendanceAction.CHECK_OUT if i % 4 == 3 else AttendanceAction.CHECK_IN,
+                "ts": opening + timedelta(seconds=(i * 10800) // movements), "source": "scan"
+            }
+            for i in range(start, min(start + SEED_CHUNK, movements))
+        ])
+    db.commit()
+    return opening
+
+
+def timeseries_in_python(db: Session, event_id: str, interval: int) -> dict:
+    """Version naïve : tous les mouvements chargés puis regroupés en Python"""
+    buckets = {}
+    for ts, action in db.query(AttendanceLog.ts, AttendanceLog.action).filter(AttendanceLog.event_id == event_id):
+        counts = buckets.setdefault(int(ts.replace(tzinfo=timezone.utc).timestamp()) // interval, [0, 0])
+        counts[action == AttendanceAction.CHECK_OUT] += 1
+    return buckets
+
+
+def bench_timeseries(sizes):
+    print(f"{'mouvements':>10} | {'lignes chargées':>16} | {'GROUP BY en base':>16} | intervalles")
+    for size in sizes:
+        engine, SessionFactory = make_session_factory()
+        db = SessionFactory()
+        event_id = seed_event(db, min(size, 10000))
+        seed_attendance(db, event_id, size)
+        old_ms, _ = timed(engine, lambda: timeseries_in_python(db, event_id, 60))
+        new_ms, _ = timed(engine, lambda: attendance_timeseries(db, event_id, 60, None, None))
+        buckets = attendance_timeseries(db, event_id, 60, None, None)
+        print(f"{size:>10} | {old_ms:>13.1f} ms | {new_ms:>13.1f} ms | {len(buckets)}")
+        db.close()
+        engine.dispose()
+
+
+def bench_snapshot(sizes):
+    print(
+        f"{'inscriptions':>12} | {'chargement':>10} | {'incrément':>9} | {'mémoire':>9} | {'octets/inscr.':>13}"
+        f" | {'par catégorie':>13} | {'par semaine':>11}"
+    )
+    for size in sizes:
+        engine, SessionFactory = make_session_factory()
+        db = SessionFactory()
+        seed_platform(db, size)
+        snapshot = AnalyticsSnapshot()
+        start = time.perf_counter()
+        snapshot.refresh(db)
+        load_ms = (time.perf_counter() - start) * 1000
+        # Mémoire retenue mesurée sur un second chargement (tracemalloc ralentit le chargement)
+        tracemalloc.start()
+        measured = AnalyticsSnapshot()
+        measured.refresh(db)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del measured
+        start = time.perf_counter()
+        snapshot.refresh(db)
+        refresh_ms = (time.perf_counter() - start) * 1000
+        usage = snapshot.memory_usage()
+        per_registration = usage["registration_columns_bytes"] / usage["registrations"]
+        start = time.perf_counter()
+        snapshot.event_report("category")
+        category_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        snapshot.registration_report("week", "owner")
+        week_ms = (time.perf_counter() - start) * 1000
+        print(
+            f"{size:>12} | {load_ms:>7.0f} ms | {refresh_ms:>6.0f} ms | {memory / 1e6:>6.1f} Mo | {per_registration:>13.1f}"
+            f" | {category_ms:>10.1f} ms | {week_ms:>8.0f} ms"
+        )
+        db.close()
+        engine.dispose()
+
+
+# Vocabulaire des événements générés : un thème sur dix dans chaque titre, du remplissage ailleurs
+SEARCH_THEMES = [
+    "Festival", "Concert", "Atelier", "Conférence", "Théâtre",
+    "Exposition", "Randonnée", "Dégustation", "Cinéma", "Marché",
+]
+SEARCH_FILLER = 5000
+SEARCH_QUERIES = ["festival", "theatre mot42", "mot4999", "introuvable"]
+
+
+def seed_search(db: Session, count: int) -> None:
+    """Peupler `count` événements publiés avec des titres et descriptions variés"""
+    now = datetime.now(timezone.utc)
+    owner_id = generate_uuid()
+    db.add(User(id=owner_id, email=f"{owner_id}@bench.local", password="x", name="Bench"))
+    db.flush()
+    for start in range(0, count, SEED_CHUNK):
+        events = [
+            {
+                "id": generate_uuid(), "owner_id": owner_id, "status": EventStatus.PUBLISHED,
+                "title": f"{SEARCH_THEMES[i % len(SEARCH_THEMES)]} mot{i * 7 % SEARCH_FILLER}",
+                "description": " ".join(f"mot{(i * 31 + k * 17) % SEARCH_FILLER}" for k in range(12)),
+                "category": f"Catégorie {i % 50}", "location": f"Ville {i % 2000}",
+                "tags": list(dict.fromkeys([f"tag{i % 300}", f"tag{i % 7}"])),
+                "date_start": now + timedelta(minutes=i % 10000), "date_end": now
+            }
+            for i in range(start, min(start + SEED_CHUNK, count))
+        ]
+        db.execute(insert(Event), events)
+        db.execute(insert(EventTag), [{"event_id": event["id"], "tag": tag} for event in events for tag in event["tags"]])
+    db.commit()
+
+
+def search_ilike(db: Session, text: str) -> list:
+    """Ancienne version : ILIKE '%q%' sur le titre et la description (parcours complet)"""
+    return db.query(Event).filter(
+        Event.status == EventStatus.PUBLISHED,
+        or_(Event.title.ilike(f"%{text}%"), Event.description.ilike(f"%{text}%"))
+    ).order_by(Event.date_start.asc()).limit(20).all()
+
+
+def bench_search(sizes):
+    print(f"{'événements':>10} | {'moteur':>8} | {'index':>7} | {'mémoire':>9} | {'recherche':>16} | {'ILIKE':>9} | {'moteur':>9} | résultats")
+    for size in sizes:
+        engine, SessionFactory = make_session_factory()
+        db = SessionFactory()
+        seed_search(db, size)
+        backend = get_search_backend(db)
+        published = db.query(Event).filter(Event.status == EventStatus.PUBLISHED)
+        index_ms, memory = 0.0, 0
+        if hasattr(backend, "ensure_fresh"):
+            start = time.perf_counter()
+            backend.ensure_fresh(db)
+            index_ms = (time.perf_counter() - start) * 1000
+            # Mémoire retenue mesurée sur un second index (tracemalloc ralentit la construction)
+            tracemalloc.start()
+            measured = type(backend)()
+            measured.ensure_fresh(db)
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del measured
+        for text in SEARCH_QUERIES:
+            old_ms, _ = timed(engine, lambda: search_ilike(db, text))
+            new_ms, _ = timed(engine, lambda: backend.search(db, published, text, 0, 20))
+            found = len(backend.search(db, published, text, 0, 20))
+            print(
+                f"{size:>10} | {backend.name:>8} | {index_ms / 1000:>5.1f} s | {memory / 1e6:>6.1f} Mo | {text:>16}"
+                f" | {old_ms:>6.1f} ms | {new_ms:>6.1f} ms | {found}"
+            )
+        db.close()
+        engine.dispose()
+
+
+SUGGEST_PREFIXES = ["f", "fes", "mot42", "ville 1", "tag2", "zzz"]
+
+
+def bench_suggest(sizes):
+    print(f"{'événements':>10} | {'chargement':>10} | {'mémoire':>9} | {'clés':>9} | {'préfixe':>8} | {'suggestion':>10} | {'mise à jour':>11}")
+    for size in sizes:
+        engine, SessionFactory = make_session_factory()
+        db = SessionFactory()
+        seed_search(db, size)
+        suggestions = EventSuggestions()
+        start = time.perf_counter()
+        suggestions.load(db)
+        load_ms = (time.perf_counter() - start) * 1000
+        # Mémoire retenue mesurée sur un second chargement (tracemalloc ralentit le chargement)
+        tracemalloc.start()
+        measured = EventSuggestions()
+        measured.load(db)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del measured
+        # Mise à jour : retitrage d'un événement puis retour au titre d'origine
+        event = db.query(Event).first()
+        original = event_terms(event.status, event.title, event.category, event.location, event.tags)
+        renamed = event_terms(event.status, f"Renommé {event.title}", event.category, event.location, event.tags)
+        start = time.perf_counter()
+        for _ in range(500):
+            suggestions.index.set_event(event.id, renamed)
+            suggestions.index.set_event(event.id, original)
+        update_us = (time.perf_counter() - start) * 1e6 / 1000
+        for prefix in SUGGEST_PREFIXES:
+            start = time.perf_counter()
+            for _ in range(1000):
+                suggestions.suggest(prefix)
+            suggest_us = (time.perf_counter() - start) * 1000
+            print(
+                f"{size:>10} | {load_ms / 1000:>8.1f} s | {memory / 1e6:>6.1f} Mo | {len(suggestions.index.keys):>9}"
+                f" | {prefix:>8} | {suggest_us:>7.1f} µs | {update_us:>8.1f} µs"
+            )
+        db.close()
+        engine.dispose()
+
+
+# (description, filtres de list_events)
+FACET_CASES = [
+    ("sans filtre", {}),
+    ("catégorie", {"category": "Catégorie 7"}),
+    ("tag", {"tag": ["tag5"]}),
+    ("tags + lieu", {"tag": ["tag5", "tag3"], "location": "Ville 1"}),
+]
+
+
+def facets_in_python(db: Session, category=None, location=None, tag=None) -> dict:
+    """Sans table event_tags : lecture de chaque événement publié et décodage du JSON des tags"""
+    query = db.query(Event.category, Event.location, Event.tags).filter(Event.status == EventStatus.PUBLISHED)
+    counts = {"category": {}, "location": {}, "tag": {}}
+    for event_category, event_location, tags in query.yield_per(SEED_CHUNK):
+        in_location = not location or location.lower() in (event_location or "").lower()
+        if tag and not set(tag) <= set(tags or []):
+            continue
+        if in_location and event_category:
+            counts["category"][event_category] = counts["category"].get(event_category, 0) + 1
+        if category and event_category != category:
+            continue
+        if event_location:
+            counts["location"][event_location] = counts["location"].get(event_location, 0) + 1
+        if in_location:
+            for value in set(tags or []):
+                counts["tag"][value] = counts["tag"].get(value, 0) + 1
+    return {
+        facet: sorted(values.items(), key=lambda item: (-item[1], item[0]))[:20]
+        for facet, values in counts.items()
+    }
+
+
+def facet_filters(category=None, location=None, tag=None) -> dict:
+    """Mêmes filtres que list_events"""
+    filters = {"status": [Event.status == EventStatus.PUBLISHED]}
+    if category:
+        filters["category"] = [Event.category == category]
+    if location:
+        filters["location"] = [Event.location.ilike(f"%{location}%")]
+    if tag:
+        filters["tag"] = tag_conditions(tag)
+    return filters
+
+
+def bench_facets(sizes):
+    print(f"{'événements':>10} | {'filtres':>12} | {'JSON en Python':>14} | {'event_tags':>10} | requêtes | tags")
+    for size in sizes:
+        engine, SessionFactory = make_session_factory()
+        db = SessionFactory()
+        seed_search(db, size)
+        for name, params in FACET_CASES:
+            old_ms, _ = timed(engine, lambda: facets_in_python(db, **params))
+            new_ms, statements = timed(engine, lambda: event_facets(db, facet_filters(**params)))
+            tags = event_facets(db, facet_filters(**params))["tag"]
+            assert [(item["value"], item["count"]) for item in tags] == facets_in_python(db, **params)["tag"]
+            print(f"{size:>10} | {name:>12} | {old_ms:>11.0f} ms | {new_ms:>7.0f} ms | {statements:>8} | {len(tags)}")
+        db.close()
+        engine.dispose()
+
+
+PAGE_SIZE = 20
+PAGE_NUMBERS = [1, 500, 4000, 40000]
+
+
+def seed_favorites(db: Session, count: int) -> str:
+    """Un utilisateur avec `count` favoris (ajoutés à une seconde d'intervalle)"""
+    user_id = generate_uuid()
+    db.add(User(id=user_id, email=f"{user_id}@bench.local", password="x", name="Bench"))
+    event_ids = [event_id for event_id, in db.query(Event.id).limit(count)]
+    start = datetime.now(timezone.utc) - timedelta(seconds=count)
+    for offset in range(0, len(event_ids), SEED_CHUNK):
+        db.execute(insert(Favorite), [
+            {"id": generate_uuid(), "user_id": user_id, "event_id": event_id, "created_at": start + timedelta(seconds=offset + i)}
+            for i, event_id in enumerate(event_ids[offset:offset + SEED_CHUNK])
+        ])
+    db.commit()
+    return user_id
+
+
+def bench_pages(sizes):
+    print(f"{'lignes':>10} | {'liste':>9} | {'page':>5} | {'OFFSET':>9} | {'curseur':>9}")
+    for size in sizes:
+        engine, SessionFactory = make_session_factory()
+        db = SessionFactory()
+        seed_search(db, size)
+        user_id = seed_favorites(db, size // 10)
+        lists = [
+            ("événements", db.query(Event).filter(Event.status == EventStatus.PUBLISHED),
+             EVENT_PAGE_ORDER, EVENT_CURSOR_TYPES, size),
+            ("favoris", db.query(Favorite).filter(Favorite.user_id == user_id),
+             (Favorite.created_at, Favorite.id), (datetime.fromisoformat, str), size // 10),
+        ]
+        for name, query, columns, converters, rows in lists:
+            for page in PAGE_NUMBERS:
+                skip = (page - 1) * PAGE_SIZE
+                if skip >= rows:
+                    continue
+                # Curseur de la page précédente, obtenu hors mesure
+                cursor = None
+                if skip:
+                    previous = query.order_by(*columns).offset(skip - 1).first()
+                    cursor = encode_cursor([getattr(previous, column.key) for column in columns])
+                response = Response()
+                old_ms, _ = timed(engine, lambda: query.order_by(*columns).offset(skip).limit(PAGE_SIZE).all())
+                new_ms, _ = timed(engine, lambda: keyset_page(query, columns, converters, cursor, PAGE_SIZE, response))
+                assert [row.id for row in keyset_page(query, columns, converters, cursor, PAGE_SIZE, response)] == [
+                    row.id for row in query.order_by(*columns).offset(skip).limit(PAGE_SIZE)
+                ]
+                assert (NEXT_CURSOR_HEADER in response.headers) == (skip + PAGE_SIZE < rows)
+                print(f"{rows:>10} | {name:>9} | {page:>5} | {old_ms:>6.2f} ms | {new_ms:>6.2f} ms")
+        db.close()
+        engine.dispose()
+
+
+PLAN_OWNERS = 1000
+PLAN_STATUSES = [EventStatus.PUBLISHED] * 6 + [EventStatus.PENDING, EventStatus.DRAFT, EventStatus.CANCELLED, EventStatus.COMPLETED]
+# Index des événements avant les filtres de date (catégorie et organisateur seuls)
+PLAN_OLD_INDEXES = ["CREATE INDEX ix_events_owner_id ON events (owner_id)"]
+PLAN_NEW_INDEXES = ["ix_events_status_date_start", "ix_events_owner_date_start"]
+
+
+def seed_calendar(db: Session, count: int) -> list:
+    """`count` événements sur deux ans (passés et à venir), tous statuts, PLAN_OWNERS organisateurs"""
+    now = datetime.now(timezone.utc)
+    owner_ids = [generate_uuid() for _ in range(PLAN_OWNERS)]
+    db.execute(insert(User), [
+        {"id": owner_id, "email": f"{owner_id}@bench.local", "password": "x", "name": "Bench"} for owner_id in owner_ids
+    ])
+    for start in range(0, count, SEED_CHUNK):
+        db.execute(insert(Event), [
+            {
+                "id": generate_uuid(), "owner_id": owner_ids[i % PLAN_OWNERS], "title": f"Événement {i}",
+                "status": PLAN_STATUSES[i % len(PLAN_STATUSES)], "category": f"Catégorie {i % 50}",
+                # Dates dispersées (pas dans l'ordre d'insertion) sur [-1 an, +1 an]
+                "date_start": now + timedelta(minutes=(i * 7919) % (2 * 525600) - 525600), "date_end": now
+            }
+            for i in range(start, min(start + SEED_CHUNK, count))
+        ])
+    db.commit()
+    return owner_ids
+
+
+def explain(db: Session, query) -> str:
+    """Plan d'exécution de la requête (EXPLAIN QUERY PLAN sur SQLite, EXPLAIN sur PostgreSQL)"""
+    dialect = db.get_bind().dialect
+    sql = str(query.statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    if dialect.name == "sqlite":
+        return "; ".join(row[-1] for row in db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + sql))
+    lines = [line.strip() for line, in db.connection().exec_driver_sql("EXPLAIN " + sql)]
+    return "; ".join(line for line in lines if "Scan" in line or "Sort" in line or "Index Cond" in line)
+
+
+def bench_plans(sizes):
+    for size in sizes:
+        engine, SessionFactory = make_session_factory()
+        db = SessionFactory()
+        owner_ids = seed_calendar(db, size)
+        now = datetime.now(timezone.utc)
+        published = db.query(Event).filter(Event.status == EventStatus.PUBLISHED)
+        cases = [
+            ("à venir", published.filter(Event.date_start >= now)),
+            ("semaine", published.filter(Event.date_start >= now + timedelta(days=30), Event.date_start < now + timedelta(days=37))),
+            ("organisateur", db.query(Event).filter(Event.owner_id == owner_ids[0])),
+        ]
+        print(f"{size} événements")
+        for label, statements in (("avant", PLAN_OLD_INDEXES), ("après", [])):
+            connection = db.connection()
+            if statements:
+                for name in PLAN_NEW_INDEXES:
+                    connection.exec_driver_sql(f"DROP INDEX {name}")
+                for statement in statements:
+                    connection.exec_driver_sql(statement)
+            else:
+                connection.exec_driver_sql("DROP INDEX ix_events_owner_id")
+                for index in Event.__table__.indexes:
+                    if index.name in PLAN_NEW_INDEXES:
+                        index.create(connection)
+            connection.exec_driver_sql("ANALYZE")
+            db.commit()
+            for name, query in cases:
+                page = query.order_by(*EVENT_PAGE_ORDER).limit(PAGE_SIZE)
+                elapsed, _ = timed(engine, page.all)
+                print(f"  {label:>5} | {name:>12} | {elapsed:>8.2f} ms | {explain(db, page)}")
+        db.close()
+        engine.dispose()
+
+
+def parse_sizes(value: str):
+    return [int(size) for size in value.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks des requêtes de lecture")
+    commands = parser.add_subparsers(dest="command", required=True)
+    participants = commands.add_parser("participants", help="Liste des participants / historique d'un événement")
+    participants.add_argument("--sizes", type=parse_sizes, default=[100, 1000, 10000])
+    export = commands.add_parser("export", help="Export de l'historique en flux vs en mémoire")
+    export.add_argument("--sizes", type=parse_sizes, default=[10000, 100000])
+    presence = commands.add_parser("presence", help="Diffusion de la présence à de nombreux abonnés")
+    presence.add_argument("--subscribers", type=int, default=1000)
+    presence.add_argument("--updates", type=int, default=10000)
+    global_stats = commands.add_parser("global", help="Statistiques globales de la plateforme")
+    global_stats.add_argument("--sizes", type=parse_sizes, default=[100000, 1000000])
+    dashboard = commands.add_parser("dashboard", help="Dashboard organisateur / admin")
+    dashboard.add_argument("--sizes", type=parse_sizes, default=[1000, 10000, 100000])
+    timeseries = commands.add_parser("timeseries", help="Série temporelle des entrées/sorties d'un événement")
+    timeseries.add_argument("--sizes", type=parse_sizes, default=[10000, 100000])
+    snapshot = commands.add_parser("snapshot", help="Instantané en colonnes pour les rapports admin")
+    snapshot.add_argument("--sizes", type=parse_sizes, default=[100000, 1000000])
+    search = commands.add_parser("search", help="Recherche plein texte des événements")
+    search.add_argument("--sizes", type=parse_sizes, default=[100000, 1000000])
+    suggest = commands.add_parser("suggest", help="Suggestions de saisie (index de préfixes en mémoire)")
+    suggest.add_argument("--sizes", type=parse_sizes, default=[100000, 1000000])
+    facets = commands.add_parser("facets", help="Facettes catégorie / lieu / tag et filtre par tag")
+    facets.add_argument("--sizes", type=parse_sizes, default=[100000, 1000000])
+    pages = commands.add_parser("pages", help="Pagination par OFFSET vs par curseur (événements, favoris)")
+    pages.add_argument("--sizes", type=parse_sizes, default=[100000, 1000000])
+    plans = commands.add_parser("plans", help="Plans et temps des filtres de date, avant / après les index composites")
+    plans.add_argument("--sizes", type=parse_sizes, default=[100000, 1000000])
+    args = parser.parse_args()
+
+    if args.command == "participants":
+        bench_participants(args.sizes)
+    elif args.command == "export":
+        bench_export(args.sizes)
+    elif args.command == "presence":
+        bench_presence(args.subscribers, args.updates)
+    elif args.command == "global":
+        bench_global(args.sizes)
+    elif args.command == "dashboard":
+        bench_dashboard(args.sizes)
+    elif args.command == "timeseries":
+        bench_timeseries(args.sizes)
+    elif args.command == "snapshot":
+        bench_snapshot(args.sizes)
+    elif args.command == "search":
+        bench_search(args.sizes)
+    elif args.command == "suggest":
+        bench_suggest(args.sizes)
+    elif args.command == "facets":
+        bench_facets(args.sizes)
+    elif args.command == "pages":
+        bench_pages(args.sizes)
+    elif args.command == "plans":
+        bench_plans(args.sizes)
@@ -0,0 +1,42 @@
+-- Migration: Ajouter le journal des entrées/sorties
+-- Date: 2026-10-18
+-- Description: Une ligne par check-in / check-out (ajout seul), les re-entrées ne sont plus écrasées
+
+DO $$ BEGIN
+    CREATE TYPE attendanceaction AS ENUM ('CHECK_IN', 'CHECK_OUT');
+EXCEPTION
+    WHEN duplicate_object THEN NULL;
+END $$;
+
+CREATE TABLE IF NOT EXISTS attendance_log (
+    id BIGSERIAL PRIMARY KEY,
+    event_id VARCHAR NOT NULL,
+    registration_id VARCHAR NOT NULL,
+    action attendanceaction NOT NULL,
+    ts TIMESTAMP WITH TIME ZONE NOT NULL,
+    source VARCHAR NOT NULL,
+
+    -- Foreign keys
+    CONSTRAINT fk_attendance_log_event FOREIGN KEY (event_id) REFERENCES events(id) ON DELETE CASCADE,
+    CONSTRAINT fk_attendance_log_registration FOREIGN KEY (registration_id) REFERENCES registrations(id) ON DELETE CASCADE
+);
+
+-- Lecture d'une fenêtre de temps d'un événement
+CREATE INDEX IF NOT EXISTS ix_attendance_log_event_ts ON attendance_log(event_id, ts, id);
+
+-- Reprendre les derniers mouvements connus (les précédents ont été écrasés),
+-- uniquement si le journal est encore vide
+INSERT INTO attendance_log (event_id, registration_id, action, ts, source)
+SELECT event_id, id, 'CHECK_IN'::attendanceaction, checked_in_at, 'backfill'
+FROM registrations
+WHERE checked_in_at IS NOT NULL AND NOT EXISTS (SELECT 1 FROM attendance_log)
+UNION ALL
+SELECT event_id, id, 'CHECK_OUT'::attendanceaction, checked_out_at, 'backfill'
+FROM registrations
+WHERE checked_out_at IS NOT NULL AND NOT EXISTS (SELECT 1 FROM attendance_log);
+
+-- Commentaires
+COMMENT ON TABLE attendance_log IS 'Journal des entrées/sorties des participants (ajout seul)';
+COMMENT ON COLUMN attendance_log.action IS 'CHECK_IN ou CHECK_OUT';
+COMMENT ON COLUMN attendance_log.ts IS 'Heure du mouvement (heure du scan pour les lots)';
+COMMENT ON COLUMN attendance_log.source IS 'Origine du mouvement : scan, batch, manual ou backfill';
@@ -0,0 +1,28 @@
+-- Migration: Ajouter les compteurs de participants dénormalisés sur events
+-- Date: 2026-10-18
+-- Description: Évite de recompter la table registrations à chaque lecture d'un événement
+
+ALTER TABLE events ADD COLUMN IF NOT EXISTS participants_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE events ADD COLUMN IF NOT EXISTS checked_in_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE events ADD COLUMN IF NOT EXISTS checked_out_count INTEGER NOT NULL DEFAULT 0;
+
+-- Initialiser les compteurs depuis les inscriptions existantes
+-- (équivalent à `python -m app.counters`)
+UPDATE events SET
+    participants_count = (
+        SELECT COUNT(*) FROM registrations r
+        WHERE r.event_id = events.id AND r.status <> 'CANCELLED'
+    ),
+    checked_in_count = (
+        SELECT COUNT(*) FROM registrations r
+        WHERE r.event_id = events.id AND r.status = 'CHECKED_IN'
+    ),
+    checked_out_count = (
+        SELECT COUNT(*) FROM registrations r
+        WHERE r.event_id = events.id AND r.status = 'CHECKED_OUT'
+    );
+
+-- Commentaires
+COMMENT ON COLUMN events.participants_count IS 'Nombre d''inscriptions non annulées';
+COMMENT ON COLUMN events.checked_in_count IS 'Nombre de participants actuellement présents (CHECKED_IN)';
+COMMENT ON COLUMN events.checked_out_count IS 'Nombre de participants sortis (CHECKED_OUT)';
@@ -0,0 +1,25 @@
+-- Migration: Agrégats quotidiens de l'activité des événements
+-- Date: 2026-10-18
+-- Description: Une ligne par (événement, jour UTC) avec les inscriptions, annulations, check-in et
+-- check-out du jour, incrémentée à chaque écriture. Les statistiques quotidiennes
+-- (/api/analytics/daily) ne parcourent plus registrations ni attendance_log.
+-- Après la migration, remplir la table depuis l'historique : python -m app.rollups
+
+CREATE TABLE IF NOT EXISTS event_daily_rollups (
+    event_id VARCHAR NOT NULL,
+    day DATE NOT NULL,
+    category VARCHAR,
+    owner_id VARCHAR NOT NULL,
+    registrations INTEGER NOT NULL DEFAULT 0,
+    cancellations INTEGER NOT NULL DEFAULT 0,
+    check_ins INTEGER NOT NULL DEFAULT 0,
+    check_outs INTEGER NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (event_id, day),
+    CONSTRAINT fk_event_daily_rollups_event FOREIGN KEY (event_id) REFERENCES events(id) ON DELETE CASCADE
+);
+
+-- Fenêtres de jours, globales ou par organisateur / catégorie
+CREATE INDEX IF NOT EXISTS ix_event_daily_rollups_day ON event_daily_rollups(day);
+CREATE INDEX IF NOT EXISTS ix_event_daily_rollups_owner_day ON event_daily_rollups(owner_id, day);
+CREATE INDEX IF NOT EXISTS ix_event_daily_rollups_category_day ON event_daily_rollups(category, day);
@@ -0,0 +1,23 @@
+-- Migration: Recherche plein texte des événements
+-- Date: 2026-10-18
+-- Description: La recherche de /api/events/?search= utilisait ILIKE '%q%' sur le titre et la
+-- description : aucun index utilisable, parcours complet des événements à chaque recherche.
+-- Ajoute une colonne tsvector générée (titre en poids A, description en poids B), indexée
+-- en GIN, avec une configuration française qui ignore les accents (extension unaccent).
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+DO $$ BEGIN
+    CREATE TEXT SEARCH CONFIGURATION fr_unaccent (COPY = french);
+    ALTER TEXT SEARCH CONFIGURATION fr_unaccent
+        ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+EXCEPTION WHEN unique_violation THEN NULL;
+END $$;
+
+-- Réécrit la table events (colonne calculée pour les lignes existantes)
+ALTER TABLE events ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('fr_unaccent', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('fr_unaccent', coalesce(description, '')), 'B')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS ix_events_search ON events USING GIN (search_vector);
@@ -0,0 +1,24 @@
+-- Migration: Compléter les compteurs dénormalisés des événements (absents, annulations)
+-- Date: 2026-10-18
+-- Description: Avec participants_count, checked_in_count et checked_out_count, la répartition
+-- des inscriptions par statut se déduit des compteurs sans parcourir la table registrations.
+-- Prérequis : migration_add_event_counters.sql
+
+ALTER TABLE events ADD COLUMN IF NOT EXISTS no_show_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE events ADD COLUMN IF NOT EXISTS cancelled_count INTEGER NOT NULL DEFAULT 0;
+
+-- Initialiser les compteurs depuis les inscriptions existantes
+-- (équivalent à `python -m app.counters`)
+UPDATE events SET
+    no_show_count = (
+        SELECT COUNT(*) FROM registrations r
+        WHERE r.event_id = events.id AND r.status = 'NO_SHOW'
+    ),
+    cancelled_count = (
+        SELECT COUNT(*) FROM registrations r
+        WHERE r.event_id = events.id AND r.status = 'CANCELLED'
+    );
+
+-- Commentaires
+COMMENT ON COLUMN events.no_show_count IS 'Nombre d''inscriptions marquées absentes (NO_SHOW)';
+COMMENT ON COLUMN events.cancelled_count IS 'Nombre d''inscriptions annulées';
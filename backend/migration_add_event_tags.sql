@@ -0,0 +1,25 @@
+-- Migration: Tags des événements en table normalisée
+-- Date: 2026-10-18
+-- Description: Les tags n'étaient stockés que dans la colonne JSON events.tags, sans index
+-- utilisable. Une ligne par (événement, tag) dans event_tags, indexée par tag, sert le filtre
+-- /api/events/?tag= et les facettes (?facets=true). La colonne JSON reste la source affichée ;
+-- les routes d'événements maintiennent event_tags à chaque création / modification.
+
+CREATE TABLE IF NOT EXISTS event_tags (
+    event_id VARCHAR NOT NULL,
+    tag VARCHAR NOT NULL,
+
+    PRIMARY KEY (event_id, tag),
+    CONSTRAINT fk_event_tags_event FOREIGN KEY (event_id) REFERENCES events(id) ON DELETE CASCADE
+);
+
+-- Événements d'un tag (filtre, facettes) sans lecture de la table
+CREATE INDEX IF NOT EXISTS ix_event_tags_tag_event ON event_tags(tag, event_id);
+
+-- Remplissage depuis la colonne JSON (tags vides ignorés, doublons fusionnés)
+INSERT INTO event_tags (event_id, tag)
+SELECT DISTINCT e.id, btrim(t.tag)
+FROM events e,
+     json_array_elements_text(CASE WHEN json_typeof(e.tags) = 'array' THEN e.tags ELSE '[]'::json END) AS t(tag)
+WHERE btrim(t.tag) <> ''
+ON CONFLICT DO NOTHING;
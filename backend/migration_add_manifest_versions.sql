@@ -0,0 +1,29 @@
+-- Migration: Versions des manifestes hors ligne des scanners
+-- Date: 2026-10-18
+-- Description: La version d'un manifeste était l'horodatage du dernier ajout ou retrait, et un
+-- manifeste différentiel rejouait 5 secondes avant cette version : une inscription validée plus de
+-- 5 secondes après son horodatage n'atteignait jamais les scanners. La version devient un compteur
+-- par événement, incrémenté dans la transaction de chaque billet ajouté ou retiré et recopié sur
+-- l'inscription : les versions d'un événement sont validées dans l'ordre (verrou de ligne de
+-- l'événement). Le format du manifeste passe à EVM2 ; les scanners repartent d'un manifeste complet.
+
+ALTER TABLE events ADD COLUMN IF NOT EXISTS manifest_version INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE registrations ADD COLUMN IF NOT EXISTS manifest_version INTEGER NOT NULL DEFAULT 0;
+
+-- Numéroter les inscriptions existantes de chaque événement dans l'ordre d'inscription
+UPDATE registrations SET manifest_version = numbered.version
+FROM (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY event_id ORDER BY registered_at, id) AS version
+    FROM registrations
+) AS numbered
+WHERE registrations.id = numbered.id;
+
+UPDATE events SET manifest_version = COALESCE(
+    (SELECT MAX(r.manifest_version) FROM registrations r WHERE r.event_id = events.id), 0
+);
+
+CREATE INDEX IF NOT EXISTS ix_registrations_event_manifest ON registrations(event_id, manifest_version);
+
+-- Commentaires
+COMMENT ON COLUMN events.manifest_version IS 'Version du manifeste hors ligne, incrémentée à chaque billet ajouté ou retiré';
+COMMENT ON COLUMN registrations.manifest_version IS 'Version du manifeste de l''événement à laquelle le billet a été ajouté ou retiré';
@@ -0,0 +1,11 @@
+-- Migration: Index couvrant du journal des entrées/sorties
+-- Date: 2026-10-18
+-- Description: Les séries temporelles d'un événement (/api/analytics/event/{id}/timeseries)
+-- regroupent les mouvements par intervalle ; avec action dans l'index, le regroupement
+-- lit uniquement l'index. L'ordre (event_id, ts, id) de la pagination est inchangé.
+-- Hors transaction : CREATE INDEX CONCURRENTLY n'interrompt pas les check-in en cours.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_attendance_log_event_ts_action
+    ON attendance_log(event_id, ts, id, action);
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_attendance_log_event_ts;
@@ -0,0 +1,32 @@
+-- Migration: Filtres de date des événements
+-- Date: 2026-10-18
+-- Description: /api/events/ accepte from / to et upcoming_only, filtres sur date_start. Ils sont
+-- servis par les index composites créés par migration_keyset_pagination_indexes.sql (à appliquer
+-- avant) : events(status, date_start, id) pour les événements publiés, events(owner_id, date_start, id)
+-- pour ceux d'un organisateur. Un filtre de date devient un parcours d'intervalle de l'index, déjà
+-- dans l'ordre de la liste, au lieu d'un parcours complet de events suivi d'un tri.
+-- Aucun index n'est créé ni supprimé ici.
+
+-- Statistiques à jour pour que le planificateur choisisse les nouveaux index
+ANALYZE events;
+
+-- Vérification : le plan doit montrer « Index Scan using ix_events_status_date_start »,
+-- avec « Index Cond: ((status = 'PUBLISHED') AND (date_start >= ...)) », sans « Seq Scan on events »
+-- ni nœud « Sort ».
+--
+-- EXPLAIN (ANALYZE, BUFFERS)
+-- SELECT * FROM events
+-- WHERE status = 'PUBLISHED' AND date_start >= now() AND date_start < now() + interval '7 days'
+-- ORDER BY date_start, id
+-- LIMIT 20;
+--
+-- Événements d'un organisateur : « Index Scan using ix_events_owner_date_start », sans « Sort ».
+--
+-- EXPLAIN (ANALYZE, BUFFERS)
+-- SELECT * FROM events
+-- WHERE owner_id = '<owner_id>'
+-- ORDER BY date_start, id
+-- LIMIT 20;
+--
+-- Sur une petite table, PostgreSQL peut préférer un Seq Scan : c'est attendu tant que la table
+-- tient en quelques pages.
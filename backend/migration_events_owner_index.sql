@@ -0,0 +1,7 @@
+-- Migration: Index des événements par organisateur
+-- Date: 2026-10-18
+-- Description: Le dashboard d'un organisateur (/api/analytics/my-dashboard) agrège et trie
+-- ses événements ; l'index évite le parcours complet de la table events.
+
+CREATE INDEX IF NOT EXISTS ix_events_owner_id
+    ON events(owner_id);
@@ -0,0 +1,21 @@
+-- Migration: Index de la pagination par curseur des événements et des favoris
+-- Date: 2026-10-18
+-- Description: La liste des événements publiés, « mes événements » et « mes favoris » étaient
+-- paginés par OFFSET : la base lisait puis jetait toutes les lignes des pages précédentes.
+-- Ils sont désormais paginés par curseur sur (date_start, id), ou (created_at, id) pour les
+-- favoris. Ces index servent ce parcours sans tri : une page coûte le même prix à toute
+-- profondeur. ix_events_owner_id (migration_events_owner_index.sql) est un préfixe de
+-- ix_events_owner_date_start : il est supprimé une fois ce dernier créé, un index de moins à
+-- maintenir à chaque écriture.
+-- Hors transaction : CREATE / DROP INDEX CONCURRENTLY ne bloquent pas les écritures en cours.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_events_status_date_start
+    ON events(status, date_start, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_events_owner_date_start
+    ON events(owner_id, date_start, id);
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_events_owner_id;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_favorites_user_created
+    ON favorites(user_id, created_at, id);
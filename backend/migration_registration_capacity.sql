@@ -0,0 +1,12 @@
+-- Migration: Empêcher les inscriptions actives en double
+-- Date: 2026-10-18
+-- Description: Une seule inscription non annulée par utilisateur et par événement.
+-- Prérequis : migration_add_event_counters.sql (la capacité est réservée via events.participants_count)
+
+-- Vérifier au préalable qu'il n'existe pas de doublons, sinon la création de l'index échoue :
+--   SELECT user_id, event_id, COUNT(*) FROM registrations
+--   WHERE status <> 'CANCELLED' GROUP BY user_id, event_id HAVING COUNT(*) > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_registrations_active_user_event
+    ON registrations(user_id, event_id)
+    WHERE status <> 'CANCELLED';
@@ -0,0 +1,7 @@
+-- Migration: Index de pagination des participants d'un événement
+-- Date: 2026-10-18
+-- Description: Listes de participants et historique triés par (registered_at, id) et paginés par curseur.
+-- Chaque page est une lecture d'intervalle de l'index, sans tri ni OFFSET.
+
+CREATE INDEX IF NOT EXISTS ix_registrations_event_registered
+    ON registrations(event_id, registered_at, id);
@@ -0,0 +1,9 @@
+-- Migration: Index des inscriptions par date d'inscription
+-- Date: 2026-10-18
+-- Description: L'instantané des rapports admin (app/snapshot.py) charge les nouvelles inscriptions
+-- après le dernier (registered_at, id) vu ; l'index rend ce chargement proportionnel aux
+-- nouvelles lignes au lieu d'un parcours complet de la table.
+-- Hors transaction : CREATE INDEX CONCURRENTLY ne bloque pas les inscriptions en cours.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_registrations_registered
+    ON registrations(registered_at, id);
@@ -8,8 +8,12 @@ Usage:
     python test.py
 """
 
+import json
+import os
+import time
 import requests
 import psycopg2
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta
 
@@ -26,6 +30,11 @@ if _ENV_FILE.exists():
             DATABASE_URL = line.split("=", 1)[1].strip()
             break
 
+# Test de charge des inscriptions simultanées (surchargeable par variables d'environnement)
+STRESS_USERS = int(os.environ.get("STRESS_USERS", 300))
+STRESS_CAPACITY = int(os.environ.get("STRESS_CAPACITY", 50))
+STRESS_WORKERS = int(os.environ.get("STRESS_WORKERS", 64))
+
 # Absolute path to the directory that contains this script —
 # used to locate test asset files regardless of cwd.
 TEST_DIR = Path(__file__).parent
@@ -421,6 +430,64 @@ class APITester:
             r = requests.post(f"{BASE_URL}/events/{self.event_id}/approve", headers=headers_admin)
             self.test("POST /api/events/{id}/approve (Déjà approuvé)", r.status_code == 400, r)
 
+            # GET /api/events/suggest : l'événement approuvé devient suggérable
+            r = requests.get(f"{BASE_URL}/events/suggest", params={"q": "test event"})
+            self.test(
+                "GET /api/events/suggest?q=test event",
+                r.status_code == 200 and any(s["type"] == "title" for s in r.json()), r
+            )
+
+            # GET /api/events/?search= : recherche plein texte, accents ignorés
+            r = requests.get(f"{BASE_URL}/events/", params={"search": "mise a JOUR", "limit": 100})
+            self.test(
+                "GET /api/events/?search= (sans accents)",
+                r.status_code == 200 and self.event_id in [e["id"] for e in r.json()], r
+            )
+
+            # GET /api/events/?search= : mots entiers, un fragment de mot ne correspond plus (ancien ILIKE '%q%')
+            r = requests.get(f"{BASE_URL}/events/", params={"search": "pdated", "limit": 100})
+            self.test(
+                "GET /api/events/?search= (fragment de mot)",
+                r.status_code == 200 and self.event_id not in [e["id"] for e in r.json()], r
+            )
+
+            # GET /api/events/?tag=&facets=true : tous les tags demandés, facettes avec la page
+            r = requests.get(f"{BASE_URL}/events/", params={"tag": ["python", "workshop"], "facets": "true", "limit": 100})
+            self.test(
+                "GET /api/events/?tag=python&tag=workshop&facets=true",
+                r.status_code == 200 and self.event_id in [e["id"] for e in r.json()["events"]]
+                and any(f["value"] == "workshop" for f in r.json()["facets"]["tag"]), r
+            )
+
+            # GET /api/events/?cursor= : la page suivante reprend après la précédente, sans doublon
+            r = requests.get(f"{BASE_URL}/events/", params={"limit": 1})
+            cursor = r.headers.get("X-Next-Cursor")
+            if r.status_code == 200 and cursor:
+                r2 = requests.get(f"{BASE_URL}/events/", params={"limit": 1, "cursor": cursor})
+                self.test(
+                    "GET /api/events/?cursor= (page suivante)",
+                    r2.status_code == 200 and r2.json() and r2.json()[0]["id"] != r.json()[0]["id"], r2
+                )
+            else:
+                # Pas de curseur : un seul événement publié au plus
+                total = requests.get(f"{BASE_URL}/events/", params={"limit": 2})
+                self.test("GET /api/events/?limit=1 (X-Next-Cursor)", r.status_code == 200 and len(total.json()) <= 1, r)
+
+            # GET /api/events/?upcoming_only=true&from=&to= : fenêtre sur la date de début
+            window = {
+                "upcoming_only": "true",
+                "from": (datetime.now() + timedelta(days=6)).isoformat(),
+                "to": (datetime.now() + timedelta(days=8)).isoformat(),
+                "limit": 100
+            }
+            r = requests.get(f"{BASE_URL}/events/", params=window)
+            self.test(
+                "GET /api/events/?upcoming_only=true&from=&to=",
+                r.status_code == 200 and self.event_id in [e["id"] for e in r.json()], r
+            )
+            r = requests.get(f"{BASE_URL}/events/", params={"from": window["to"], "to": window["from"]})
+            self.test("GET /api/events/?from=&to= (fenêtre inversée - 400)", r.status_code == 400, r)
+
         if self.event_id_2:
             # POST /api/events/{id}/reject (Admin) — event_id_2 is still PENDING
             reject_data = {"reason": "Ne respecte pas les critères de la plateforme"}
@@ -573,6 +640,14 @@ class APITester:
                         )
                         self.test("POST /api/registrations/scan (Mauvais event_id — doit échouer 400)", r.status_code == 400, r)
 
+                    # 6b. QR code signé falsifié — rejeté sans lecture de l'inscription (400)
+                    r = requests.post(
+                        f"{BASE_URL}/registrations/scan/REG:{scan_reg_id}:{scan_event_id}:signature-invalide",
+                        params={"event_id": scan_event_id},
+                        headers=headers_organizer
+                    )
+                    self.test("POST /api/registrations/scan (Signature falsifiée — doit échouer 400)", r.status_code == 400, r)
+
                     # 7. Non-organizer tries to scan — must fail (403)
                     rs_admin_reg = requests.post(f"{BASE_URL}/registrations/{scan_event_id}", headers=headers_admin)
                     if rs_admin_reg.status_code == 201:
@@ -591,6 +666,48 @@ class APITester:
                         )
                         self.test("POST /api/registrations/scan (Sans event_id — rétrocompatible)", r.status_code == 200, r)
 
+                        # 9. Lot de scans (scanner hors ligne qui vide son tampon)
+                        batch = {"scans": [
+                            {"registration_id": other_reg_id, "scanned_at": (datetime.now() + timedelta(minutes=1)).isoformat()},
+                            {"registration_id": "inscription-inconnue"},
+                        ]}
+                        r = requests.post(f"{BASE_URL}/registrations/event/{scan_event_id}/scan-batch",
+                                          json=batch, headers=headers_organizer)
+                        results = r.json() if r.status_code == 200 else []
+                        self.test("POST /api/registrations/event/{id}/scan-batch (Résultat par scan)",
+                                  len(results) == 2 and results[0]["success"] and not results[1]["success"], r)
+
+                        # 10. Même lot renvoyé : déjà appliqué, pas de nouveau changement de statut
+                        r = requests.post(f"{BASE_URL}/registrations/event/{scan_event_id}/scan-batch",
+                                          json=batch, headers=headers_organizer)
+                        self.test("POST /api/registrations/event/{id}/scan-batch (Lot renvoyé — doublon)",
+                                  r.status_code == 200 and r.json()[0]["duplicate"], r)
+
+                        r = requests.post(f"{BASE_URL}/registrations/event/{scan_event_id}/scan-batch",
+                                          json=batch, headers=headers_user)
+                        self.test("POST /api/registrations/event/{id}/scan-batch (Non-organisateur — 403)", r.status_code == 403, r)
+
+                    # 11. Journal des entrées/sorties : les trois scans (entrée, sortie, re-entrée) sont conservés
+                    r = requests.get(f"{BASE_URL}/registrations/event/{scan_event_id}/attendance",
+                                     params={"registration_id": scan_reg_id}, headers=headers_organizer)
+                    actions = [m["action"] for m in r.json()] if r.status_code == 200 else []
+                    self.test("GET /api/registrations/event/{id}/attendance (Re-entrée conservée)",
+                              actions == ["CHECK_IN", "CHECK_OUT", "CHECK_IN"], r)
+
+                    r = requests.get(f"{BASE_URL}/registrations/event/{scan_event_id}/attendance", headers=headers_user)
+                    self.test("GET /api/registrations/event/{id}/attendance (User — doit échouer 403)", r.status_code == 403, r)
+
+                    # 12. Série temporelle : le dernier intervalle compte les présents actuels
+                    r = requests.get(f"{BASE_URL}/analytics/event/{scan_event_id}/timeseries",
+                                     params={"interval": 60}, headers=headers_organizer)
+                    buckets = r.json()["buckets"] if r.status_code == 200 else []
+                    live = requests.get(f"{BASE_URL}/registrations/event/{scan_event_id}/live", headers=headers_organizer).json()
+                    self.test("GET /api/analytics/event/{id}/timeseries (Présents = /live)",
+                              bool(buckets) and buckets[-1]["occupancy"] == live["currently_present"], r)
+
+                    r = requests.get(f"{BASE_URL}/analytics/event/{scan_event_id}/timeseries", headers=headers_user)
+                    self.test("GET /api/analytics/event/{id}/timeseries (User — doit échouer 403)", r.status_code == 403, r)
+
             # ──────────────────────────────────────────
             # GET participants + live stats
             # ──────────────────────────────────────────
@@ -600,10 +717,54 @@ class APITester:
             r = requests.get(f"{BASE_URL}/registrations/event/{self.event_id}/participants", headers=headers_user)
             self.test("GET /api/registrations/event/{id}/participants (User — doit échouer 403)", r.status_code == 403, r)
 
+            # Pagination par curseur : parcourir la liste page par page
+            all_ids = [p["id"] for p in requests.get(
+                f"{BASE_URL}/registrations/event/{self.event_id}/participants", headers=headers_organizer).json()]
+            paged_ids, cursor = [], None
+            for _ in range(len(all_ids) + 1):
+                params = {"limit": 1, **({"cursor": cursor} if cursor else {})}
+                r = requests.get(f"{BASE_URL}/registrations/event/{self.event_id}/participants",
+                                 params=params, headers=headers_organizer)
+                paged_ids += [p["id"] for p in r.json()] if r.status_code == 200 else []
+                cursor = r.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
+            self.test("GET /api/registrations/event/{id}/participants (Pagination par curseur)", paged_ids == all_ids, r)
+
+            r = requests.get(f"{BASE_URL}/registrations/event/{self.event_id}/history",
+                             params={"status": "CANCELLED"}, headers=headers_organizer)
+            self.test("GET /api/registrations/event/{id}/history (Filtre par statut)",
+                      r.status_code == 200 and all(h["status"] == "CANCELLED" for h in r.json()), r)
+
+            r = requests.get(f"{BASE_URL}/registrations/event/{self.event_id}/history/export",
+                             params={"format": "csv"}, headers=headers_organizer)
+            self.test("GET /api/registrations/event/{id}/history/export (CSV)",
+                      r.status_code == 200 and r.text.count("\n") == len(all_ids) + 1, r)
+
+            r = requests.get(f"{BASE_URL}/registrations/event/{self.event_id}/history/export",
+                             params={"format": "ndjson"}, headers=headers_organizer)
+            self.test("GET /api/registrations/event/{id}/history/export (NDJSON)",
+                      r.status_code == 200 and len(r.text.splitlines()) == len(all_ids), r)
+
+            r = requests.get(f"{BASE_URL}/registrations/event/{self.event_id}/history/export", headers=headers_user)
+            self.test("GET /api/registrations/event/{id}/history/export (User — doit échouer 403)", r.status_code == 403, r)
+
             r = requests.get(f"{BASE_URL}/registrations/event/{self.event_id}/live", headers=headers_organizer)
             self.test("GET /api/registrations/event/{id}/live (Organizer)", r.status_code == 200, r)
             if r.status_code == 200:
                 print(f"  {YELLOW}→ Live stats: {r.json()}{RESET}")
+                live_stats = r.json()
+
+                # Flux SSE : le premier message reprend l'état de /live
+                with requests.get(f"{BASE_URL}/registrations/event/{self.event_id}/live/stream",
+                                  headers=headers_organizer, stream=True, timeout=10) as rs:
+                    first = next((line for line in rs.iter_lines(decode_unicode=True)
+                                  if line.startswith("data:")), None)
+                self.test("GET /api/registrations/event/{id}/live/stream (État initial)",
+                          rs.status_code == 200 and first is not None and json.loads(first[5:]) == live_stats, rs)
+
+            r = requests.get(f"{BASE_URL}/registrations/event/{self.event_id}/live/stream", headers=headers_user)
+            self.test("GET /api/registrations/event/{id}/live/stream (User — doit échouer 403)", r.status_code == 403, r)
 
             # ──────────────────────────────────────────
             # Manual check-in / check-out endpoints
@@ -670,6 +831,69 @@ class APITester:
         if r.status_code == 200:
             data = r.json()
             print(f"  {YELLOW}→ Mes events: {data['total_events']}, Inscriptions: {data['total_registrations']}{RESET}")
+            self.test(
+                "my-dashboard : répartition par statut cohérente avec total_events",
+                sum(data["events_by_status"].values()) == data["total_events"], r
+            )
+
+            # Page de 1 événement, triée par taux de remplissage : les totaux restent globaux
+            r = requests.get(f"{BASE_URL}/analytics/my-dashboard?sort=fill_rate&limit=1", headers=headers_organizer)
+            self.test(
+                "GET /api/analytics/my-dashboard?limit=1",
+                r.status_code == 200 and len(r.json()["events"]) <= 1
+                and r.json()["total_events"] == data["total_events"], r
+            )
+            fill_rates = [e["fill_rate"] for e in data["events"]]
+            self.test("my-dashboard : tri par taux de remplissage décroissant", fill_rates == sorted(fill_rates, reverse=True), r)
+
+        # GET /api/analytics/reports/* (Admin) : instantané en colonnes
+        r = requests.get(f"{BASE_URL}/analytics/reports/events?group_by=category", headers=headers_admin)
+        self.test("GET /api/analytics/reports/events?group_by=category (Admin)", r.status_code == 200, r)
+        if r.status_code == 200:
+            print(f"  {YELLOW}→ Catégories: {len(r.json())}{RESET}")
+
+        r = requests.get(f"{BASE_URL}/analytics/reports/registrations?period=week", headers=headers_admin)
+        self.test("GET /api/analytics/reports/registrations?period=week (Admin)", r.status_code == 200, r)
+
+        r = requests.get(f"{BASE_URL}/analytics/reports/events", headers=headers_organizer)
+        self.test("GET /api/analytics/reports/events (Organizer - doit échouer)", r.status_code == 403, r)
+
+        # POST /api/analytics/reports/jobs : rapports en tâche de fond, dédupliqués
+        r = requests.post(f"{BASE_URL}/analytics/reports/jobs", json={"kind": "dashboard"}, headers=headers_organizer)
+        self.test("POST /api/analytics/reports/jobs (dashboard, Organizer)", r.status_code == 202, r)
+        if r.status_code == 202:
+            job_id = r.json()["id"]
+            r = requests.post(f"{BASE_URL}/analytics/reports/jobs", json={"kind": "dashboard"}, headers=headers_organizer)
+            self.test(
+                "POST /api/analytics/reports/jobs (demande identique dédupliquée)",
+                r.status_code == 202 and r.json()["id"] == job_id and r.json()["deduplicated"], r
+            )
+            for _ in range(50):
+                r = requests.get(f"{BASE_URL}/analytics/reports/jobs/{job_id}", headers=headers_organizer)
+                if r.status_code != 200 or r.json()["status"] in ("DONE", "FAILED"):
+                    break
+                time.sleep(0.1)
+            self.test("GET /api/analytics/reports/jobs/{job_id} (terminé)", r.status_code == 200 and r.json()["status"] == "DONE", r)
+            r = requests.get(f"{BASE_URL}/analytics/reports/jobs/{job_id}/result", headers=headers_organizer)
+            self.test("GET /api/analytics/reports/jobs/{job_id}/result", r.status_code == 200 and "total_events" in r.json(), r)
+            r = requests.get(f"{BASE_URL}/analytics/reports/jobs/{job_id}", headers=headers_user)
+            self.test("GET /api/analytics/reports/jobs/{job_id} (User - doit échouer)", r.status_code == 403, r)
+
+        r = requests.post(f"{BASE_URL}/analytics/reports/jobs", json={"kind": "global"}, headers=headers_organizer)
+        self.test("POST /api/analytics/reports/jobs (global, Organizer - doit échouer)", r.status_code == 403, r)
+
+        # GET /api/analytics/daily (Organizer) : agrégats quotidiens de ses événements
+        r = requests.get(f"{BASE_URL}/analytics/daily", headers=headers_organizer)
+        self.test("GET /api/analytics/daily (Organizer)", r.status_code == 200, r)
+        if r.status_code == 200:
+            days = r.json()
+            print(f"  {YELLOW}→ Jours actifs: {len(days)}, Inscriptions: {sum(d['registrations'] for d in days)}{RESET}")
+
+        r = requests.get(f"{BASE_URL}/analytics/daily?group_by=category", headers=headers_admin)
+        self.test("GET /api/analytics/daily?group_by=category (Admin)", r.status_code == 200, r)
+
+        r = requests.get(f"{BASE_URL}/analytics/daily?from=2026-02-01&to=2026-01-01", headers=headers_organizer)
+        self.test("GET /api/analytics/daily (from > to → 400)", r.status_code == 400, r)
 
         # GET /api/analytics/my-dashboard (User - accessible to all authenticated users)
         r = requests.get(f"{BASE_URL}/analytics/my-dashboard", headers=headers_user)
@@ -1044,6 +1268,127 @@ class APITester:
             r = requests.delete(f"{BASE_URL}/events/{event_with_reg}", headers=headers_admin)
             self.test("DELETE /api/events/{id} (Avec inscrits - doit échouer)", r.status_code == 400, r)
 
+    # ==================== CONCURRENCE ====================
+    def test_concurrency(self):
+        print_section("CONCURRENCE (INSCRIPTIONS SIMULTANÉES)")
+
+        headers_organizer = {"Authorization": f"Bearer {self.organizer_token}"}
+        headers_admin = {"Authorization": f"Bearer {self.admin_token}"}
+        timestamp = datetime.now().timestamp()
+
+        def create_event(max_participants):
+            event_data = {
+                "title": f"Ouverture des inscriptions {timestamp}",
+                "description": "Test de charge",
+                "category": "tech",
+                "tags": ["stress"],
+                "location": "Lyon",
+                "date_start": (datetime.now() + timedelta(days=10)).isoformat(),
+                "date_end": (datetime.now() + timedelta(days=10, hours=2)).isoformat(),
+                "max_participants": max_participants
+            }
+            r = requests.post(f"{BASE_URL}/events/", json=event_data, headers=headers_organizer)
+            if r.status_code != 201:
+                return None
+            event_id = r.json()["id"]
+            requests.post(f"{BASE_URL}/events/{event_id}/approve", headers=headers_admin)
+            return event_id
+
+        def create_user_token(i):
+            credentials = {"email": f"stress_{timestamp}_{i}@test.com", "password": "Password123!"}
+            requests.post(f"{BASE_URL}/auth/register", json={**credentials, "name": f"Stress {i}"})
+            r = requests.post(f"{BASE_URL}/auth/login", json=credentials)
+            return r.json()["access_token"] if r.status_code == 200 else None
+
+        def register(args):
+            event_id, token = args
+            r = requests.post(f"{BASE_URL}/registrations/{event_id}", headers={"Authorization": f"Bearer {token}"})
+            return r.status_code
+
+        event_id = create_event(STRESS_CAPACITY)
+        if not event_id:
+            print(f"{YELLOW}⚠ Impossible de créer l'événement de test de charge{RESET}")
+            return
+
+        print(f"  {YELLOW}→ Création de {STRESS_USERS} comptes...{RESET}")
+        with ThreadPoolExecutor(max_workers=STRESS_WORKERS) as pool:
+            tokens = [t for t in pool.map(create_user_token, range(STRESS_USERS)) if t]
+
+        # Toutes les inscriptions partent en même temps (ouverture de l'événement)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=STRESS_WORKERS) as pool:
+            codes = list(pool.map(register, [(event_id, t) for t in tokens]))
+        elapsed = time.perf_counter() - start
+
+        accepted = codes.count(201)
+        rejected = codes.count(400)
+        print(f"  {YELLOW}→ {len(codes)} inscriptions en {elapsed:.2f}s "
+              f"({len(codes) / elapsed:.0f} req/s) : {accepted} acceptées, {rejected} refusées{RESET}")
+
+        self.test(f"Inscriptions simultanées : {accepted} acceptées pour {STRESS_CAPACITY} places",
+                  accepted == min(STRESS_CAPACITY, len(tokens)))
+        self.test("Inscriptions simultanées : aucune erreur serveur", accepted + rejected == len(codes))
+
+        r = requests.get(f"{BASE_URL}/events/{event_id}")
+        self.test("Compteur de participants = capacité (pas de surréservation)",
+                  r.status_code == 200 and r.json()["participants_count"] == accepted, r)
+
+        # Le même utilisateur s'inscrit plusieurs fois en parallèle : une seule inscription active
+        event_id_2 = create_event(STRESS_CAPACITY)
+        if event_id_2 and tokens:
+            with ThreadPoolExecutor(max_workers=20) as pool:
+                codes = list(pool.map(register, [(event_id_2, tokens[0])] * 20))
+            self.test("Doublons simultanés : une seule inscription acceptée", codes.count(201) == 1)
+
+    # ==================== NOMBRE DE REQUÊTES ====================
+    def test_query_counts(self):
+        """Les listes d'événements font le même nombre de requêtes SQL pour 1 ou N événements (pas de N+1)"""
+        print_section("NOMBRE DE REQUÊTES (N+1)")
+
+        # Exécuté dans ce processus, sur la base du serveur (.env) : les requêtes SQL ne sont pas visibles par HTTP
+        from fastapi import Response
+        from sqlalchemy import event as sa_event
+        from app.database import SessionLocal, engine
+        from app.models import User
+        from app.routes.events import get_my_events, list_events
+        from app.schemas import EventResponse
+
+        def count_statements(fetch):
+            """(nombre d'événements, requêtes SQL exécutées, sérialisation des réponses comprise)"""
+            counter = {"statements": 0}
+
+            def before_execute(*args):
+                counter["statements"] += 1
+
+            db = SessionLocal()
+            sa_event.listen(engine, "before_cursor_execute", before_execute)
+            try:
+                events = [EventResponse.model_validate(event) for event in fetch(db)]
+            finally:
+                sa_event.remove(engine, "before_cursor_execute", before_execute)
+                db.close()
+            return len(events), counter["statements"]
+
+        def list_page(limit):
+            return lambda db: list_events(
+                response=Response(), db=db, search=None, category=None, location=None, tag=None,
+                start=None, end=None, upcoming_only=False, facets=False, cursor=None, skip=0, limit=limit
+            )
+
+        _, one = count_statements(list_page(1))
+        size, many = count_statements(list_page(100))
+        self.test(f"GET /api/events/ : {one} requête(s) pour 1 événement, {many} pour {size}", size > 1 and one == many)
+
+        def my_events(limit):
+            def fetch(db):
+                organizer = db.query(User).filter(User.id == self.organizer_id).first()
+                return get_my_events(response=Response(), cursor=None, limit=limit, db=db, current_user=organizer)
+            return fetch
+
+        _, one = count_statements(my_events(1))
+        size, many = count_statements(my_events(None))
+        self.test(f"GET /api/events/my-events : {one} requête(s) pour 1 événement, {many} pour {size}", size > 1 and one == many)
+
     # ==================== RÉSUMÉ ====================
     def print_summary(self):
         print_section("RÉSUMÉ DES TESTS")
@@ -1091,6 +1436,8 @@ def main():
     tester.test_registrations()
     tester.test_analytics()
     tester.test_favorites()
+    tester.test_concurrency()
+    tester.test_query_counts()
     tester.test_image_uploads()
     tester.test_delete()
 
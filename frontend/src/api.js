@@ -69,6 +69,11 @@ export const api = {
         }).then(handleResponse);
     },
 
+    suggestEvents: (q) =>
+        fetch(`${BASE_URL}/events/suggest?${new URLSearchParams({ q })}`, {
+            headers: getHeaders(),
+        }).then(handleResponse),
+
     getEvent: (id) =>
         fetch(`${BASE_URL}/events/${id}`, {
             headers: getHeaders(),
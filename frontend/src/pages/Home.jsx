@@ -8,6 +8,7 @@ const Home = ({ user }) => {
   const [recs, setRecs] = useState([]);
   const [loading, setLoading] = useState(true);
   const [search, setSearch] = useState('');
+  const [suggestions, setSuggestions] = useState([]);
   const [category, setCategory] = useState('');
 
   const fetchEvents = async () => {
@@ -28,6 +29,19 @@ const Home = ({ user }) => {
     }
   }, [category, user]);
 
+  // Autocomplete from the in-memory suggest index instead of a full search per keystroke
+  useEffect(() => {
+    const q = search.trim();
+    if (!q) {
+      setSuggestions([]);
+      return;
+    }
+    const timer = setTimeout(() => {
+      api.suggestEvents(q).then(setSuggestions).catch(() => setSuggestions([]));
+    }, 150);
+    return () => clearTimeout(timer);
+  }, [search]);
+
   const handleSearch = (e) => {
     e.preventDefault();
     fetchEvents();
@@ -47,7 +61,13 @@ const Home = ({ user }) => {
               placeholder="Search events, tags, or locations..."
               value={search}
               onChange={(e) => setSearch(e.target.value)}
+              list="event-suggestions"
             />
+            <datalist id="event-suggestions">
+              {suggestions.map(s => (
+                <option key={`${s.type}-${s.value}`} value={s.value}>{s.type}</option>
+              ))}
+            </datalist>
             <button type="submit" className="btn btn-primary">Search</button>
           </form>
         </div>
@@ -21,13 +21,12 @@ const OrganizerDashboard = ({ user }) => {
         fetchData();
     }, [user.id]);
 
-    const events = analytics?.events || [];
-    const avgFillRate = events.length > 0
-        ? Math.round(events.reduce((acc, current) => acc + current.fill_rate, 0) / events.length)
-        : 0;
+    // The events list is paginated: aggregates come from the server totals
+    const totalEvents = analytics?.total_events || 0;
+    const avgFillRate = Math.round(analytics?.avg_fill_rate || 0);
 
-    const countByStatus = (status) => events.filter(e => e.status === status).length;
-    const getStatusPercent = (status) => events.length > 0 ? (countByStatus(status) / events.length) * 100 : 0;
+    const countByStatus = (status) => analytics?.events_by_status?.[status] || 0;
+    const getStatusPercent = (status) => totalEvents > 0 ? (countByStatus(status) / totalEvents) * 100 : 0;
 
     if (loading) return <div className="loading-state">Loading metrics...</div>;
 
@@ -168,9 +168,11 @@ const StepScanner = ({ event, onBack }) => {
         return () => clearTimeout(t);
     }, [lastResult]);
 
-    const doScan = async (registrationId) => {
+    const doScan = async (code) => {
+        // Signed QR content: "{registration_id}:{event_id}:{signature}"
+        const registrationId = code.split(':')[0];
         try {
-            const data = await api.scanRegistration(registrationId, event.id);
+            const data = await api.scanRegistration(code, event.id);
             const name = participants.find(p => p.id === registrationId)?.user_name || 'Participant';
             setLastResult({ success: true, name, status: data.status });
             load();
@@ -185,7 +187,7 @@ const StepScanner = ({ event, onBack }) => {
         setShowCamera(false);
         let regId = decoded.trim();
 
-        // QR format from backend: "REG:{registration_id}"
+        // QR format from backend: "REG:{registration_id}:{event_id}:{signature}" (or legacy "REG:{registration_id}")
         if (regId.startsWith('REG:')) {
             regId = regId.slice(4).trim();
         } else {